@@ -18,13 +18,71 @@ class Config:
     
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     DATA_DIR = os.path.join(BASE_DIR, 'data')
-    RAW_DATA_DIR = os.path.join(DATA_DIR, 'raw')
+    RAW_DATA_DIR = os.environ.get('RAW_DATA_DIR') or os.path.join(DATA_DIR, 'raw')
     PROCESSED_DATA_DIR = os.path.join(DATA_DIR, 'processed')
+    SYNTHETIC_DATA_DIR = os.path.join(DATA_DIR, 'synthetic')
+    BENCHMARK_DIR = os.environ.get('BENCHMARK_DIR') or os.path.join(BASE_DIR, 'benchmarks')
     
     EPISODE_DATES_FILE = os.path.join(RAW_DATA_DIR, 'episodes.txt')
     COLORS_USED_FILE = os.path.join(RAW_DATA_DIR, 'colors.csv')
     SUBJECT_MATTER_FILE = os.path.join(RAW_DATA_DIR, 'subjects.csv')
 
+    CURSOR_BATCH_SIZE = int(os.environ.get('CURSOR_BATCH_SIZE', 500))
+
+    ETL_BATCH_SIZE = int(os.environ.get('ETL_BATCH_SIZE', 1000))
+    ETL_WRITE_WORKERS = int(os.environ.get('ETL_WRITE_WORKERS', 4))
+    ETL_MAX_FAILED_DOCUMENTS = int(os.environ.get('ETL_MAX_FAILED_DOCUMENTS', 0))
+    ETL_CHUNK_SIZE = int(os.environ.get('ETL_CHUNK_SIZE', 5000))
+    ETL_QUEUE_SIZE = int(os.environ.get('ETL_QUEUE_SIZE', 4))
+    EXTRACT_PARALLEL = os.environ.get('EXTRACT_PARALLEL', 'False').lower() == 'true'
+    EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', 3))
+    EXTRACT_SHARD_BYTES = int(os.environ.get('EXTRACT_SHARD_BYTES', 64 * 1024 * 1024))
+    
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_VERSION_POLL_SECONDS = float(os.environ.get('CACHE_VERSION_POLL_SECONDS', 5))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+
+    # How long a store built while the dataset has no version stamp is served before it is rebuilt
+    STORE_UNVERSIONED_TTL_SECONDS = float(os.environ.get('STORE_UNVERSIONED_TTL_SECONDS', 60))
+    
+    SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', 'True').lower() == 'true'
+    SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE') or os.path.join(PROCESSED_DATA_DIR, 'episodes.snapshot')
+    SNAPSHOT_POLL_SECONDS = float(os.environ.get('SNAPSHOT_POLL_SECONDS', 5))
+
+    ARTIFACTS_ENABLED = os.environ.get('ARTIFACTS_ENABLED', 'True').lower() == 'true'
+    ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR') or os.path.join(PROCESSED_DATA_DIR, 'artifacts')
+    ARTIFACT_KEEP = int(os.environ.get('ARTIFACT_KEEP', 3))
+
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    DB_MONITORING_ENABLED = os.environ.get('DB_MONITORING_ENABLED', 'True').lower() == 'true'
+    DB_MONITOR_BYTES = os.environ.get('DB_MONITOR_BYTES', 'False').lower() == 'true'
+    DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 100))
+    DB_SLOW_QUERY_KEEP = int(os.environ.get('DB_SLOW_QUERY_KEEP', 50))
+
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or ''
+    # Empty by default, so admin tooling needs the token. Behind a reverse proxy on the same
+    # host every request comes from 127.0.0.1, so listing loopback here would trust everyone
+    ADMIN_TRUSTED_IPS = [ip.strip() for ip in os.environ.get('ADMIN_TRUSTED_IPS', '').split(',') if ip.strip()]
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(DATA_DIR, 'profiles')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+    PROFILE_TOP = int(os.environ.get('PROFILE_TOP', 25))
+    DIAGNOSTICS_ENABLED = os.environ.get('DIAGNOSTICS_ENABLED', 'False').lower() == 'true'
+
+    HEARTBEAT_ENABLED = os.environ.get('HEARTBEAT_ENABLED', 'True').lower() == 'true'
+    HEARTBEAT_INTERVAL_SECONDS = float(os.environ.get('HEARTBEAT_INTERVAL_SECONDS', 5))
+    HEARTBEAT_STALE_SECONDS = float(os.environ.get('HEARTBEAT_STALE_SECONDS', 30))
+
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'True').lower() == 'true'
+    # Separated by ';' because filter paths contain commas
+    WARMUP_PATHS = [path.strip() for path in os.environ.get(
+        'WARMUP_PATHS',
+        '/;/stats;/episodes?page=1&per_page=50;/episodes/1;/episodes/filter?colors=Titanium White,Sap Green&match=any'
+    ).split(';') if path.strip()]
+
+    SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'True').lower() == 'true'
+    SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT_SECONDS', 30))
+
 if __name__ == "__main__":
     print("🔍 Config Debug:")
     print(f"MONGODB_URI: {Config.MONGODB_URI}")
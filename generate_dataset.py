@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for Joy of Painting API
+Writes seeded, Zipf-skewed episodes.txt, colors.csv and subjects.csv for scale testing
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.etl.synthetic import main as generate_dataset
+
+if __name__ == "__main__":
+    print("🎨 Joy of Painting Synthetic Dataset Generator")
+    print("=" * 50)
+    print("")
+    
+    generate_dataset()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for Joy of Painting API
+Times the API hot paths and ETL stages on synthetic datasets and compares against a baseline
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.perf.benchmarks import main as run_benchmarks
+
+if __name__ == "__main__":
+    print("⏱️  Joy of Painting Benchmarks")
+    print("=" * 50)
+    
+    sys.exit(run_benchmarks())
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Index advisor for Joy of Painting API
+Explains the API's MongoDB queries and reports the ones that miss an index
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.database.indexes import main as run_index_advisor
+
+if __name__ == "__main__":
+    print("🔍 Joy of Painting Index Advisor")
+    print("=" * 50)
+    print("")
+    
+    run_index_advisor()
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Load test runner for Joy of Painting API
+Replays a weighted mix of real requests at several concurrency levels and compares runs
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.perf.loadtest import main as run_loadtest
+
+if __name__ == "__main__":
+    print("🚦 Joy of Painting Load Test")
+    print("=" * 50)
+    
+    sys.exit(run_loadtest())
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Memory report for Joy of Painting API
+Reports worker memory by structure and the allocations made while serving requests
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.perf.memory import main as run_memory_report
+
+if __name__ == "__main__":
+    print("🧠 Joy of Painting Memory Report")
+    print("=" * 50)
+    
+    sys.exit(run_memory_report())
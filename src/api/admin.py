@@ -0,0 +1,30 @@
+from flask import jsonify, request
+import functools
+import hmac
+import sys
+import os
+from typing import Callable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+def is_trusted_caller() -> bool:
+    """Callers from ADMIN_TRUSTED_IPS, or presenting ADMIN_TOKEN, may use admin tooling"""
+    if Config.ADMIN_TOKEN:
+        token = request.headers.get(ADMIN_TOKEN_HEADER, '')
+        if token and hmac.compare_digest(token, Config.ADMIN_TOKEN):
+            return True
+    return request.remote_addr in Config.ADMIN_TRUSTED_IPS
+
+def admin_only(view: Callable) -> Callable:
+    """Answer 403 to callers that are not trusted"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_trusted_caller():
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    
+    return wrapper
@@ -1,3 +1,7 @@
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 import logging
@@ -8,9 +12,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from config import Config
 from src.api.routes import api_bp
+from src.api.warmup import startup, warm_up
+from src.database.heartbeat import heartbeat
+
+startup['imports_ms'] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 3)
 
 def create_app():
     """Create and configure Flask application"""
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
     
@@ -23,6 +32,23 @@ def create_app():
     
     app.register_blueprint(api_bp)
     
+    # Optional tooling is imported only when enabled, keeping worker startup lean;
+    # handlers record phase timings through src.api.timing, which has no such dependencies
+    if Config.METRICS_ENABLED:
+        from src.api.metrics import init_metrics
+        init_metrics(app)
+    
+    if Config.PROFILING_ENABLED:
+        from src.api.profiling import init_profiling
+        init_profiling(app)
+    
+    if Config.DIAGNOSTICS_ENABLED:
+        from src.api.diagnostics import init_diagnostics
+        init_diagnostics(app)
+    
+    if Config.HEARTBEAT_ENABLED:
+        heartbeat.start()
+    
     @app.errorhandler(404)
     def not_found_error(error):
         return {
@@ -36,7 +62,10 @@ def create_app():
                 '/colors',
                 '/subjects',
                 '/health',
-                '/stats'
+                '/ready',
+                '/stats',
+                '/metrics',
+                '/metrics/queries'
             ]
         }, 404
     
@@ -47,6 +76,18 @@ def create_app():
             'message': 'An unexpected error occurred. Please try again later.'
         }, 500
     
+    # Flask refuses setup calls once an app has served a request, so this goes last
+    if Config.WARMUP_ENABLED:
+        warm_up(app)
+        if Config.METRICS_ENABLED:
+            # Cold first requests are not traffic and would skew the latency histograms
+            from src.api.metrics import metrics
+            metrics.reset()
+    
+    startup['create_app_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    logging.getLogger(__name__).info(
+        f"App created in {startup['create_app_ms']:.0f} ms (imports {startup['imports_ms']:.0f} ms)"
+    )
     return app
 
 if __name__ == '__main__':
@@ -62,7 +103,10 @@ if __name__ == '__main__':
     print("   GET  /colors              - Get all colors")
     print("   GET  /subjects            - Get all subjects")
     print("   GET  /health              - Health check")
+    print("   GET  /ready               - Readiness check")
     print("   GET  /stats               - Database statistics")
+    print("   GET  /metrics             - Prometheus metrics")
+    print("   GET  /metrics/queries     - MongoDB query stats")
     print("")
     print("🌐 API will be available at: http://localhost:5000")
     print("📖 Documentation at: http://localhost:5000")
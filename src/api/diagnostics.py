@@ -0,0 +1,46 @@
+from flask import Flask, jsonify, request
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.api.admin import admin_only
+from src.perf.memory import DEFAULT_FRAMES, DEFAULT_TOP, memory_report, memory_tracer
+
+def init_diagnostics(app: Flask):
+    """Admin endpoints for memory accounting and tracemalloc diffs"""
+    
+    @app.route('/admin/memory', methods=['GET'])
+    @admin_only
+    def memory_usage():
+        """Process RSS, cache/index/snapshot sizes and, with ?objects=1, live object counts"""
+        objects = request.args.get('objects', '').lower() in ('1', 'true')
+        top = int(request.args.get('top', DEFAULT_TOP))
+        return jsonify(memory_report(objects=objects, top=top))
+    
+    @app.route('/admin/memory/trace', methods=['POST'])
+    @admin_only
+    def start_memory_trace():
+        """Start tracemalloc and take the baseline snapshot"""
+        frames = int(request.args.get('frames', DEFAULT_FRAMES))
+        return jsonify(memory_tracer.start(frames))
+    
+    @app.route('/admin/memory/trace', methods=['GET'])
+    @admin_only
+    def memory_trace_diff():
+        """Top allocation growth since the baseline; ?reset=1 makes now the new baseline"""
+        top = int(request.args.get('top', DEFAULT_TOP))
+        reset = request.args.get('reset', '').lower() in ('1', 'true')
+        try:
+            rows = memory_tracer.diff(top, request.args.get('group_by', 'lineno'), reset)
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'status': memory_tracer.status(), 'top': rows})
+    
+    @app.route('/admin/memory/trace', methods=['DELETE'])
+    @admin_only
+    def stop_memory_trace():
+        """Stop tracemalloc and drop the baseline"""
+        return jsonify(memory_tracer.stop())
@@ -5,7 +5,8 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.database.models import Episode, Color, Subject
+from src.database.store import get_episode_store
+from src.api.timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -37,72 +38,34 @@ class EpisodeFilter:
         
         return filters
     
+    @staticmethod
+    def query_key(filters: Dict[str, Any], match_type: str = 'any') -> tuple:
+        """Normalized form of a filter, equal for queries that match the same episodes
+        
+        Terms match case-insensitively and are combined with any/all, so
+        their case, order and repetition do not matter.
+        """
+        return (
+            filters.get('month'),
+            tuple(sorted({term.lower() for term in filters.get('subjects', [])})),
+            tuple(sorted({term.lower() for term in filters.get('colors', [])})),
+            match_type
+        )
+    
     @staticmethod
     def filter_episodes(filters: Dict[str, Any], match_type: str = 'any') -> List[Dict]:
         """Filter episodes based on criteria"""
         try:
-            episodes = Episode.find_all()
-            
-            if not filters:
-                return episodes
-            
-            filtered_episodes = []
+            with timed('db'):
+                store = get_episode_store()
             
-            for episode in episodes:
-                include_episode = True
-                matches = []
-                
-                if 'month' in filters:
-                    month_match = (
-                        episode.get('air_date', {}).get('month_name', '').lower() == 
-                        filters['month'].lower()
-                    )
-                    matches.append(month_match)
-                
-                if 'subjects' in filters:
-                    episode_subjects = [s.lower() for s in episode.get('subjects', [])]
-                    filter_subjects = [s.lower() for s in filters['subjects']]
-                    
-                    if match_type == 'all':
-                        subjects_match = all(
-                            any(fs in es for es in episode_subjects) 
-                            for fs in filter_subjects
-                        )
-                    else:
-                        subjects_match = any(
-                            any(fs in es for es in episode_subjects) 
-                            for fs in filter_subjects
-                        )
-                    
-                    matches.append(subjects_match)
-                
-                if 'colors' in filters:
-                    episode_colors = [c.get('name', '').lower() for c in episode.get('colors', [])]
-                    filter_colors = [c.lower() for c in filters['colors']]
-                    
-                    if match_type == 'all':
-                        colors_match = all(
-                            any(fc in ec for ec in episode_colors) 
-                            for fc in filter_colors
-                        )
-                    else:
-                        colors_match = any(
-                            any(fc in ec for ec in episode_colors) 
-                            for fc in filter_colors
-                        )
-                    
-                    matches.append(colors_match)
-                
-                if match_type == 'all':
-                    include_episode = all(matches) if matches else True
-                else:
-                    include_episode = any(matches) if matches else True
-                
-                if include_episode:
-                    filtered_episodes.append(episode)
+            # Matching and materializing both work on the in-memory store, not MongoDB
+            with timed('filter'):
+                indexes = store.filter_indexes(filters, match_type)
+                episodes = store.materialize_many(indexes)
             
-            logger.info(f"Filtered {len(filtered_episodes)} episodes from {len(episodes)} total")
-            return filtered_episodes
+            logger.info(f"Filtered {len(indexes)} episodes from {len(store)} total")
+            return episodes
             
         except Exception as e:
             logger.error(f"Error filtering episodes: {e}")
@@ -168,7 +131,9 @@ class APIHelpers:
                 'GET /episodes/filter': 'Filter episodes with query parameters',
                 'POST /episodes/filter': 'Filter episodes with JSON body',
                 'GET /colors': 'Get all available colors',
-                'GET /subjects': 'Get all available subjects'
+                'GET /subjects': 'Get all available subjects',
+                'GET /metrics': 'Request metrics in Prometheus text format',
+                'GET /metrics/queries': 'MongoDB query counters and the slowest queries'
             },
             'filter_parameters': {
                 'month': 'Filter by month name (e.g., january, february)',
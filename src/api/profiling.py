@@ -0,0 +1,143 @@
+from flask import Flask, g, jsonify, request
+import cProfile
+import glob
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+from src.api.admin import is_trusted_caller
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SUFFIX = '.prof'
+
+# One profiled request at a time, so profiling can never pile up on a busy worker
+_profile_lock = threading.Lock()
+
+def requested_mode() -> str:
+    """'' when not asked to profile, 'top' to answer with the profile, else 'store'"""
+    value = request.args.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER) or ''
+    value = value.strip().lower()
+    if value in ('', '0', 'false'):
+        return ''
+    return 'top' if value == 'top' else 'store'
+
+def top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict[str, Any]]:
+    """The functions with the most cumulative time in a profile"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    
+    functions = []
+    for function in stats.fcn_list[:limit]:
+        calls, primitive_calls, total_time, cumulative_time, _ = stats.stats[function]
+        filename, line, name = function
+        functions.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})" if line else name,
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_ms': round(total_time * 1000, 3),
+            'cumulative_ms': round(cumulative_time * 1000, 3)
+        })
+    return functions
+
+def profile_path(route: str) -> str:
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+    return os.path.join(Config.PROFILE_DIR, f"{stamp}-{uuid.uuid4().hex[:8]}-{slug}{PROFILE_SUFFIX}")
+
+def list_profiles() -> List[str]:
+    """Stored profiles, newest first"""
+    paths = glob.glob(os.path.join(Config.PROFILE_DIR, f"*{PROFILE_SUFFIX}"))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def prune_profiles(keep: int) -> List[str]:
+    """Remove all but the newest keep profiles"""
+    removed = []
+    for path in list_profiles()[max(keep, 1):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"Could not remove old profile {path}: {e}")
+    return removed
+
+def save_profile(profiler: cProfile.Profile, route: str) -> str:
+    """Write a profile for offline analysis (pstats, snakeviz) and rotate the directory"""
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    path = profile_path(route)
+    profiler.dump_stats(path)
+    prune_profiles(keep=Config.PROFILE_KEEP)
+    return path
+
+def init_profiling(app: Flask):
+    """Run requests under cProfile when a trusted caller asks for it
+    
+    Send ?_profile=1 (or an X-Profile: 1 header) to store the profile
+    and get its file name back in X-Profile-File, or ?_profile=top to get
+    the top functions as the response body instead of the normal one.
+    """
+    @app.before_request
+    def start_profiler():
+        mode = requested_mode()
+        if not mode or not is_trusted_caller():
+            return None
+        
+        if not _profile_lock.acquire(blocking=False):
+            g.profile_busy = True
+            return None
+        
+        g.profile_mode = mode
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+        return None
+    
+    @app.after_request
+    def finish_profiler(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            if g.pop('profile_busy', False):
+                response.headers['X-Profile'] = 'busy'
+            return response
+        
+        profiler.disable()
+        _profile_lock.release()
+        
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        functions = top_functions(profiler, Config.PROFILE_TOP)
+        try:
+            path = os.path.basename(save_profile(profiler, route))
+        except Exception as e:
+            logger.error(f"Error saving profile for {route}: {e}")
+            path = None
+        
+        logger.info(f"Profiled {request.method} {request.full_path} -> {path}")
+        if g.pop('profile_mode', 'store') == 'top':
+            return jsonify({
+                'route': route,
+                'status': response.status_code,
+                'profile_file': path,
+                'top_functions': functions
+            })
+        
+        if path:
+            response.headers['X-Profile-File'] = path
+        return response
+    
+    @app.teardown_request
+    def release_profiler(error=None):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
@@ -5,8 +5,14 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
+from config import Config
 from src.database.models import Episode, Color, Subject
+from src.database.store import episode_store, get_episode_store
+from src.database.heartbeat import heartbeat
+from src.database.singleflight import single_flight
 from src.api.filters import EpisodeFilter, APIHelpers
+from src.api.timing import timed
+from src.api.warmup import startup
 
 logger = logging.getLogger(__name__)
 
@@ -30,13 +36,16 @@ def get_all_episodes():
         
         skip = (page - 1) * per_page
         
-        episodes = Episode.find_all(limit=per_page, skip=skip)
+        with timed('db'):
+            episodes = get_episode_store().page(skip=skip, limit=per_page)
         
-        response = APIHelpers.format_episodes_response(episodes)
-        response['page'] = page
-        response['per_page'] = per_page
+        with timed('serialize'):
+            body = APIHelpers.format_episodes_response(episodes)
+            body['page'] = page
+            body['per_page'] = per_page
+            response = jsonify(body)
         
-        return jsonify(response)
+        return response
         
     except Exception as e:
         logger.error(f"Error getting all episodes: {e}")
@@ -46,13 +55,16 @@ def get_all_episodes():
 def get_episode_by_id(episode_id):
     """Get specific episode by ID"""
     try:
-        episode = Episode.find_by_id(episode_id)
+        with timed('db'):
+            episode = get_episode_store().find_by_id(episode_id)
         
         if not episode:
             return jsonify({'error': 'Episode not found'}), 404
         
-        formatted_episode = APIHelpers.format_episode_response(episode)
-        return jsonify(formatted_episode)
+        with timed('serialize'):
+            response = jsonify(APIHelpers.format_episode_response(episode))
+        
+        return response
         
     except Exception as e:
         logger.error(f"Error getting episode {episode_id}: {e}")
@@ -73,7 +85,12 @@ def filter_episodes():
         if match_type not in ['any', 'all']:
             return jsonify({'error': 'match parameter must be "any" or "all"'}), 400
         
-        episodes = EpisodeFilter.filter_episodes(filters, match_type)
+        # Identical concurrent queries share one filter pass; the episodes are only read below
+        episodes = single_flight.do(
+            'episodes_filter',
+            EpisodeFilter.query_key(filters, match_type),
+            lambda: EpisodeFilter.filter_episodes(filters, match_type)
+        )
         
         filters_applied = {
             'month': filters.get('month'),
@@ -82,9 +99,10 @@ def filter_episodes():
             'match_type': match_type
         }
         
-        response = APIHelpers.format_episodes_response(episodes, filters_applied)
+        with timed('serialize'):
+            response = jsonify(APIHelpers.format_episodes_response(episodes, filters_applied))
         
-        return jsonify(response)
+        return response
         
     except Exception as e:
         logger.error(f"Error filtering episodes: {e}")
@@ -94,14 +112,18 @@ def filter_episodes():
 def get_all_colors():
     """Get all available colors"""
     try:
-        colors = Color.find_all()
+        with timed('db'):
+            colors = Color.find_all()
         
         colors.sort(key=lambda x: x.get('name', ''))
         
-        return jsonify({
-            'colors': colors,
-            'total': len(colors)
-        })
+        with timed('serialize'):
+            response = jsonify({
+                'colors': colors,
+                'total': len(colors)
+            })
+        
+        return response
         
     except Exception as e:
         logger.error(f"Error getting colors: {e}")
@@ -111,14 +133,18 @@ def get_all_colors():
 def get_all_subjects():
     """Get all available subjects"""
     try:
-        subjects = Subject.find_all()
+        with timed('db'):
+            subjects = Subject.find_all()
         
         subjects.sort(key=lambda x: x.get('name', ''))
         
-        return jsonify({
-            'subjects': subjects,
-            'total': len(subjects)
-        })
+        with timed('serialize'):
+            response = jsonify({
+                'subjects': subjects,
+                'total': len(subjects)
+            })
+        
+        return response
         
     except Exception as e:
         logger.error(f"Error getting subjects: {e}")
@@ -126,13 +152,34 @@ def get_all_subjects():
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness, answered from the heartbeat's last check"""
     try:
-        Episode.find_all(limit=1)
+        if not heartbeat.running:
+            heartbeat.check()
+        
+        state = heartbeat.state
+        if state['checked_at'] is None:
+            return jsonify({'status': 'starting', 'database': 'unknown'})
+        
+        if heartbeat.is_stale():
+            return jsonify({
+                'status': 'unhealthy',
+                'database': state['database'],
+                'error': 'Heartbeat has not reported recently'
+            }), 500
+        
+        if state['database'] != 'connected':
+            return jsonify({
+                'status': 'unhealthy',
+                'database': 'disconnected',
+                'error': state['error']
+            }), 500
         
         return jsonify({
             'status': 'healthy',
-            'database': 'connected'
+            'database': 'connected',
+            'latency_ms': state['latency_ms'],
+            'checked_at': state['checked_at']
         })
         
     except Exception as e:
@@ -143,40 +190,66 @@ def health_check():
             'error': str(e)
         }), 500
 
+@api_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: the episode store is loaded and can be kept current"""
+    try:
+        if not heartbeat.running:
+            heartbeat.check()
+        
+        state = heartbeat.state
+        checks = {
+            'store_loaded': episode_store.loaded,
+            'store_episodes': episode_store.loaded_episodes,
+            'database': state['database'],
+            'snapshot': episode_store.serving_snapshot,
+            'heartbeat_fresh': state['checked_at'] is not None and not heartbeat.is_stale(),
+            'warmed_up': startup['warmed_up'] or not Config.WARMUP_ENABLED
+        }
+        ready = (
+            checks['store_loaded']
+            and checks['heartbeat_fresh']
+            and checks['warmed_up']
+            and (checks['database'] == 'connected' or checks['snapshot'])
+        )
+        
+        return jsonify({
+            'status': 'ready' if ready else 'not ready',
+            'checks': checks,
+            'startup': startup
+        }), 200 if ready else 503
+    
+    except Exception as e:
+        logger.error(f"Readiness check failed: {e}")
+        return jsonify({'status': 'not ready', 'error': str(e)}), 503
+
+def compute_stats():
+    """Episode, color and subject totals with the ten most used of each"""
+    with timed('db'):
+        store = get_episode_store()
+        color_usage, subject_usage = store.usage_counts()
+    
+    top_colors = sorted(color_usage.items(), key=lambda x: x[1], reverse=True)[:10]
+    top_subjects = sorted(subject_usage.items(), key=lambda x: x[1], reverse=True)[:10]
+    
+    return {
+        'total_episodes': len(store),
+        'total_colors': len(color_usage),
+        'total_subjects': len(subject_usage),
+        'top_colors': [{'name': name, 'count': count} for name, count in top_colors],
+        'top_subjects': [{'name': name, 'count': count} for name, count in top_subjects]
+    }
+
 @api_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get database statistics"""
     try:
-        episodes = Episode.find_all()
-        colors = Color.find_all()
-        subjects = Subject.find_all()
+        stats = single_flight.do('stats', None, compute_stats)
         
-        total_episodes = len(episodes)
-        total_colors = len(colors)
-        total_subjects = len(subjects)
+        with timed('serialize'):
+            response = jsonify(stats)
         
-        color_usage = {}
-        subject_usage = {}
-        
-        for episode in episodes:
-            for color in episode.get('colors', []):
-                color_name = color.get('name')
-                if color_name:
-                    color_usage[color_name] = color_usage.get(color_name, 0) + 1
-            
-            for subject in episode.get('subjects', []):
-                subject_usage[subject] = subject_usage.get(subject, 0) + 1
-        
-        top_colors = sorted(color_usage.items(), key=lambda x: x[1], reverse=True)[:10]
-        top_subjects = sorted(subject_usage.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return jsonify({
-            'total_episodes': total_episodes,
-            'total_colors': total_colors,
-            'total_subjects': total_subjects,
-            'top_colors': [{'name': name, 'count': count} for name, count in top_colors],
-            'top_subjects': [{'name': name, 'count': count} for name, count in top_subjects]
-        })
+        return response
         
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
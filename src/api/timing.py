@@ -0,0 +1,26 @@
+from flask import g, has_request_context
+import time
+
+class timed:
+    """Add the time spent in a block to the current request's phase timings
+    
+    Outside a request (ETL, scripts, tests calling helpers directly) it
+    only measures, so API helpers can use it unconditionally.
+    """
+    
+    __slots__ = ('phase', 'start')
+    
+    def __init__(self, phase: str):
+        self.phase = phase
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if has_request_context():
+            timings = g.get('phase_timings')
+            if timings is not None:
+                timings[self.phase] = timings.get(self.phase, 0.0) + elapsed
+        return False
@@ -0,0 +1,82 @@
+from flask import Flask
+import logging
+import time
+import sys
+import os
+from typing import Any, Callable, Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+from src.database.heartbeat import heartbeat
+from src.database.models import Color, Subject
+from src.database.store import episode_store
+
+logger = logging.getLogger(__name__)
+
+# Filled in by create_app and warm_up; reported by /ready
+startup = {
+    'imports_ms': None,
+    'create_app_ms': None,
+    'warm_up_ms': None,
+    'warm_up_steps': {},
+    'warmed_up': False
+}
+
+def timed_step(steps: Dict[str, Any], name: str, step: Callable[[], Any]):
+    """Run one warm-up step, recording its duration and any error"""
+    start = time.perf_counter()
+    try:
+        step()
+        error = None
+    except Exception as e:
+        logger.error(f"Warm-up step {name} failed: {e}")
+        error = str(e)
+    steps[name] = {'ms': round((time.perf_counter() - start) * 1000, 3), 'error': error}
+
+def skip_step(steps: Dict[str, Any], name: str, reason: str):
+    """Record a warm-up step that was not run"""
+    logger.warning(f"Warm-up step {name} skipped: {reason}")
+    steps[name] = {'ms': 0, 'error': None, 'skipped': reason}
+
+def warm_requests(app: Flask):
+    """Serve each warm-up path once so first-request work happens before traffic"""
+    client = app.test_client()
+    for path in Config.WARMUP_PATHS:
+        response = client.get(path)
+        if response.status_code >= 500:
+            logger.warning(f"Warm-up request {path} returned {response.status_code}")
+
+def warm_up(app: Flask) -> Dict[str, Any]:
+    """Connect, load the episode store, build its indexes and prime caches and code paths
+    
+    Runs before the worker takes traffic. Failed steps are logged and
+    recorded, not raised, so a worker still starts when MongoDB is down
+    and the snapshot can serve. When the database is unreachable the
+    steps that read it are skipped rather than each waiting out the
+    server selection timeout; the first requests do that work instead.
+    """
+    start = time.perf_counter()
+    steps = {}
+    
+    timed_step(steps, 'database', heartbeat.check)
+    database_steps = [
+        ('store', episode_store.get),
+        ('indexes', lambda: episode_store.get().warm()),
+        ('model_cache', lambda: (Color.find_all(), Subject.find_all())),
+        ('requests', lambda: warm_requests(app))
+    ]
+    connected = heartbeat.state['database'] == 'connected'
+    for name, step in database_steps:
+        if connected:
+            timed_step(steps, name, step)
+        else:
+            skip_step(steps, name, 'database unreachable')
+    
+    startup['warm_up_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    startup['warm_up_steps'] = steps
+    startup['warmed_up'] = True
+    
+    summary = ', '.join(f"{name} {step['ms']:.0f} ms" for name, step in steps.items())
+    logger.info(f"Warm-up finished in {startup['warm_up_ms']:.0f} ms ({summary})")
+    return startup
@@ -0,0 +1,164 @@
+import copy
+import functools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from .singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+def default_version_provider() -> Optional[str]:
+    """Read the dataset version from the meta collection"""
+    from .models import Meta  # models imports this module
+    return Meta.get_dataset_version()
+
+class Uncached:
+    """A fallback result returned by a loader that failed; get_or_load returns its value without storing it"""
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
+def unwrap(value: Any) -> Any:
+    return value.value if isinstance(value, Uncached) else value
+
+class ModelCache:
+    """Per-process read-through cache invalidated by the dataset version stamp"""
+    
+    def __init__(self, version_provider: Optional[Callable[[], Optional[str]]] = None,
+                 poll_interval: Optional[float] = None, max_entries: Optional[int] = None):
+        self.version_provider = version_provider or default_version_provider
+        self.poll_interval = Config.CACHE_VERSION_POLL_SECONDS if poll_interval is None else poll_interval
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self.enabled = Config.CACHE_ENABLED
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def current_version(self) -> Optional[str]:
+        """Dataset version, re-read from the meta document at most once per poll interval
+        
+        One thread reads at a time; while it does, other threads get the
+        last known version instead of queueing behind a slow database.
+        Only the very first read is waited for.
+        """
+        if self._checked_at and time.monotonic() - self._checked_at < self.poll_interval:
+            return self._version
+        
+        if not self._poll_lock.acquire(blocking=not self._checked_at):
+            return self._version
+        
+        try:
+            # Another thread may have finished a read while this one waited for the lock
+            if self._checked_at and time.monotonic() - self._checked_at < self.poll_interval:
+                return self._version
+        
+            try:
+                version = self.version_provider()
+            except Exception as e:
+                logger.error(f"Error reading dataset version: {e}")
+                version = None
+        
+            with self._lock:
+                # Stamped after the read, so a slow read does not leave the interval already expired
+                self._checked_at = time.monotonic()
+                if version != self._version:
+                    if self._entries:
+                        logger.info(f"Dataset version changed ({self._version} -> {version}), clearing cache")
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._version = version
+            
+            return version
+        finally:
+            self._poll_lock.release()
+    
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading it on a miss"""
+        if not self.enabled:
+            return unwrap(loader())
+        
+        version = self.current_version()
+        if version is None:
+            return unwrap(loader())
+        
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        
+        self.misses += 1
+        value = single_flight.do('model_cache', (version, key), loader)
+        if isinstance(value, Uncached):
+            # A transient error must not be pinned until the next dataset version
+            return value.value
+        
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        
+        return value
+    
+    def clear(self):
+        """Drop every entry and force a version check on the next read"""
+        with self._lock:
+            self._entries.clear()
+            self._checked_at = 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        return {
+            'enabled': self.enabled,
+            'version': self._version,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
+
+model_cache = ModelCache()
+
+def make_key(name: str, args: tuple, kwargs: Dict) -> str:
+    """Stable cache key for a method call"""
+    return f"{name}:{json.dumps([args, kwargs], sort_keys=True, default=str)}"
+
+def copy_result(value: Any) -> Any:
+    """Copy a cached value so callers cannot change what other callers get
+    
+    Dicts are copied deeply. Lists are copied with each dict in them
+    copied one level deep, enough to sort the list or set a field on an
+    item without copying every nested document on each call.
+    """
+    if isinstance(value, dict):
+        return copy.deepcopy(value)
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+def cached(method: Callable) -> Callable:
+    """Cache a model classmethod's result per dataset version
+    
+    The method returns Uncached(fallback) when it fails, so the fallback
+    is served but not kept. Results are copied for each caller.
+    """
+    @functools.wraps(method)
+    def wrapper(cls, *args, **kwargs):
+        key = make_key(f"{cls.__name__}.{method.__name__}", args, kwargs)
+        value = model_cache.get_or_load(key, lambda: method(cls, *args, **kwargs))
+        return copy_result(value)
+    
+    return wrapper
@@ -0,0 +1,371 @@
+import logging
+import sys
+from array import array
+from collections import Counter
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Set
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+MONTH_NAMES = [
+    '', 'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+UINT16_MAX = 0xFFFF
+
+class Vocabulary:
+    """Interned table of distinct names addressed by compact integer codes"""
+    
+    def __init__(self, names: Optional[Iterable[str]] = None, hexes: Optional[Iterable[Optional[str]]] = None):
+        self.names = []
+        self.hexes = []
+        self._codes = {}
+        self._lowered = None
+        
+        names = list(names or [])
+        hexes = list(hexes) if hexes is not None else [None] * len(names)
+        for name, hex_value in zip(names, hexes):
+            self.add(name, hex_value)
+    
+    def add(self, name: str, hex_value: Optional[str] = None) -> int:
+        """Return the code for a name (and hex), adding it if it is new"""
+        key = (name, hex_value)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.names)
+            self._codes[key] = code
+            self.names.append(sys.intern(name))
+            self.hexes.append(sys.intern(hex_value) if isinstance(hex_value, str) else hex_value)
+            self._lowered = None
+        return code
+    
+    def code(self, name: str, hex_value: Optional[str] = None) -> Optional[int]:
+        """Look up the code for a name without adding it"""
+        return self._codes.get((name, hex_value))
+    
+    def matching_codes(self, term: str) -> Set[int]:
+        """Codes whose name contains term, case-insensitively"""
+        if self._lowered is None:
+            self._lowered = [name.lower() for name in self.names]
+        term = term.lower()
+        return {code for code, name in enumerate(self._lowered) if term in name}
+    
+    def distinct_names(self) -> List[str]:
+        """Distinct names in code order"""
+        return list(dict.fromkeys(self.names))
+    
+    def __len__(self) -> int:
+        return len(self.names)
+
+class EpisodeRow:
+    """Lightweight view of one episode in a ColumnarEpisodeStore"""
+    
+    __slots__ = ('store', 'index')
+    
+    def __init__(self, store: 'ColumnarEpisodeStore', index: int):
+        self.store = store
+        self.index = index
+    
+    @property
+    def episode_num(self) -> int:
+        return self.store.episode_nums[self.index]
+    
+    @property
+    def title(self) -> str:
+        return self.store.titles[self.index]
+    
+    @property
+    def color_codes(self) -> array:
+        return self.store.color_codes[self.store.color_offsets[self.index]:self.store.color_offsets[self.index + 1]]
+    
+    @property
+    def subject_codes(self) -> array:
+        return self.store.subject_codes[self.store.subject_offsets[self.index]:self.store.subject_offsets[self.index + 1]]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materialize the episode in the same shape as the stored document"""
+        return self.store.materialize(self.index)
+    
+    def __repr__(self) -> str:
+        return f"EpisodeRow({self.episode_num}, {self.title!r})"
+
+class ColumnarEpisodeStore:
+    """Column-oriented, compact in-memory copy of the episodes collection
+    
+    Colors and subjects are stored as uint16 codes into interned vocabularies,
+    with one offsets array per list column. Air dates are packed as date
+    ordinals. Episode dicts are only built when a response needs them.
+    """
+    
+    def __init__(self, colors: Optional[Vocabulary] = None, subjects: Optional[Vocabulary] = None):
+        self.ids = []
+        self.episode_nums = array('i')
+        self.painting_indexes = array('i')
+        self.seasons = array('H')
+        self.episodes = array('H')
+        self.date_ordinals = array('i')
+        self.months = array('B')
+        self.titles = []
+        self.youtube_urls = []
+        self.img_srcs = []
+        self.colors = colors if colors is not None else Vocabulary()
+        self.subjects = subjects if subjects is not None else Vocabulary()
+        self.color_offsets = array('I', [0])
+        self.color_codes = array('H')
+        self.subject_offsets = array('I', [0])
+        self.subject_codes = array('H')
+        self.version = None
+        self.metadata = {}
+        self.mapping = None
+        self._id_index = None
+        self._number_index = None
+    
+    @classmethod
+    def from_episodes(cls, episodes: Iterable[Dict], colors: Optional[Vocabulary] = None,
+                      subjects: Optional[Vocabulary] = None) -> 'ColumnarEpisodeStore':
+        """Build a store from an iterable of episode documents
+        
+        Passing the transformer's vocabularies keeps the codes the ETL
+        assigned, so names are only interned and hashed once.
+        """
+        store = cls(colors, subjects)
+        for episode in episodes:
+            store.append(episode)
+        logger.info(f"Built columnar store with {len(store)} episodes "
+                    f"({len(store.colors)} colors, {len(store.subjects)} subjects)")
+        return store
+    
+    @staticmethod
+    def _intern(value: Any) -> str:
+        return sys.intern(value) if isinstance(value, str) else (value or '')
+    
+    @staticmethod
+    def _append_code(codes: array, code: int) -> array:
+        if code > UINT16_MAX and codes.typecode == 'H':
+            codes = array('I', codes)
+        codes.append(code)
+        return codes
+    
+    def append(self, episode: Dict):
+        """Add one episode document"""
+        air_date = episode.get('air_date') or {}
+        date_value = air_date.get('date')
+        if isinstance(date_value, (datetime, date)):
+            ordinal = date_value.toordinal()
+            month = date_value.month
+        elif air_date.get('year') and air_date.get('month') and air_date.get('day'):
+            ordinal = date(air_date['year'], air_date['month'], air_date['day']).toordinal()
+            month = air_date['month']
+        else:
+            ordinal = 0
+            month = 0
+        
+        self.ids.append(str(episode.get('_id', '')))
+        self.episode_nums.append(int(episode.get('episode_num') or 0))
+        self.painting_indexes.append(int(episode.get('painting_index') or 0))
+        self.seasons.append(int(episode.get('season') or 0))
+        self.episodes.append(int(episode.get('episode') or 0))
+        self.date_ordinals.append(ordinal)
+        self.months.append(month)
+        self.titles.append(self._intern(episode.get('title')))
+        self.youtube_urls.append(self._intern(episode.get('youtube_url')))
+        self.img_srcs.append(self._intern(episode.get('img_src')))
+        
+        for color in episode.get('colors', []):
+            code = self.colors.add(color.get('name', ''), color.get('hex'))
+            self.color_codes = self._append_code(self.color_codes, code)
+        self.color_offsets.append(len(self.color_codes))
+        
+        for subject in episode.get('subjects', []):
+            code = self.subjects.add(subject)
+            self.subject_codes = self._append_code(self.subject_codes, code)
+        self.subject_offsets.append(len(self.subject_codes))
+        
+        self._id_index = None
+        self._number_index = None
+    
+    def __len__(self) -> int:
+        return len(self.episode_nums)
+    
+    def row(self, index: int) -> EpisodeRow:
+        return EpisodeRow(self, index)
+    
+    def rows(self) -> Iterator[EpisodeRow]:
+        for index in range(len(self)):
+            yield EpisodeRow(self, index)
+    
+    def _codes(self, offsets: array, codes: array, index: int) -> array:
+        return codes[offsets[index]:offsets[index + 1]]
+    
+    def materialize(self, index: int) -> Dict[str, Any]:
+        """Build the episode dict for one row"""
+        colors = [
+            {'name': self.colors.names[code], 'hex': self.colors.hexes[code]}
+            for code in self._codes(self.color_offsets, self.color_codes, index)
+        ]
+        subjects = [
+            self.subjects.names[code]
+            for code in self._codes(self.subject_offsets, self.subject_codes, index)
+        ]
+        
+        ordinal = self.date_ordinals[index]
+        if ordinal:
+            day = date.fromordinal(ordinal)
+            air_date = {
+                'date': datetime(day.year, day.month, day.day),
+                'year': day.year,
+                'month': day.month,
+                'day': day.day,
+                'month_name': MONTH_NAMES[day.month],
+                'formatted': day.isoformat()
+            }
+        else:
+            air_date = {}
+        
+        return {
+            '_id': self.ids[index],
+            'episode_num': self.episode_nums[index],
+            'painting_index': self.painting_indexes[index],
+            'title': self.titles[index],
+            'season': self.seasons[index],
+            'episode': self.episodes[index],
+            'air_date': air_date,
+            'colors': colors,
+            'subjects': subjects,
+            'youtube_url': self.youtube_urls[index],
+            'img_src': self.img_srcs[index],
+            'num_colors': len(colors),
+            'num_subjects': len(subjects)
+        }
+    
+    def materialize_many(self, indexes: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.materialize(index) for index in indexes]
+    
+    def page(self, skip: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Episodes in natural order, like find().skip().limit()"""
+        stop = len(self) if not limit else min(len(self), skip + limit)
+        return self.materialize_many(range(max(skip, 0), stop))
+    
+    def find_by_id(self, episode_id: str) -> Optional[Dict[str, Any]]:
+        """Look up an episode by ObjectId string, episode number or painting index"""
+        if self._id_index is None:
+            self._build_lookup_indexes()
+        
+        if ObjectId.is_valid(episode_id):
+            index = self._id_index.get(str(episode_id))
+        else:
+            try:
+                number = int(episode_id)
+            except (TypeError, ValueError):
+                return None
+            candidates = [
+                self._number_index['episode_num'].get(number),
+                self._number_index['painting_index'].get(number)
+            ]
+            candidates = [candidate for candidate in candidates if candidate is not None]
+            index = min(candidates) if candidates else None
+        
+        return self.materialize(index) if index is not None else None
+    
+    def warm(self):
+        """Build the lookup indexes and lowered vocabularies ahead of the first request"""
+        if self._id_index is None:
+            self._build_lookup_indexes()
+        self.colors.matching_codes('')
+        self.subjects.matching_codes('')
+    
+    def _build_lookup_indexes(self):
+        id_index = {}
+        episode_nums = {}
+        painting_indexes = {}
+        
+        for index in range(len(self)):
+            id_index.setdefault(self.ids[index], index)
+            episode_nums.setdefault(self.episode_nums[index], index)
+            painting_indexes.setdefault(self.painting_indexes[index], index)
+        
+        self._number_index = {'episode_num': episode_nums, 'painting_index': painting_indexes}
+        self._id_index = id_index
+    
+    def filter_indexes(self, filters: Dict[str, Any], match_type: str = 'any') -> List[int]:
+        """Row indexes matching the filters, with EpisodeFilter's substring semantics"""
+        combine = all if match_type == 'all' else any
+        checks = []
+        
+        if 'month' in filters:
+            month_name = filters['month'].lower()
+            month = MONTH_NAMES.index(month_name) if month_name in MONTH_NAMES[1:] else -1
+            months = self.months
+            checks.append(lambda index: months[index] == month)
+        
+        if 'subjects' in filters:
+            checks.append(self._list_check(
+                self.subjects, self.subject_offsets, self.subject_codes, filters['subjects'], combine
+            ))
+        
+        if 'colors' in filters:
+            checks.append(self._list_check(
+                self.colors, self.color_offsets, self.color_codes, filters['colors'], combine
+            ))
+        
+        if not checks:
+            return list(range(len(self)))
+        
+        return [
+            index for index in range(len(self))
+            if combine(check(index) for check in checks)
+        ]
+    
+    def _list_check(self, vocabulary: Vocabulary, offsets: array, codes: array,
+                    terms: List[str], combine):
+        term_codes = [vocabulary.matching_codes(term) for term in terms]
+        
+        def check(index: int) -> bool:
+            row_codes = codes[offsets[index]:offsets[index + 1]]
+            return combine(
+                any(code in matching for code in row_codes)
+                for matching in term_codes
+            )
+        
+        return check
+    
+    def filter(self, filters: Dict[str, Any], match_type: str = 'any') -> List[Dict[str, Any]]:
+        return self.materialize_many(self.filter_indexes(filters, match_type))
+    
+    def usage_counts(self):
+        """Episode counts per color name and per subject, in first-seen order"""
+        color_usage = {}
+        for code, count in sorted(Counter(self.color_codes).items()):
+            name = self.colors.names[code]
+            if name:
+                color_usage[name] = color_usage.get(name, 0) + count
+        
+        subject_usage = {}
+        for code, count in sorted(Counter(self.subject_codes).items()):
+            name = self.subjects.names[code]
+            subject_usage[name] = subject_usage.get(name, 0) + count
+        
+        return color_usage, subject_usage
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the store's columns"""
+        arrays = [
+            self.episode_nums, self.painting_indexes, self.seasons, self.episodes,
+            self.date_ordinals, self.months, self.color_offsets, self.color_codes,
+            self.subject_offsets, self.subject_codes
+        ]
+        total = sum(column.itemsize * len(column) for column in arrays)
+        
+        seen = set()
+        for column in [self.ids, self.titles, self.youtube_urls, self.img_srcs,
+                       self.colors.names, self.subjects.names]:
+            total += sys.getsizeof(column)
+            for value in column:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        
+        return total
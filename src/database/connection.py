@@ -2,6 +2,7 @@ import logging
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 from config import Config
+from .monitoring import query_monitor
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,8 @@ class DatabaseConnection:
             logger.info(f"Connecting to MongoDB at: {parsed_uri.netloc}")
             logger.info(f"Database name: {db_name}")
             
-            self._client = MongoClient(Config.MONGODB_URI)
+            listeners = [query_monitor] if Config.DB_MONITORING_ENABLED else []
+            self._client = MongoClient(Config.MONGODB_URI, event_listeners=listeners)
             
             self._client.admin.command('ping')
             logger.info("✅ MongoDB connection successful")
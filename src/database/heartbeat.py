@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def ping_database():
+    """Round trip to MongoDB, connecting first if needed"""
+    from .connection import get_client  # connecting at import time would block app startup
+    get_client().admin.command('ping')
+
+class Heartbeat:
+    """Background thread that pings MongoDB on an interval and keeps the result
+    
+    Health probes read the last result from memory instead of querying
+    the database themselves, so they cost microseconds and a slow
+    database cannot make them pile up.
+    """
+    
+    def __init__(self, interval: Optional[float] = None, ping: Optional[Callable[[], Any]] = None):
+        self.interval = Config.HEARTBEAT_INTERVAL_SECONDS if interval is None else interval
+        self.ping = ping or ping_database
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.state = {
+            'database': 'unknown',
+            'latency_ms': None,
+            'checked_at': None,
+            'last_ok_at': None,
+            'consecutive_failures': 0,
+            'error': None,
+            'checks': 0
+        }
+    
+    def check(self) -> Dict[str, Any]:
+        """Ping the database once and publish the result"""
+        start = time.perf_counter()
+        try:
+            self.ping()
+            error = None
+        except Exception as e:
+            error = str(e)
+        latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        
+        previous = self.state
+        now = time.time()
+        state = {
+            'database': 'connected' if error is None else 'disconnected',
+            'latency_ms': latency_ms,
+            'checked_at': now,
+            'last_ok_at': now if error is None else previous['last_ok_at'],
+            'consecutive_failures': 0 if error is None else previous['consecutive_failures'] + 1,
+            'error': error,
+            'checks': previous['checks'] + 1
+        }
+        
+        if error is not None and previous['database'] != 'disconnected':
+            logger.error(f"Heartbeat: database unreachable: {error}")
+        elif error is None and previous['database'] == 'disconnected':
+            logger.info(f"Heartbeat: database reachable again ({latency_ms} ms)")
+        
+        self.state = state
+        return state
+    
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Heartbeat check failed: {e}")
+            self._stop.wait(self.interval)
+    
+    def start(self):
+        """Start the thread once per process"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='heartbeat', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def is_stale(self) -> bool:
+        """True when the thread has not reported for several intervals"""
+        checked_at = self.state['checked_at']
+        if checked_at is None:
+            return False
+        return time.time() - checked_at > max(3 * self.interval, Config.HEARTBEAT_STALE_SECONDS)
+
+heartbeat = Heartbeat()
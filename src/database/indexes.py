@@ -0,0 +1,184 @@
+import logging
+import sys
+import os
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.database.models import Episode, Color, Subject
+
+logger = logging.getLogger(__name__)
+
+class IndexAdvisor:
+    """Explain the API's query shapes and report which ones miss an index"""
+    
+    models = [Episode, Color, Subject]
+    
+    def __init__(self):
+        self.sample = self.load_sample_values()
+    
+    def load_sample_values(self) -> Dict[str, Any]:
+        """Pick real values from the data so the explained queries are realistic"""
+        sample = {
+            'episode_num': 1,
+            'month': 'january',
+            'subjects': ['Trees', 'Mountain'],
+            'colors': ['Titanium White', 'Prussian Blue']
+        }
+        
+        try:
+            episode = Episode.get_collection().find_one(
+                {'subjects.1': {'$exists': True}, 'colors.1': {'$exists': True}}
+            )
+            if episode:
+                sample['episode_num'] = episode['episode_num']
+                sample['month'] = episode.get('air_date', {}).get('month_name', sample['month'])
+                sample['subjects'] = episode['subjects'][:2]
+                sample['colors'] = [color['name'] for color in episode['colors'][:2]]
+        except Exception as e:
+            logger.warning(f"Could not load sample values, using defaults: {e}")
+        
+        return sample
+    
+    def query_shapes(self) -> List[Dict[str, Any]]:
+        """Queries issued by the API, built with the models' own query builders"""
+        sample = self.sample
+        shapes = [
+            {'name': 'Episode.find_by_id (number)', 'model': Episode,
+             'query': Episode.build_id_query(str(sample['episode_num']))}
+        ]
+        
+        filter_cases = [
+            ('month', {'month': sample['month']}),
+            ('subjects', {'subjects': sample['subjects']}),
+            ('colors', {'colors': sample['colors']}),
+            ('month+subjects+colors', {
+                'month': sample['month'],
+                'subjects': sample['subjects'],
+                'colors': sample['colors']
+            })
+        ]
+        
+        for label, filters in filter_cases:
+            for match_type in ['any', 'all']:
+                shapes.append({
+                    'name': f"Episode.filter_episodes ({label}, {match_type})",
+                    'model': Episode,
+                    'query': Episode.build_filter_query(filters, match_type)
+                })
+        
+        return shapes
+    
+    @staticmethod
+    def plan_stages(plan: Optional[Dict]) -> List[Dict]:
+        """Flatten a winning plan tree into its stages"""
+        if not plan:
+            return []
+        
+        stages = [plan]
+        
+        if 'queryPlan' in plan:
+            stages.extend(IndexAdvisor.plan_stages(plan['queryPlan']))
+        if 'inputStage' in plan:
+            stages.extend(IndexAdvisor.plan_stages(plan['inputStage']))
+        for child in plan.get('inputStages', []):
+            stages.extend(IndexAdvisor.plan_stages(child))
+        
+        return stages
+    
+    @staticmethod
+    def summarize_explain(explain: Dict) -> Dict[str, Any]:
+        """Reduce explain() output to the fields the report needs"""
+        winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+        stages = IndexAdvisor.plan_stages(winning_plan)
+        stage_names = [stage.get('stage') for stage in stages if stage.get('stage')]
+        index_names = [stage['indexName'] for stage in stages if 'indexName' in stage]
+        execution = explain.get('executionStats', {})
+        
+        return {
+            'stages': stage_names,
+            'indexes_used': index_names,
+            'uses_index': 'COLLSCAN' not in stage_names and bool(index_names),
+            'docs_examined': execution.get('totalDocsExamined'),
+            'keys_examined': execution.get('totalKeysExamined'),
+            'n_returned': execution.get('nReturned')
+        }
+    
+    def explain(self, shape: Dict[str, Any]) -> Dict[str, Any]:
+        """Run explain() for a single query shape"""
+        collection = shape['model'].get_collection()
+        explain = collection.find(shape['query']).explain()
+        
+        result = self.summarize_explain(explain)
+        result['name'] = shape['name']
+        result['collection'] = shape['model'].collection_name
+        result['query'] = shape['query']
+        return result
+    
+    def run(self) -> List[Dict[str, Any]]:
+        """Explain every query shape"""
+        report = []
+        
+        for shape in self.query_shapes():
+            try:
+                report.append(self.explain(shape))
+            except Exception as e:
+                logger.error(f"Error explaining {shape['name']}: {e}")
+                report.append({
+                    'name': shape['name'],
+                    'collection': shape['model'].collection_name,
+                    'query': shape['query'],
+                    'uses_index': False,
+                    'error': str(e)
+                })
+        
+        return report
+    
+    def ensure_all_indexes(self) -> Dict[str, List[str]]:
+        """Create the declared indexes on every collection"""
+        return {model.collection_name: model.ensure_indexes() for model in self.models}
+
+def main():
+    """Index advisor CLI"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Report API queries that miss an index')
+    parser.add_argument('--create', action='store_true',
+                        help='create the declared indexes before explaining')
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    advisor = IndexAdvisor()
+    
+    if args.create:
+        for collection_name, names in advisor.ensure_all_indexes().items():
+            print(f"🔧 {collection_name}: {', '.join(names) or 'no indexes created'}")
+        print("")
+    
+    report = advisor.run()
+    missing = [entry for entry in report if not entry['uses_index']]
+    
+    for entry in report:
+        status = '✅' if entry['uses_index'] else '❌'
+        print(f"{status} {entry['name']}")
+        if 'error' in entry:
+            print(f"   error: {entry['error']}")
+            continue
+        print(f"   plan: {' <- '.join(entry['stages'])}")
+        print(f"   indexes: {', '.join(entry['indexes_used']) or '-'}")
+        print(f"   examined: {entry['keys_examined']} keys, {entry['docs_examined']} docs, "
+              f"returned {entry['n_returned']}")
+    
+    print("")
+    if missing:
+        print(f"❌ {len(missing)} of {len(report)} queries miss an index")
+        sys.exit(1)
+    
+    print(f"✅ All {len(report)} queries use an index")
+
+if __name__ == "__main__":
+    main()
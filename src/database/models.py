@@ -1,57 +1,351 @@
 from bson import ObjectId
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from itertools import islice
+from pymongo import ASCENDING, DeleteMany, IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import List, Dict, Optional, Any, Iterable, Iterator
+import contextvars
 import logging
-from .connection import get_collection
+import re
+import uuid
+from config import Config
+from .cache import Uncached, cached
+from .monitoring import monitored
+from .connection import get_collection, get_database
 
 logger = logging.getLogger(__name__)
 
+MAX_REPORTED_ERRORS = 100
+STAGING_MARKER = '_staging_'
+PREVIOUS_MARKER = '_previous_'
+
+def stream_documents(collection, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+                     batch_size: Optional[int] = None, limit: Optional[int] = None,
+                     skip: Optional[int] = None) -> Iterator[Dict]:
+    """Yield documents batch by batch, converting _id as each one arrives"""
+    cursor = collection.find(
+        query or {},
+        projection,
+        batch_size=batch_size or Config.CURSOR_BATCH_SIZE
+    )
+    
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    
+    try:
+        for document in cursor:
+            if '_id' in document:
+                document['_id'] = str(document['_id'])
+            yield document
+    finally:
+        # Kill the server-side cursor now when a consumer stops early
+        cursor.close()
+
+def insert_chunk(collection, number: int, offset: int, chunk: List[Dict]) -> Dict[str, Any]:
+    """Insert one chunk unordered, so a bad document only fails itself"""
+    try:
+        result = collection.insert_many(chunk, ordered=False)
+        return {'chunk': number, 'inserted': len(result.inserted_ids), 'errors': []}
+    except BulkWriteError as e:
+        errors = [
+            {
+                'chunk': number,
+                'index': offset + error['index'],
+                'code': error.get('code'),
+                'message': error.get('errmsg')
+            }
+            for error in e.details.get('writeErrors', [])
+        ]
+        return {'chunk': number, 'inserted': e.details.get('nInserted', 0), 'errors': errors}
+    except Exception as e:
+        return {
+            'chunk': number,
+            'inserted': 0,
+            'errors': [{'chunk': number, 'index': None, 'code': None, 'message': str(e)}]
+        }
+
+def bulk_insert_documents(collection, documents: Iterable[Dict], batch_size: Optional[int] = None,
+                          workers: Optional[int] = None) -> Dict[str, Any]:
+    """Insert documents in unordered chunks submitted in parallel
+    
+    At most two chunks per worker are held in memory at a time, so the
+    input can be a generator. Returns inserted/failed counts per load and
+    the first MAX_REPORTED_ERRORS write errors.
+    """
+    batch_size = batch_size or Config.ETL_BATCH_SIZE
+    workers = workers or Config.ETL_WRITE_WORKERS
+    totals = {'inserted': 0, 'failed': 0, 'chunks': 0, 'failed_chunks': 0, 'errors': []}
+    
+    def record(future, sizes):
+        outcome = future.result()
+        failed = sizes.pop(outcome['chunk']) - outcome['inserted']
+        totals['inserted'] += outcome['inserted']
+        totals['failed'] += failed
+        if failed:
+            totals['failed_chunks'] += 1
+            room = MAX_REPORTED_ERRORS - len(totals['errors'])
+            totals['errors'].extend(outcome['errors'][:max(room, 0)])
+    
+    iterator = iter(documents)
+    sizes = {}
+    pending = set()
+    offset = 0
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                break
+            
+            number = totals['chunks']
+            sizes[number] = len(chunk)
+            # Run in a copy of this context so the writes keep the caller's query attribution
+            pending.add(executor.submit(
+                contextvars.copy_context().run, insert_chunk, collection, number, offset, chunk
+            ))
+            totals['chunks'] += 1
+            offset += len(chunk)
+            
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future, sizes)
+        
+        for future in pending:
+            record(future, sizes)
+    
+    return totals
+
+def ensure_collection_indexes(collection_name: str, indexes: List[IndexModel], collection=None) -> List[str]:
+    """Create a model's declared indexes on its live collection, or on the given (staging) one"""
+    try:
+        collection = collection if collection is not None else get_collection(collection_name)
+        names = collection.create_indexes(indexes)
+        logger.info(f"Ensured {len(names)} indexes on {collection.name}")
+        return names
+    except Exception as e:
+        logger.error(f"Error creating indexes on {collection_name}: {e}")
+        return []
+
+def staging_collection_name(collection_name: str, version: str) -> str:
+    return f"{collection_name}{STAGING_MARKER}{version}"
+
+def create_staging_collection(collection_name: str, version: str):
+    """Create an empty, versioned staging collection next to the live one"""
+    db = get_database()
+    name = staging_collection_name(collection_name, version)
+    if name in db.list_collection_names():
+        db.drop_collection(name)
+    return db.create_collection(name)
+
+def previous_collection_name(collection_name: str, version: str) -> str:
+    return f"{collection_name}{PREVIOUS_MARKER}{version}"
+
+def keep_previous_collection(collection_name: str, version: str):
+    """Copy the live collection aside before a promotion, returning the copy (None without a live one)
+    
+    $out does not carry indexes over, so callers create them on the copy
+    before relying on it.
+    """
+    db = get_database()
+    if collection_name not in db.list_collection_names():
+        return None
+    
+    name = previous_collection_name(collection_name, version)
+    db[collection_name].aggregate([{'$out': name}])
+    return db[name]
+    
+def promote_staging_collection(collection_name: str, version: str):
+    """Atomically replace the live collection with its staging copy"""
+    db = get_database()
+    db[staging_collection_name(collection_name, version)].rename(collection_name, dropTarget=True)
+    logger.info(f"Promoted staging collection for {collection_name} (version {version})")
+
+def restore_previous_collection(collection_name: str, version: str, had_live: bool):
+    """Undo a promotion by renaming the kept copy over the live collection, again atomically"""
+    db = get_database()
+    if had_live:
+        db[previous_collection_name(collection_name, version)].rename(collection_name, dropTarget=True)
+    else:
+        db.drop_collection(collection_name)
+    logger.info(f"Restored live collection {collection_name} after a failed promotion of version {version}")
+
+def drop_previous_collection(collection_name: str, version: str):
+    """Drop the copy kept for a rollback"""
+    get_database().drop_collection(previous_collection_name(collection_name, version))
+
+def drop_staging_collections(collection_name: str, version: Optional[str] = None) -> List[str]:
+    """Drop one version's staging collection, or every leftover one"""
+    db = get_database()
+    if version:
+        names = [staging_collection_name(collection_name, version)]
+    else:
+        prefix = f"{collection_name}{STAGING_MARKER}"
+        names = [name for name in db.list_collection_names() if name.startswith(prefix)]
+    
+    for name in names:
+        db.drop_collection(name)
+    return names
+
+def apply_membership_changes(collection, added: Dict[str, List[int]], removed: Dict[str, List[int]],
+                             attributes: Optional[Dict[str, Dict]] = None) -> Dict[str, int]:
+    """Update name -> episodes aggregate documents in place
+    
+    Episode numbers are pulled from and pushed onto each document's
+    episodes list with episode_count adjusted to match. attributes are
+    set on new and existing documents alike, so a corrected value in the
+    source reaches the collection as a full load would. Documents left
+    without episodes are deleted.
+    """
+    attributes = attributes or {}
+    operations = []
+    
+    for name, episode_nums in removed.items():
+        operations.append(UpdateOne(
+            {'name': name},
+            {'$pullAll': {'episodes': episode_nums}, '$inc': {'episode_count': -len(episode_nums)}}
+        ))
+    
+    for name, episode_nums in added.items():
+        update = {
+            '$push': {'episodes': {'$each': episode_nums}},
+            '$inc': {'episode_count': len(episode_nums)}
+        }
+        if attributes.get(name):
+            update['$set'] = attributes[name]
+        operations.append(UpdateOne({'name': name}, update, upsert=True))
+    
+    for name, values in attributes.items():
+        if name not in added and values:
+            operations.append(UpdateOne({'name': name}, {'$set': values}))
+    
+    if not operations:
+        return {'updated': 0, 'created': 0, 'deleted': 0}
+    
+    touched = sorted(set(added) | set(removed))
+    operations.append(DeleteMany({'name': {'$in': touched}, 'episode_count': {'$lte': 0}}))
+    
+    result = collection.bulk_write(operations, ordered=True)
+    return {
+        'updated': result.modified_count,
+        'created': result.upserted_count,
+        'deleted': result.deleted_count
+    }
+
 class Episode:
     """Episode model for MongoDB operations"""
     
     collection_name = 'episodes'
     
+    indexes = [
+        IndexModel([('episode_num', ASCENDING)], name='episode_num_1', unique=True),
+        IndexModel([('painting_index', ASCENDING)], name='painting_index_1'),
+        IndexModel([('air_date.month_name', ASCENDING)], name='air_date_month_name_1'),
+        IndexModel([('subjects', ASCENDING)], name='subjects_1'),
+        IndexModel([('colors.name', ASCENDING)], name='colors_name_1')
+    ]
+    
     @classmethod
     def get_collection(cls):
         return get_collection(cls.collection_name)
     
     @classmethod
+    def ensure_indexes(cls, collection=None) -> List[str]:
+        """Create the declared indexes (multikey on the array fields)"""
+        return ensure_collection_indexes(cls.collection_name, cls.indexes, collection)
+    
+    @staticmethod
+    def build_id_query(episode_id: str) -> Dict:
+        """Build the lookup query for an ObjectId or an episode/painting number"""
+        try:
+            return {'_id': ObjectId(episode_id)}
+        except Exception:
+            return {
+                '$or': [
+                    {'episode_num': int(episode_id)},
+                    {'painting_index': int(episode_id)}
+                ]
+            }
+    
+    @staticmethod
+    def build_filter_query(filters: Dict[str, Any], match_type: str = 'any') -> Dict:
+        """Build the MongoDB query used by filter_episodes"""
+        query = {}
+        
+        if 'month' in filters and filters['month']:
+            month = filters['month'].strip().lower()
+            query['air_date.month_name'] = {'$regex': f"^{re.escape(month)}"}
+        
+        if 'subjects' in filters and filters['subjects']:
+            subjects = [s.strip() for s in filters['subjects']]
+            if match_type == 'all':
+                query['subjects'] = {'$all': subjects}
+            else:
+                query['subjects'] = {'$in': subjects}
+        
+        if 'colors' in filters and filters['colors']:
+            colors = [c.strip() for c in filters['colors']]
+            if match_type == 'all':
+                query['colors.name'] = {'$all': colors}
+            else:
+                query['colors.name'] = {'$in': colors}
+        
+        return query
+    
+    @classmethod
+    @monitored
+    def iter_all(cls, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+                 batch_size: Optional[int] = None, limit: Optional[int] = None,
+                 skip: Optional[int] = None, raise_errors: bool = False) -> Iterator[Dict]:
+        """Stream episodes without materializing the whole collection
+        
+        Errors end the stream early unless raise_errors is set, for callers
+        that must not mistake a failed read for a short collection.
+        """
+        try:
+            yield from stream_documents(
+                cls.get_collection(), query, projection, batch_size, limit, skip
+            )
+        except Exception as e:
+            logger.error(f"Error streaming episodes: {e}")
+            if raise_errors:
+                raise
+    
+    @classmethod
+    @monitored
+    @cached
     def find_all(cls, limit: Optional[int] = None, skip: Optional[int] = None) -> List[Dict]:
         """Get all episodes"""
         try:
-            collection = cls.get_collection()
-            cursor = collection.find()
-            
-            if skip:
-                cursor = cursor.skip(skip)
-            if limit:
-                cursor = cursor.limit(limit)
-                
-            episodes = list(cursor)
-            
-            for episode in episodes:
-                episode['_id'] = str(episode['_id'])
-            
-            return episodes
+            return list(stream_documents(cls.get_collection(), limit=limit, skip=skip))
         except Exception as e:
             logger.error(f"Error finding all episodes: {e}")
-            return []
+            return Uncached([])
+    
+    @classmethod
+    @monitored
+    def count(cls, query: Optional[Dict] = None) -> int:
+        """Count episodes without fetching them"""
+        try:
+            collection = cls.get_collection()
+            if not query:
+                return collection.estimated_document_count()
+            return collection.count_documents(query)
+        except Exception as e:
+            logger.error(f"Error counting episodes: {e}")
+            return 0
     
     @classmethod
+    @monitored
+    @cached
     def find_by_id(cls, episode_id: str) -> Optional[Dict]:
         """Get episode by ID"""
         try:
             collection = cls.get_collection()
-            
-            try:
-                object_id = ObjectId(episode_id)
-                episode = collection.find_one({'_id': object_id})
-            except:
-                episode = collection.find_one({
-                    '$or': [
-                        {'episode_num': int(episode_id)},
-                        {'painting_index': int(episode_id)}
-                    ]
-                })
+            episode = collection.find_one(cls.build_id_query(episode_id))
             
             if episode:
                 episode['_id'] = str(episode['_id'])
@@ -59,43 +353,24 @@ class Episode:
             return episode
         except Exception as e:
             logger.error(f"Error finding episode by ID {episode_id}: {e}")
-            return None
+            return Uncached(None)
     
     @classmethod
+    @monitored
+    @cached
     def filter_episodes(cls, filters: Dict[str, Any], match_type: str = 'any') -> List[Dict]:
         """Filter episodes based on criteria"""
         try:
             collection = cls.get_collection()
-            query = {}
-            
-            if 'month' in filters and filters['month']:
-                query['air_date.month_name'] = {'$regex': f"^{filters['month']}", '$options': 'i'}
-            
-            if 'subjects' in filters and filters['subjects']:
-                subjects = [s.strip() for s in filters['subjects']]
-                if match_type == 'all':
-                    query['subjects'] = {'$all': subjects}
-                else:
-                    query['subjects'] = {'$in': subjects}
-            
-            if 'colors' in filters and filters['colors']:
-                colors = [c.strip() for c in filters['colors']]
-                if match_type == 'all':
-                    query['colors.name'] = {'$all': colors}
-                else:
-                    query['colors.name'] = {'$in': colors}
+            query = cls.build_filter_query(filters, match_type)
             
-            episodes = list(collection.find(query))
-            
-            for episode in episodes:
-                episode['_id'] = str(episode['_id'])
-            
-            return episodes
+            return list(stream_documents(collection, query))
         except Exception as e:
             logger.error(f"Error filtering episodes: {e}")
-            return []
+            return Uncached([])
     
     @classmethod
+    @monitored
     def insert_one(cls, episode_data: Dict) -> Optional[str]:
         """Insert a single episode"""
         try:
@@ -107,6 +382,40 @@ class Episode:
             return None
     
     @classmethod
+    @monitored
+    def bulk_insert(cls, episodes_data: Iterable[Dict], batch_size: Optional[int] = None,
+                    workers: Optional[int] = None, collection=None) -> Dict[str, Any]:
+        """Insert episodes in chunked, unordered, parallel batches"""
+        collection = collection if collection is not None else cls.get_collection()
+        return bulk_insert_documents(collection, episodes_data, batch_size, workers)
+    
+    @classmethod
+    @monitored
+    def apply_changes(cls, upserts: List[Dict], deleted_nums: List[int]) -> Optional[Dict[str, int]]:
+        """Replace or insert episodes by episode_num and delete removed ones"""
+        try:
+            operations = [
+                ReplaceOne({'episode_num': episode['episode_num']}, episode, upsert=True)
+                for episode in upserts
+            ]
+            if deleted_nums:
+                operations.append(DeleteMany({'episode_num': {'$in': deleted_nums}}))
+            
+            if not operations:
+                return {'upserted': 0, 'modified': 0, 'deleted': 0}
+            
+            result = cls.get_collection().bulk_write(operations, ordered=False)
+            return {
+                'upserted': result.upserted_count,
+                'modified': result.modified_count,
+                'deleted': result.deleted_count
+            }
+        except Exception as e:
+            logger.error(f"Error applying episode changes: {e}")
+            return None
+    
+    @classmethod
+    @monitored
     def insert_many(cls, episodes_data: List[Dict]) -> List[str]:
         """Insert multiple episodes"""
         try:
@@ -118,6 +427,7 @@ class Episode:
             return []
     
     @classmethod
+    @monitored
     def delete_all(cls):
         """Delete all episodes"""
         try:
@@ -134,26 +444,72 @@ class Color:
     
     collection_name = 'colors'
     
+    indexes = [
+        IndexModel([('name', ASCENDING)], name='name_1', unique=True)
+    ]
+    
     @classmethod
     def get_collection(cls):
         return get_collection(cls.collection_name)
     
     @classmethod
+    def ensure_indexes(cls, collection=None) -> List[str]:
+        """Create the declared indexes"""
+        return ensure_collection_indexes(cls.collection_name, cls.indexes, collection)
+    
+    @classmethod
+    @monitored
+    def iter_all(cls, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+                 batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """Stream colors without materializing the whole collection"""
+        try:
+            yield from stream_documents(cls.get_collection(), query, projection, batch_size)
+        except Exception as e:
+            logger.error(f"Error streaming colors: {e}")
+    
+    @classmethod
+    @monitored
+    @cached
     def find_all(cls) -> List[Dict]:
         """Get all colors"""
         try:
-            collection = cls.get_collection()
-            colors = list(collection.find())
-            
-            for color in colors:
-                color['_id'] = str(color['_id'])
-            
-            return colors
+            return list(stream_documents(cls.get_collection()))
         except Exception as e:
             logger.error(f"Error finding all colors: {e}")
-            return []
+            return Uncached([])
+    
+    @classmethod
+    @monitored
+    def count(cls) -> int:
+        """Count colors without fetching them"""
+        try:
+            return cls.get_collection().estimated_document_count()
+        except Exception as e:
+            logger.error(f"Error counting colors: {e}")
+            return 0
     
     @classmethod
+    @monitored
+    def bulk_insert(cls, colors_data: Iterable[Dict], batch_size: Optional[int] = None,
+                    workers: Optional[int] = None, collection=None) -> Dict[str, Any]:
+        """Insert colors in chunked, unordered, parallel batches"""
+        collection = collection if collection is not None else cls.get_collection()
+        return bulk_insert_documents(collection, colors_data, batch_size, workers)
+    
+    @classmethod
+    @monitored
+    def apply_membership_changes(cls, added: Dict[str, List[int]], removed: Dict[str, List[int]],
+                                 hexes: Optional[Dict[str, str]] = None) -> Optional[Dict[str, int]]:
+        """Move episodes between colors without rewriting the collection"""
+        try:
+            attributes = {name: {'hex': hex_value} for name, hex_value in (hexes or {}).items()}
+            return apply_membership_changes(cls.get_collection(), added, removed, attributes)
+        except Exception as e:
+            logger.error(f"Error updating colors: {e}")
+            return None
+    
+    @classmethod
+    @monitored
     def insert_many(cls, colors_data: List[Dict]) -> List[str]:
         """Insert multiple colors"""
         try:
@@ -165,6 +521,7 @@ class Color:
             return []
     
     @classmethod
+    @monitored
     def delete_all(cls):
         """Delete all colors"""
         try:
@@ -181,26 +538,71 @@ class Subject:
     
     collection_name = 'subjects'
     
+    indexes = [
+        IndexModel([('name', ASCENDING)], name='name_1', unique=True)
+    ]
+    
     @classmethod
     def get_collection(cls):
         return get_collection(cls.collection_name)
     
     @classmethod
+    def ensure_indexes(cls, collection=None) -> List[str]:
+        """Create the declared indexes"""
+        return ensure_collection_indexes(cls.collection_name, cls.indexes, collection)
+    
+    @classmethod
+    @monitored
+    def iter_all(cls, query: Optional[Dict] = None, projection: Optional[Dict] = None,
+                 batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """Stream subjects without materializing the whole collection"""
+        try:
+            yield from stream_documents(cls.get_collection(), query, projection, batch_size)
+        except Exception as e:
+            logger.error(f"Error streaming subjects: {e}")
+    
+    @classmethod
+    @monitored
+    @cached
     def find_all(cls) -> List[Dict]:
         """Get all subjects"""
         try:
-            collection = cls.get_collection()
-            subjects = list(collection.find())
-            
-            for subject in subjects:
-                subject['_id'] = str(subject['_id'])
-            
-            return subjects
+            return list(stream_documents(cls.get_collection()))
         except Exception as e:
             logger.error(f"Error finding all subjects: {e}")
-            return []
+            return Uncached([])
+    
+    @classmethod
+    @monitored
+    def count(cls) -> int:
+        """Count subjects without fetching them"""
+        try:
+            return cls.get_collection().estimated_document_count()
+        except Exception as e:
+            logger.error(f"Error counting subjects: {e}")
+            return 0
+    
+    @classmethod
+    @monitored
+    def bulk_insert(cls, subjects_data: Iterable[Dict], batch_size: Optional[int] = None,
+                    workers: Optional[int] = None, collection=None) -> Dict[str, Any]:
+        """Insert subjects in chunked, unordered, parallel batches"""
+        collection = collection if collection is not None else cls.get_collection()
+        return bulk_insert_documents(collection, subjects_data, batch_size, workers)
+    
+    @classmethod
+    @monitored
+    def apply_membership_changes(cls, added: Dict[str, List[int]],
+                                 removed: Dict[str, List[int]]) -> Optional[Dict[str, int]]:
+        """Move episodes between subjects without rewriting the collection"""
+        try:
+            return apply_membership_changes(cls.get_collection(), added, removed)
+        except Exception as e:
+            logger.error(f"Error updating subjects: {e}")
+            return None
     
     @classmethod
+    @monitored
     def insert_many(cls, subjects_data: List[Dict]) -> List[str]:
         """Insert multiple subjects"""
         try:
@@ -212,6 +614,7 @@ class Subject:
             return []
     
     @classmethod
+    @monitored
     def delete_all(cls):
         """Delete all subjects"""
         try:
@@ -222,3 +625,130 @@ class Subject:
         except Exception as e:
             logger.error(f"Error deleting subjects: {e}")
             return 0
+
+class Meta:
+    """Dataset metadata (version stamp) used for cache invalidation"""
+    
+    collection_name = 'meta'
+    dataset_id = 'dataset'
+    etl_state_id = 'etl_state'
+    # One document per episode, {_id: episode number, digest}: a map in the state
+    # document would pass the 16 MB document limit at a few hundred thousand episodes
+    rows_collection_name = 'etl_rows'
+    
+    @classmethod
+    def get_collection(cls):
+        return get_collection(cls.collection_name)
+    
+    @classmethod
+    def get_rows_collection(cls):
+        return get_collection(cls.rows_collection_name)
+    
+    @classmethod
+    @monitored
+    def get_dataset_version(cls) -> Optional[str]:
+        """Get the version written by the last ETL run"""
+        try:
+            collection = cls.get_collection()
+            document = collection.find_one({'_id': cls.dataset_id}, {'version': 1})
+            return document.get('version') if document else None
+        except Exception as e:
+            logger.error(f"Error reading dataset version: {e}")
+            return None
+    
+    @classmethod
+    @monitored
+    def set_dataset_version(cls, version: Optional[str] = None) -> Optional[str]:
+        """Stamp the dataset with a new version"""
+        try:
+            version = version or uuid.uuid4().hex
+            collection = cls.get_collection()
+            collection.update_one(
+                {'_id': cls.dataset_id},
+                {'$set': {'version': version, 'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+            logger.info(f"Dataset version set to {version}")
+            return version
+        except Exception as e:
+            logger.error(f"Error writing dataset version: {e}")
+            return None
+
+    @classmethod
+    @monitored
+    def get_etl_state(cls) -> Optional[Dict]:
+        """Get the source and row hashes recorded by the last ETL run
+        
+        Returns None when the row hashes do not add up to the count the
+        state was written with, so an interrupted write forces a full load.
+        """
+        try:
+            state = cls.get_collection().find_one({'_id': cls.etl_state_id})
+            if not state:
+                return None
+            
+            rows = {
+                document['_id']: document['digest']
+                for document in cls.get_rows_collection().find({}, batch_size=Config.CURSOR_BATCH_SIZE)
+            }
+            if len(rows) != state.get('row_count'):
+                logger.warning(f"ETL state lists {state.get('row_count')} rows but {len(rows)} are stored, ignoring it")
+                return None
+            
+            state['rows'] = rows
+            return state
+        except Exception as e:
+            logger.error(f"Error reading ETL state: {e}")
+            return None
+    
+    @classmethod
+    @monitored
+    def set_etl_state(cls, version: str, files: Dict[str, str], rows: Dict[str, str],
+                      changes: Optional[Dict[str, List[int]]] = None) -> bool:
+        """Record the source and row hashes the given dataset version was built from
+        
+        With changes (as from diff_digests) only the added, changed and
+        removed rows are written; without them every row is replaced.
+        """
+        try:
+            collection = cls.get_collection()
+            # Drop the state first, so a failure part way leaves none rather than a wrong one
+            collection.delete_one({'_id': cls.etl_state_id})
+            
+            rows_collection = cls.get_rows_collection()
+            if changes is None:
+                rows_collection.delete_many({})
+                result = bulk_insert_documents(
+                    rows_collection, ({'_id': num, 'digest': digest} for num, digest in rows.items())
+                )
+                if result['failed']:
+                    raise RuntimeError(f"{result['failed']} row hashes were not written")
+            else:
+                operations = [
+                    ReplaceOne({'_id': str(num)}, {'digest': rows[str(num)]}, upsert=True)
+                    for num in changes['added'] + changes['changed']
+                ]
+                if changes['removed']:
+                    operations.append(DeleteMany({'_id': {'$in': [str(num) for num in changes['removed']]}}))
+                if operations:
+                    rows_collection.bulk_write(operations, ordered=False)
+            
+            collection.replace_one(
+                {'_id': cls.etl_state_id},
+                {'version': version, 'files': files, 'row_count': len(rows), 'updated_at': datetime.utcnow()},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error writing ETL state: {e}")
+            return False
+    
+    @classmethod
+    @monitored
+    def clear_etl_state(cls):
+        """Forget the recorded hashes so the next incremental run reloads everything"""
+        try:
+            cls.get_collection().delete_one({'_id': cls.etl_state_id})
+            cls.get_rows_collection().delete_many({})
+        except Exception as e:
+            logger.error(f"Error clearing ETL state: {e}")
@@ -0,0 +1,241 @@
+import bson
+import contextvars
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+import threading
+import time
+from pymongo import monitoring
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+current_operation = contextvars.ContextVar('current_operation', default=None)
+
+UNATTRIBUTED = '<none>'
+MAX_SHAPE_DEPTH = 6
+
+# Where each command keeps its query, so slow entries can show the filter shape
+QUERY_FIELDS = {
+    'find': 'filter',
+    'aggregate': 'pipeline',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query'
+}
+
+def query_shape(value: Any, depth: int = 0) -> Any:
+    """Replace the literal values of a query with '?', keeping its field and operator structure"""
+    if depth > MAX_SHAPE_DEPTH:
+        return '...'
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value]
+        return ['?'] if value else []
+    return '?'
+
+def command_query(command_name: str, command: Dict) -> Any:
+    if command_name in QUERY_FIELDS:
+        return command.get(QUERY_FIELDS[command_name])
+    if command_name in ('update', 'delete'):
+        statements = command.get(f"{command_name}s") or []
+        return statements[0].get('q') if statements else None
+    return None
+
+def documents_returned(command_name: str, reply: Dict) -> int:
+    """Documents in a reply: the cursor batch for reads, the affected count for writes"""
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    if command_name == 'findAndModify':
+        return 1 if reply.get('value') is not None else 0
+    n = reply.get('n', 0)
+    return n if isinstance(n, int) else 0
+
+class QueryMonitor(monitoring.CommandListener):
+    """pymongo command listener that aggregates query cost per command and per model method
+    
+    pymongo calls the listener on the thread that ran the command, so the
+    model method in current_operation at that point is the one that issued
+    it. Each event costs a dictionary update under a lock; the query
+    shape of a command is only computed when it makes the slowest list.
+    """
+    
+    def __init__(self, slow_query_ms: Optional[float] = None, keep_slowest: Optional[int] = None,
+                 measure_bytes: Optional[bool] = None):
+        self.slow_query_ms = Config.DB_SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms
+        self.keep_slowest = Config.DB_SLOW_QUERY_KEEP if keep_slowest is None else keep_slowest
+        self.measure_bytes = Config.DB_MONITOR_BYTES if measure_bytes is None else measure_bytes
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._commands = {}
+        self._operations = {}
+        self._slowest = []
+        self._sequence = itertools.count()
+    
+    def started(self, event):
+        command_name = event.command_name
+        collection = event.command.get('collection') if command_name == 'getMore' else event.command.get(command_name)
+        self._pending[(event.connection_id, event.request_id)] = (
+            command_name,
+            collection if isinstance(collection, str) else None,
+            command_query(command_name, event.command),
+            current_operation.get() or UNATTRIBUTED
+        )
+    
+    def succeeded(self, event):
+        started = self._pending.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        
+        reply = event.reply or {}
+        documents = documents_returned(event.command_name, reply)
+        size = len(bson.encode(reply)) if self.measure_bytes and reply else 0
+        self.record(started, event.duration_micros / 1000, documents, size, failed=False)
+    
+    def failed(self, event):
+        started = self._pending.pop((event.connection_id, event.request_id), None)
+        if started is not None:
+            self.record(started, event.duration_micros / 1000, 0, 0, failed=True)
+    
+    def record(self, started: tuple, duration_ms: float, documents: int, size: int, failed: bool):
+        command_name, collection, query, operation = started
+        with self._lock:
+            for totals in (
+                self._commands.setdefault((command_name, collection), new_totals()),
+                self._operations.setdefault(operation, new_totals())
+            ):
+                totals['commands'] += 1
+                totals['failures'] += failed
+                totals['duration_ms'] += duration_ms
+                totals['max_ms'] = max(totals['max_ms'], duration_ms)
+                totals['documents'] += documents
+                totals['bytes'] += size
+            
+            if self.keep_slowest > 0 and (len(self._slowest) < self.keep_slowest or duration_ms > self._slowest[0][0]):
+                entry = {
+                    'command': command_name,
+                    'collection': collection,
+                    'operation': operation,
+                    'duration_ms': round(duration_ms, 3),
+                    'documents': documents,
+                    'bytes': size,
+                    'failed': failed,
+                    'shape': query_shape(query) if query is not None else None,
+                    'at': time.time()
+                }
+                item = (duration_ms, next(self._sequence), entry)
+                if len(self._slowest) >= self.keep_slowest:
+                    heapq.heapreplace(self._slowest, item)
+                else:
+                    heapq.heappush(self._slowest, item)
+        
+        if duration_ms >= self.slow_query_ms:
+            shape = query_shape(query) if query is not None else None
+            logger.warning(f"Slow MongoDB {command_name} on {collection} from {operation}: {duration_ms:.1f} ms, shape {shape}")
+    
+    def count_call(self, operation: str):
+        with self._lock:
+            self._operations.setdefault(operation, new_totals())['calls'] += 1
+    
+    def slowest(self) -> List[Dict[str, Any]]:
+        """The slowest recorded commands, slowest first"""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters per command and per model method, plus the slowest commands"""
+        with self._lock:
+            commands = [
+                {'command': name, 'collection': collection, **totals}
+                for (name, collection), totals in sorted(self._commands.items(), key=lambda x: (x[0][0], x[0][1] or ''))
+            ]
+            operations = {name: dict(totals) for name, totals in sorted(self._operations.items())}
+        return {'commands': commands, 'operations': operations, 'slowest': self.slowest()}
+    
+    def render(self) -> str:
+        """Per-method counters in the Prometheus text format"""
+        with self._lock:
+            operations = sorted((name, dict(totals)) for name, totals in self._operations.items())
+        
+        metrics = [
+            ('mongodb_operation_calls_total', 'counter', 'Model method calls.', 'calls'),
+            ('mongodb_commands_total', 'counter', 'MongoDB commands issued by each model method.', 'commands'),
+            ('mongodb_command_failures_total', 'counter', 'Failed MongoDB commands by model method.', 'failures'),
+            ('mongodb_command_seconds_total', 'counter', 'Time spent in MongoDB commands by model method.', 'duration_ms'),
+            ('mongodb_documents_returned_total', 'counter', 'Documents returned or affected by model method.', 'documents'),
+            ('mongodb_reply_bytes_total', 'counter', 'Reply bytes received by model method.', 'bytes')
+        ]
+        
+        lines = []
+        for metric, kind, description, field in metrics:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, totals in operations:
+                value = totals[field] / 1000 if field == 'duration_ms' else totals[field]
+                lines.append(f'{metric}{{operation="{name}"}} {value:g}')
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._commands.clear()
+            self._operations.clear()
+            self._slowest.clear()
+
+def new_totals() -> Dict[str, Any]:
+    return {'calls': 0, 'commands': 0, 'failures': 0, 'duration_ms': 0.0, 'max_ms': 0.0, 'documents': 0, 'bytes': 0}
+
+query_monitor = QueryMonitor()
+
+def monitored(method: Callable) -> Callable:
+    """Attribute the MongoDB commands a model classmethod issues to Model.method
+    
+    Goes between @classmethod and the function (above @cached, so cache
+    hits count as calls without commands). Generator methods are
+    attributed while they are being advanced, and closing the wrapper
+    closes the method's generator, so a consumer that stops early
+    releases its cursor.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(cls, *args, **kwargs):
+            operation = f"{cls.__name__}.{method.__name__}"
+            query_monitor.count_call(operation)
+            iterator = method(cls, *args, **kwargs)
+            try:
+                while True:
+                    token = current_operation.set(operation)
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        current_operation.reset(token)
+                    yield item
+            finally:
+                token = current_operation.set(operation)
+                try:
+                    iterator.close()
+                finally:
+                    current_operation.reset(token)
+        
+        return generator_wrapper
+    
+    @functools.wraps(method)
+    def wrapper(cls, *args, **kwargs):
+        operation = f"{cls.__name__}.{method.__name__}"
+        query_monitor.count_call(operation)
+        token = current_operation.set(operation)
+        try:
+            return method(cls, *args, **kwargs)
+        finally:
+            current_operation.reset(token)
+    
+    return wrapper
@@ -0,0 +1,175 @@
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class Flight:
+    """One in-progress computation that later callers wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Run one computation per key at a time and share its result with concurrent callers
+    
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it runs wait for it and get the same result or
+    exception. Nothing is kept once the flight lands, so this coalesces
+    concurrent work without caching it. Results are shared, not copied,
+    so callers must treat them as read-only.
+    """
+    
+    def __init__(self, timeout: Optional[float] = None, enabled: Optional[bool] = None):
+        self.timeout = Config.SINGLE_FLIGHT_TIMEOUT_SECONDS if timeout is None else timeout
+        self.enabled = Config.SINGLE_FLIGHT_ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._tasks = {}
+        self._counters = {}
+    
+    def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return fn(), sharing one call among concurrent callers with the same name and key"""
+        if not self.enabled:
+            self._count(name, 'calls', 'executions')
+            return fn()
+        
+        with self._lock:
+            flight = self._flights.get((name, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(name, key)] = Flight()
+            else:
+                flight.waiters += 1
+        
+        if leader:
+            return self._lead(name, key, flight, fn)
+        
+        if not flight.done.wait(self.timeout):
+            # The leader is stuck; compute independently rather than queue behind it
+            logger.warning(f"Single-flight {name} waited {self.timeout}s for the leader, computing instead")
+            self._count(name, 'calls', 'executions', 'timeouts')
+            return fn()
+        
+        self._count(name, 'calls', 'coalesced')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    
+    def _lead(self, name: str, key: Hashable, flight: Flight, fn: Callable[[], Any]) -> Any:
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            self._count(name, 'failures')
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(name, key)]
+            flight.done.set()
+            self._count(name, 'calls', 'executions')
+    
+    async def do_async(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Coalescing for asyncio servers
+        
+        Coroutine functions are shared between tasks of the running loop.
+        Plain functions run in the default executor through do(), so they
+        are coalesced with every other thread and event loop in the process.
+        """
+        if not inspect.iscoroutinefunction(fn):
+            return await asyncio.to_thread(self.do, name, key, fn)
+        
+        if not self.enabled:
+            self._count(name, 'calls', 'executions')
+            return await fn()
+        
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), name, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._forget_task(task_key, task))
+        
+        try:
+            # shield, so a cancelled waiter does not cancel the computation others wait on
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            if leader:
+                self._count(name, 'failures')
+            raise
+        finally:
+            if task.done():
+                self._count(name, 'calls', 'executions' if leader else 'coalesced')
+        return result
+    
+    def _forget_task(self, task_key: tuple, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+    
+    def _count(self, name: str, *fields: str):
+        with self._lock:
+            counters = self._counters.setdefault(name, new_counters())
+            for field in fields:
+                counters[field] += 1
+    
+    def in_flight(self) -> Dict[str, int]:
+        """Computations running now, by name"""
+        with self._lock:
+            running = {}
+            for name, _ in self._flights:
+                running[name] = running.get(name, 0) + 1
+            for _, name, _ in self._tasks:
+                running[name] = running.get(name, 0) + 1
+        return running
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters by name; coalesced calls are the computations saved"""
+        running = self.in_flight()
+        with self._lock:
+            return {
+                name: {**counters, 'in_flight': running.get(name, 0)}
+                for name, counters in sorted(self._counters.items())
+            }
+    
+    def render(self) -> str:
+        """Counters in the Prometheus text format"""
+        stats = self.stats()
+        metrics = [
+            ('singleflight_calls_total', 'counter', 'Calls through the single-flight layer.', 'calls'),
+            ('singleflight_executions_total', 'counter', 'Calls that ran the computation.', 'executions'),
+            ('singleflight_coalesced_total', 'counter', "Calls that shared another call's result.", 'coalesced'),
+            ('singleflight_failures_total', 'counter', 'Computations that raised.', 'failures'),
+            ('singleflight_timeouts_total', 'counter', 'Waiters that gave up on a slow leader.', 'timeouts'),
+            ('singleflight_in_flight', 'gauge', 'Computations running now.', 'in_flight')
+        ]
+        
+        lines = []
+        for metric, kind, description, field in metrics:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, counters in stats.items():
+                lines.append(f'{metric}{{name="{name}"}} {counters[field]}')
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Forget the counters; flights in progress are left to land"""
+        with self._lock:
+            self._counters.clear()
+
+def new_counters() -> Dict[str, int]:
+    return {'calls': 0, 'executions': 0, 'coalesced': 0, 'failures': 0, 'timeouts': 0}
+
+single_flight = SingleFlight()
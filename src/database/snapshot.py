@@ -0,0 +1,187 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from .columnar import ColumnarEpisodeStore, Vocabulary
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'JOPSNAP1'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+NUMERIC_COLUMNS = [
+    'episode_nums', 'painting_indexes', 'seasons', 'episodes', 'date_ordinals', 'months',
+    'color_offsets', 'color_codes', 'subject_offsets', 'subject_codes'
+]
+STRING_COLUMNS = ['ids', 'titles', 'youtube_urls', 'img_srcs']
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or incompatible"""
+
+class StringTable(Sequence):
+    """Read-only strings stored as a utf-8 blob plus uint32 end offsets
+    
+    Strings are decoded on access, so the blob itself stays in the
+    shared, memory-mapped pages.
+    """
+    
+    def __init__(self, ends: memoryview, blob: memoryview):
+        self.ends = ends
+        self.blob = blob
+    
+    def __len__(self) -> int:
+        return len(self.ends)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start = self.ends[index - 1] if index else 0
+        return str(self.blob[start:self.ends[index]], 'utf-8')
+
+def encode_strings(values: Sequence):
+    """Encode strings into (end offsets, blob)"""
+    ends = array('I')
+    chunks = []
+    position = 0
+    for value in values:
+        encoded = (value or '').encode('utf-8')
+        chunks.append(encoded)
+        position += len(encoded)
+        ends.append(position)
+    return ends, b''.join(chunks)
+
+def write_snapshot(store: ColumnarEpisodeStore, version: str, path: Optional[str] = None,
+                   metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Write a store to a snapshot file, replacing any previous one atomically"""
+    path = path or Config.SNAPSHOT_FILE
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    
+    sections = []
+    for name in NUMERIC_COLUMNS:
+        column = getattr(store, name)
+        typecode = column.typecode if isinstance(column, array) else column.format
+        sections.append((name, typecode, bytes(column)))
+    for name in STRING_COLUMNS:
+        ends, blob = encode_strings(getattr(store, name))
+        sections.append((f"{name}.ends", 'I', ends.tobytes()))
+        sections.append((f"{name}.blob", 'B', blob))
+    
+    header = {
+        'format': FORMAT_VERSION,
+        'version': version,
+        'created_at': time.time(),
+        'byteorder': sys.byteorder,
+        'count': len(store),
+        'vocabularies': {
+            'colors': {'names': list(store.colors.names), 'hexes': list(store.colors.hexes)},
+            'subjects': {'names': list(store.subjects.names)}
+        },
+        'metadata': metadata or {},
+        'sections': {}
+    }
+    
+    # Offsets are relative to the end of the header, so they can be computed first
+    offset = 0
+    for name, typecode, data in sections:
+        header['sections'][name] = {'offset': offset, 'length': len(data), 'typecode': typecode}
+        offset += len(data) + (-len(data) % ALIGNMENT)
+    
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(len(MAGIC) + 4 + len(header_bytes)) % ALIGNMENT)
+    
+    fd, temp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC)
+            file.write(struct.pack('<I', len(header_bytes)))
+            file.write(header_bytes)
+            for _, _, data in sections:
+                file.write(data)
+                file.write(b'\0' * (-len(data) % ALIGNMENT))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    logger.info(f"Wrote snapshot {version} with {len(store)} episodes to {path}")
+    return path
+
+def read_header(buffer) -> Dict[str, Any]:
+    """Parse and validate the header of a mapped snapshot"""
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError("Not a snapshot file")
+    
+    (header_length,) = struct.unpack('<I', bytes(buffer[len(MAGIC):len(MAGIC) + 4]))
+    header_start = len(MAGIC) + 4
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+    
+    if header.get('format') != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {header.get('format')}")
+    if header.get('byteorder') != sys.byteorder:
+        raise SnapshotError("Snapshot was written on a machine with a different byte order")
+    
+    header['data_start'] = header_start + header_length
+    return header
+
+def load_snapshot(path: Optional[str] = None) -> ColumnarEpisodeStore:
+    """Memory-map a snapshot read-only and wrap it in a columnar store
+    
+    The numeric columns are memoryviews over the mapping, so every worker
+    process that loads the same file shares the same physical pages.
+    """
+    path = path or Config.SNAPSHOT_FILE
+    if not os.path.exists(path):
+        raise SnapshotError(f"Snapshot not found: {path}")
+    
+    with open(path, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    view = memoryview(mapping)
+    header = read_header(view)
+    data_start = header['data_start']
+    
+    def section(name: str) -> memoryview:
+        info = header['sections'][name]
+        start = data_start + info['offset']
+        return view[start:start + info['length']].cast(info['typecode'])
+    
+    store = ColumnarEpisodeStore()
+    for name in NUMERIC_COLUMNS:
+        setattr(store, name, section(name))
+    for name in STRING_COLUMNS:
+        setattr(store, name, StringTable(section(f"{name}.ends"), section(f"{name}.blob")))
+    
+    vocabularies = header['vocabularies']
+    store.colors = Vocabulary(vocabularies['colors']['names'], vocabularies['colors']['hexes'])
+    store.subjects = Vocabulary(vocabularies['subjects']['names'])
+    
+    store.version = header['version']
+    store.metadata = header.get('metadata', {})
+    store.mapping = mapping
+    
+    logger.info(f"Mapped snapshot {header['version']} with {header['count']} episodes from {path}")
+    return store
+
+def snapshot_signature(path: Optional[str] = None) -> Optional[List[int]]:
+    """Identity of the file currently at path, which changes on every atomic swap"""
+    try:
+        stat = os.stat(path or Config.SNAPSHOT_FILE)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from config import Config
+from .cache import model_cache
+from .columnar import ColumnarEpisodeStore
+from .singleflight import single_flight
+from .snapshot import load_snapshot, snapshot_signature
+
+logger = logging.getLogger(__name__)
+
+class EpisodeStoreManager:
+    """Holds the process-wide columnar episode store and rebuilds it per dataset version"""
+    
+    def __init__(self):
+        self._store = None
+        self._version = None
+        self._built_at = 0.0
+        self._pinned = False
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_signature = None
+        self._snapshot_checked_at = 0.0
+        self._snapshot_current = True
+    
+    def build(self) -> ColumnarEpisodeStore:
+        """Build a store by streaming the episodes collection, raising if the read fails"""
+        from .models import Episode  # models imports the cache this module uses
+        return ColumnarEpisodeStore.from_episodes(Episode.iter_all(raise_errors=True))
+    
+    def get(self) -> ColumnarEpisodeStore:
+        """Current store, rebuilt when the dataset version changes
+        
+        Without a dataset version (no meta document, or it could not be
+        read) a versioned store is kept as is and an unversioned one is
+        rebuilt every STORE_UNVERSIONED_TTL_SECONDS. A failed build never
+        replaces the store being served. A snapshot is served while its
+        version matches the dataset version (or that is unknown).
+        """
+        if self._pinned:
+            return self._store
+        
+        version = model_cache.current_version()
+        if Config.SNAPSHOT_ENABLED:
+            snapshot = self.get_snapshot()
+            if snapshot is not None and self._snapshot_matches(snapshot, version):
+                return snapshot
+        
+        store = self._store
+        if store is not None:
+            if version is not None and version == self._version:
+                return store
+            if version is None and (self._version is not None or not self._unversioned_expired()):
+                return store
+        
+        try:
+            # Concurrent cold requests share one scan of the collection
+            store = single_flight.do('episode_store', version, self.build)
+        except Exception as e:
+            logger.error(f"Error building episode store: {e}")
+            if self._store is not None:
+                return self._store
+            return ColumnarEpisodeStore()
+        
+        with self._lock:
+            self._store = store
+            self._version = version
+            self._built_at = time.monotonic()
+        return store
+    
+    def _snapshot_matches(self, snapshot: ColumnarEpisodeStore, version: Optional[str]) -> bool:
+        """False for a snapshot left behind by an ETL run this host did not take part in"""
+        current = version is None or snapshot.version == version
+        if not current and self._snapshot_current:
+            logger.warning(f"Snapshot {snapshot.version} is older than dataset {version}, reading MongoDB instead")
+        self._snapshot_current = current
+        return current
+    
+    def _unversioned_expired(self) -> bool:
+        return time.monotonic() - self._built_at >= Config.STORE_UNVERSIONED_TTL_SECONDS
+    
+    def get_snapshot(self) -> Optional[ColumnarEpisodeStore]:
+        """Memory-mapped snapshot store, remapped when the file is swapped"""
+        now = time.monotonic()
+        if self._snapshot_checked_at and now - self._snapshot_checked_at < Config.SNAPSHOT_POLL_SECONDS:
+            return self._snapshot
+        self._snapshot_checked_at = now
+        
+        signature = snapshot_signature()
+        if signature is None or signature == self._snapshot_signature:
+            return self._snapshot
+        
+        try:
+            snapshot = load_snapshot()
+        except Exception as e:
+            logger.error(f"Error loading snapshot: {e}")
+            return self._snapshot
+        
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_signature = signature
+        return snapshot
+    
+    def install(self, store: ColumnarEpisodeStore, version: Optional[str] = None):
+        """Serve a prebuilt in-process store instead of reading MongoDB"""
+        with self._lock:
+            self._store = store
+            self._version = version
+            self._pinned = True
+    
+    def reset(self):
+        """Forget the current store"""
+        with self._lock:
+            self._store = None
+            self._version = None
+            self._built_at = 0.0
+            self._pinned = False
+            self._snapshot = None
+            self._snapshot_signature = None
+            self._snapshot_checked_at = 0.0
+            self._snapshot_current = True
+    
+    @property
+    def loaded(self) -> bool:
+        return self._store is not None or self.serving_snapshot
+
+    @property
+    def loaded_episodes(self) -> int:
+        store = self._snapshot if self.serving_snapshot else self._store
+        return len(store) if store is not None else 0
+    
+    @property
+    def serving_snapshot(self) -> bool:
+        return not self._pinned and self._snapshot is not None and self._snapshot_current
+
+episode_store = EpisodeStoreManager()
+
+def get_episode_store() -> ColumnarEpisodeStore:
+    """Get the store the API reads episodes from"""
+    return episode_store.get()
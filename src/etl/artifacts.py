@@ -0,0 +1,91 @@
+import glob
+import hashlib
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.snapshot import SnapshotError, write_snapshot, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Bump when the transformation changes, so artifacts of older code are not reused
+ARTIFACT_FORMAT = 1
+ARTIFACT_SUFFIX = '.artifact'
+
+def artifact_key(files: Dict[str, str]) -> str:
+    """Checksum key for the transformed output of a given set of raw inputs"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"format={ARTIFACT_FORMAT}".encode('utf-8'))
+    for name in sorted(files):
+        digest.update(f"\n{name}={files[name]}".encode('utf-8'))
+    return digest.hexdigest()
+
+def artifact_path(key: str) -> str:
+    return os.path.join(Config.ARTIFACT_DIR, f"episodes-{key}{ARTIFACT_SUFFIX}")
+
+def write_artifact(store: ColumnarEpisodeStore, files: Dict[str, str]) -> str:
+    """Persist transformed episodes as a snapshot-format artifact keyed by the raw inputs
+    
+    The file is a regular snapshot, so load_snapshot (and the API's
+    snapshot backend) can map it directly. The colors and subjects
+    aggregates are derived from the episodes, so only their counts are
+    recorded.
+    """
+    key = artifact_key(files)
+    metadata = {
+        'artifact': ARTIFACT_FORMAT,
+        'key': key,
+        'sources': files,
+        'colors': len({name for name in store.colors.names if name}),
+        'subjects': len(store.subjects)
+    }
+    path = write_snapshot(store, key, artifact_path(key), metadata)
+    prune_artifacts(keep=Config.ARTIFACT_KEEP)
+    return path
+
+def load_artifact(files: Dict[str, str]) -> Optional[ColumnarEpisodeStore]:
+    """Map the artifact built from exactly these raw inputs, if there is one"""
+    key = artifact_key(files)
+    path = artifact_path(key)
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        store = load_snapshot(path)
+    except SnapshotError as e:
+        logger.warning(f"Ignoring unreadable artifact {path}: {e}")
+        return None
+    
+    if store.metadata.get('artifact') != ARTIFACT_FORMAT or store.metadata.get('key') != key:
+        logger.warning(f"Ignoring artifact {path} written for different inputs")
+        return None
+    
+    return store
+
+def artifact_episodes(store: ColumnarEpisodeStore) -> List[Dict]:
+    """Episode documents from an artifact, ready to insert (without _id)"""
+    episodes = store.materialize_many(range(len(store)))
+    for episode in episodes:
+        episode.pop('_id', None)
+    return episodes
+
+def list_artifacts() -> List[str]:
+    """Artifact files, newest first"""
+    paths = glob.glob(os.path.join(Config.ARTIFACT_DIR, f"episodes-*{ARTIFACT_SUFFIX}"))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def prune_artifacts(keep: int) -> List[str]:
+    """Remove all but the newest keep artifacts"""
+    removed = []
+    for path in list_artifacts()[max(keep, 1):]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"Could not remove old artifact {path}: {e}")
+    return removed
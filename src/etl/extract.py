@@ -1,31 +1,143 @@
+import numpy as np
 import pandas as pd
+import io
+import mmap
 import os
 import re
 import json
 import logging
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+class ExtractionError(Exception):
+    """Raised when one or more extraction stages fail, with the error per stage"""
+    
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        details = '; '.join(f"{stage}: {error!r}" for stage, error in errors.items())
+        super().__init__(f"Extraction failed in {len(errors)} stage(s): {details}")
+
+def count_quotes(data: mmap.mmap, start: int, end: int, block_size: int = 1 << 20) -> int:
+    """Count quote characters in a byte range, a block at a time"""
+    return sum(
+        data[position:min(position + block_size, end)].count(b'"')
+        for position in range(start, end, block_size)
+    )
+
+def csv_shards(filepath: str, count: int) -> List[Tuple[int, int]]:
+    """Split a CSV's data rows into about count byte ranges
+    
+    Ranges end on a newline outside any quoted field (an even number of
+    quote characters since the start of the data), so rows with embedded
+    newlines are never cut in half.
+    """
+    with open(filepath, 'rb') as file:
+        file.readline()
+        data_start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+        if count <= 1 or size <= data_start:
+            return [(data_start, size)]
+        
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            shards = []
+            start = data_start
+            scanned = data_start
+            quotes = 0
+            step = (size - data_start) // count
+            
+            for target in range(data_start + step, size, step):
+                if target <= start:
+                    continue
+                position = max(target, scanned)
+                quotes += count_quotes(data, scanned, position)
+                end = data.find(b'\n', position)
+                while end != -1:
+                    quotes += count_quotes(data, position, end + 1)
+                    position = end + 1
+                    if quotes % 2 == 0:
+                        break
+                    end = data.find(b'\n', position)
+                scanned = position
+                if end == -1 or position >= size:
+                    break
+                shards.append((start, position))
+                start = position
+            
+            shards.append((start, size))
+            return shards
+
+def read_csv_shard(filepath: str, shard: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+    """Read a whole CSV, or one byte range of its rows with the header prepended"""
+    if shard is None:
+        return pd.read_csv(filepath)
+    
+    start, end = shard
+    with open(filepath, 'rb') as file:
+        header = file.readline()
+        file.seek(start)
+        data = file.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data))
+
+def run_extraction_stage(stage: str, filepath: str, shard: Optional[Tuple[int, int]] = None):
+    """Run one extraction stage in a worker process, raising on failure
+    
+    Returns the stage's records and, for colors, the mismatched rows.
+    """
+    extractor = DataExtractor()
+    
+    if stage == 'episode_dates':
+        return list(extractor.iter_episode_dates(filepath)), []
+    
+    df = read_csv_shard(filepath, shard)
+    if stage == 'colors_data':
+        return extractor.colors_from_frame(df, {}), extractor.color_mismatches
+    if stage == 'subject_data':
+        return extractor.subjects_from_frame(df), []
+    
+    raise ValueError(f"Unknown extraction stage {stage}")
+
 class DataExtractor:
     """Extract data from raw files"""
     
-    def __init__(self):
+    def __init__(self, raw_data_dir: Optional[str] = None):
         self.base_dir = Config.BASE_DIR
+        self.raw_data_dir = raw_data_dir
+        self.color_mismatches = []
     
-    def extract_episode_dates(self):
-        """Extract episode dates from the episode dates file"""
-        try:
-            filepath = Config.EPISODE_DATES_FILE
-            
-            with open(filepath, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
+    def source_file(self, configured_path: str) -> str:
+        """A configured raw file, or the file of the same name in raw_data_dir"""
+        if self.raw_data_dir:
+            return os.path.join(self.raw_data_dir, os.path.basename(configured_path))
+        return configured_path
+    
+    @property
+    def episode_dates_file(self) -> str:
+        return self.source_file(Config.EPISODE_DATES_FILE)
+    
+    @property
+    def colors_used_file(self) -> str:
+        return self.source_file(Config.COLORS_USED_FILE)
+    
+    @property
+    def subject_matter_file(self) -> str:
+        return self.source_file(Config.SUBJECT_MATTER_FILE)
+    
+    def source_files(self) -> List[str]:
+        """The three raw input files this extractor reads"""
+        return [self.episode_dates_file, self.colors_used_file, self.subject_matter_file]
+    
+    def iter_episode_dates(self, filepath: Optional[str] = None):
+        """Yield episode dates one line at a time"""
+        filepath = filepath or self.episode_dates_file
             
-            episodes = []
-            for i, line in enumerate(lines, 1):
+        with open(filepath, 'r', encoding='utf-8') as file:
+            for i, line in enumerate(file, 1):
                 line = line.strip()
                 if line:
                     match = re.match(r'"(.+)"\s*\((.+)\)', line)
@@ -33,13 +145,18 @@ class DataExtractor:
                         title = match.group(1)
                         date_str = match.group(2)
                         
-                        episodes.append({
+                        yield {
                             'episode_num': i,
                             'title': title,
                             'air_date_str': date_str,
                             'season': (i - 1) // 13 + 1,
                             'episode': ((i - 1) % 13) + 1
-                        })
+                        }
+    
+    def extract_episode_dates(self):
+        """Extract episode dates from the episode dates file"""
+        try:
+            episodes = list(self.iter_episode_dates())
             
             logger.info(f"Extracted {len(episodes)} episodes from dates file")
             return episodes
@@ -48,48 +165,128 @@ class DataExtractor:
             logger.error(f"Error extracting episode dates: {e}")
             return []
     
+    @staticmethod
+    def parse_color_literals(colors_str: str, hex_str: str) -> List[Dict]:
+        """Parse the list literals in the colors/color_hex columns"""
+        colors_str = colors_str.replace('\r\n', '').replace("'", '"')
+        hex_str = hex_str.replace("'", '"')
+        
+        colors = json.loads(colors_str) if colors_str != '[]' else []
+        hex_values = json.loads(hex_str) if hex_str != '[]' else []
+        
+        return [
+            {'name': color.strip(), 'hex': hex_values[i] if i < len(hex_values) else None}
+            for i, color in enumerate(colors)
+        ]
+    
+    def colors_from_frame(self, df: pd.DataFrame, name_to_hex: Dict[str, str]) -> List[Dict]:
+        """Build per-episode palettes for one DataFrame of colors.csv rows
+        
+        Palettes are built from the one-hot color columns. The list literals
+        are only parsed once per distinct value, to build the name -> hex map
+        and to check them against the indicators. Rows where the two disagree
+        fall back to the literal and are reported in self.color_mismatches.
+        """
+        indicator_columns = list(df.columns[df.columns.get_loc('color_hex') + 1:])
+        indicator_columns.sort(key=lambda col: col.replace('_', ' '))
+        names = [col.replace('_', ' ') for col in indicator_columns]
+        column_of = {name: i for i, name in enumerate(names)}
+        
+        literal_ids = df.groupby(['colors', 'color_hex'], sort=False, dropna=False).ngroup().to_numpy()
+        literals = df.drop_duplicates(['colors', 'color_hex'])[['colors', 'color_hex']]
+        
+        literal_palettes = []
+        literal_matrix = np.zeros((len(literals), len(names)), dtype=bool)
+        literal_usable = np.ones(len(literals), dtype=bool)
+        
+        for i, (colors_str, hex_str) in enumerate(literals.itertuples(index=False)):
+            try:
+                palette = self.parse_color_literals(colors_str, hex_str)
+            except (json.JSONDecodeError, AttributeError) as e:
+                logger.warning(f"Error parsing colors literal {colors_str!r}: {e}")
+                literal_palettes.append(None)
+                literal_usable[i] = False
+                continue
+            
+            literal_palettes.append(palette)
+            for color in palette:
+                name_to_hex.setdefault(color['name'], color['hex'])
+                column = column_of.get(color['name'])
+                if column is None or name_to_hex[color['name']] != color['hex']:
+                    literal_usable[i] = False
+                else:
+                    literal_matrix[i, column] = True
+        
+        hexes = [name_to_hex.get(name) for name in names]
+        indicators = df[indicator_columns].to_numpy() == 1
+        disagree = (
+            (indicators != literal_matrix[literal_ids]).any(axis=1)
+            | ~literal_usable[literal_ids]
+        )
+        
+        _, columns = np.nonzero(indicators)
+        columns_per_row = np.split(columns, np.cumsum(indicators.sum(axis=1))[:-1])
+        
+        colors_data = []
+        rows = zip(
+            df['painting_index'].tolist(), df['painting_title'].tolist(),
+            df['season'].tolist(), df['episode'].tolist(),
+            df['img_src'].tolist(), df['youtube_src'].tolist(),
+            columns_per_row, literal_ids.tolist(), disagree.tolist()
+        )
+        
+        for painting_index, title, season, episode, img_src, youtube_src, row_columns, literal_id, mismatch in rows:
+            if mismatch:
+                self.color_mismatches.append(int(painting_index))
+                palette = literal_palettes[literal_id]
+                if palette is None:
+                    continue
+                episode_colors = [dict(color) for color in palette]
+            else:
+                episode_colors = [{'name': names[c], 'hex': hexes[c]} for c in row_columns]
+            
+            colors_data.append({
+                'painting_index': int(painting_index),
+                'episode_num': int(painting_index),
+                'title': title,
+                'season': int(season),
+                'episode': int(episode),
+                'img_src': img_src,
+                'youtube_src': youtube_src,
+                'colors': episode_colors,
+                'num_colors': len(episode_colors)
+            })
+        
+        return colors_data
+    
+    def report_color_mismatches(self):
+        """Log rows whose indicator columns disagreed with their colors list"""
+        if self.color_mismatches:
+            logger.warning(
+                f"{len(self.color_mismatches)} rows have color indicators that disagree with "
+                f"their colors list, used the list instead: {self.color_mismatches[:20]}"
+            )
+    
+    def iter_colors_chunks(self, chunksize: int):
+        """Yield color data in chunks of colors.csv rows"""
+        self.color_mismatches = []
+        name_to_hex = {}
+        
+        for df in pd.read_csv(self.colors_used_file, chunksize=chunksize):
+            yield self.colors_from_frame(df, name_to_hex)
+        
+        self.report_color_mismatches()
+    
     def extract_colors_used(self):
         """Extract colors data from CSV file"""
         try:
-            filepath = Config.COLORS_USED_FILE
+            filepath = self.colors_used_file
             
             df = pd.read_csv(filepath)
             
-            colors_data = []
-            for _, row in df.iterrows():
-                colors_str = row.get('colors', '[]')
-                hex_str = row.get('color_hex', '[]')
-                
-                try:
-                    colors_str = colors_str.replace('\r\n', '').replace("'", '"')
-                    hex_str = hex_str.replace("'", '"')
-                    
-                    colors = json.loads(colors_str) if colors_str != '[]' else []
-                    hex_values = json.loads(hex_str) if hex_str != '[]' else []
-                    
-                    episode_colors = []
-                    for i, color in enumerate(colors):
-                        color_data = {
-                            'name': color.strip(),
-                            'hex': hex_values[i] if i < len(hex_values) else None
-                        }
-                        episode_colors.append(color_data)
-                    
-                    colors_data.append({
-                        'painting_index': int(row.get('painting_index', 0)),
-                        'episode_num': int(row.get('painting_index', 0)),
-                        'title': row.get('painting_title', ''),
-                        'season': int(row.get('season', 1)),
-                        'episode': int(row.get('episode', 1)),
-                        'img_src': row.get('img_src', ''),
-                        'youtube_src': row.get('youtube_src', ''),
-                        'colors': episode_colors,
-                        'num_colors': len(episode_colors)
-                    })
-                    
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Error parsing colors for row {row.get('painting_index')}: {e}")
-                    continue
+            self.color_mismatches = []
+            colors_data = self.colors_from_frame(df, {})
+            self.report_color_mismatches()
             
             logger.info(f"Extracted {len(colors_data)} episodes with color data")
             return colors_data
@@ -98,43 +295,59 @@ class DataExtractor:
             logger.error(f"Error extracting colors data: {e}")
             return []
     
+    @staticmethod
+    def subject_display_name(column: str) -> str:
+        """Display name for a subject indicator column"""
+        return column.replace('_', ' ').title()
+    
+    def subjects_from_frame(self, df: pd.DataFrame) -> List[Dict]:
+        """Build per-episode subject lists for one DataFrame of subjects.csv rows"""
+        subject_columns = [col for col in df.columns if col not in ['EPISODE', 'TITLE']]
+        display_names = np.array(
+            [self.subject_display_name(col) for col in subject_columns], dtype=object
+        )
+        
+        codes = df['EPISODE'].str.extract(r'^S(\d+)E(\d+)')
+        valid = codes[0].notna().to_numpy()
+        df = df[valid]
+        seasons = codes.loc[valid, 0].astype(int).tolist()
+        episodes = codes.loc[valid, 1].astype(int).tolist()
+        
+        indicators = df[subject_columns].to_numpy() == 1
+        _, columns = np.nonzero(indicators)
+        row_ends = np.cumsum(indicators.sum(axis=1))[:-1]
+        subjects_per_row = np.split(display_names[columns], row_ends)
+        
+        subject_data = []
+        rows = zip(
+            df['EPISODE'].tolist(), df['TITLE'].str.strip('"').tolist(),
+            seasons, episodes, subjects_per_row
+        )
+        for episode_code, title, season, episode, subjects in rows:
+            subject_data.append({
+                'episode_num': (season - 1) * 13 + episode,
+                'episode_code': episode_code,
+                'title': title,
+                'season': season,
+                'episode': episode,
+                'subjects': subjects.tolist()
+            })
+        
+        return subject_data
+    
+    def iter_subject_chunks(self, chunksize: int):
+        """Yield subject data in chunks of subjects.csv rows"""
+        for df in pd.read_csv(self.subject_matter_file, chunksize=chunksize):
+            yield self.subjects_from_frame(df)
+    
     def extract_subject_matter(self):
         """Extract subject matter data from CSV file"""
         try:
-            filepath = Config.SUBJECT_MATTER_FILE
+            filepath = self.subject_matter_file
             
             df = pd.read_csv(filepath)
             
-            subject_data = []
-            
-            subject_columns = [col for col in df.columns if col not in ['EPISODE', 'TITLE']]
-            
-            for _, row in df.iterrows():
-                episode_code = row['EPISODE']
-                title = row['TITLE'].strip('"')
-                
-                match = re.match(r'S(\d+)E(\d+)', episode_code)
-                if match:
-                    season = int(match.group(1))
-                    episode = int(match.group(2))
-                    episode_num = (season - 1) * 13 + episode
-                else:
-                    continue
-                
-                subjects = []
-                for subject_col in subject_columns:
-                    if row[subject_col] == 1:
-                        subject_name = subject_col.replace('_', ' ').title()
-                        subjects.append(subject_name)
-                
-                subject_data.append({
-                    'episode_num': episode_num,
-                    'episode_code': episode_code,
-                    'title': title,
-                    'season': season,
-                    'episode': episode,
-                    'subjects': subjects
-                })
+            subject_data = self.subjects_from_frame(df)
             
             logger.info(f"Extracted {len(subject_data)} episodes with subject data")
             return subject_data
@@ -143,8 +356,11 @@ class DataExtractor:
             logger.error(f"Error extracting subject data: {e}")
             return []
     
-    def extract_all(self):
+    def extract_all(self, parallel: bool = False, workers: Optional[int] = None):
         """Extract all data"""
+        if parallel:
+            return self.extract_all_parallel(workers)
+        
         logger.info("Starting data extraction...")
         
         episode_dates = self.extract_episode_dates()
@@ -157,6 +373,66 @@ class DataExtractor:
             'subject_data': subject_data
         }
 
+    def extract_all_parallel(self, workers: Optional[int] = None):
+        """Extract the three sources concurrently in a process pool
+        
+        pandas parsing holds the GIL, so the stages run in separate
+        processes. CSVs larger than Config.EXTRACT_SHARD_BYTES are also split
+        into row-aligned byte ranges parsed by different workers. Unlike the
+        serial path, failures are not swallowed: every failed stage is
+        collected and raised together as an ExtractionError.
+        """
+        workers = workers or Config.EXTRACT_WORKERS
+        sources = {
+            'episode_dates': self.episode_dates_file,
+            'colors_data': self.colors_used_file,
+            'subject_data': self.subject_matter_file
+        }
+        
+        logger.info(f"Starting parallel data extraction with {workers} workers...")
+        
+        results = {stage: [] for stage in sources}
+        errors = {}
+        self.color_mismatches = []
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for stage, filepath in sources.items():
+                try:
+                    shards = [None]
+                    if stage != 'episode_dates' and os.path.getsize(filepath) > Config.EXTRACT_SHARD_BYTES:
+                        shards = csv_shards(filepath, workers)
+                        logger.info(f"Sharding {os.path.basename(filepath)} into {len(shards)} ranges")
+                    futures[stage] = [
+                        executor.submit(run_extraction_stage, stage, filepath, shard)
+                        for shard in shards
+                    ]
+                except Exception as e:
+                    errors[stage] = e
+            
+            for stage, stage_futures in futures.items():
+                for future in stage_futures:
+                    try:
+                        records, mismatches = future.result()
+                    except Exception as e:
+                        errors.setdefault(stage, e)
+                        continue
+                    results[stage].extend(records)
+                    if stage == 'colors_data':
+                        self.color_mismatches.extend(mismatches)
+        
+        if errors:
+            for stage, error in errors.items():
+                logger.error(f"Error extracting {stage}: {error}")
+            raise ExtractionError(errors)
+        
+        self.report_color_mismatches()
+        logger.info(
+            f"Extracted {len(results['episode_dates'])} episodes, "
+            f"{len(results['colors_data'])} with colors, {len(results['subject_data'])} with subjects"
+        )
+        return results
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """Content hash of one file, read in blocks"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_digests(paths: Optional[List[str]] = None) -> Dict[str, str]:
+    """Content hashes of the three raw input files, keyed by file name"""
+    paths = paths or [Config.EPISODE_DATES_FILE, Config.COLORS_USED_FILE, Config.SUBJECT_MATTER_FILE]
+    return {os.path.basename(path): file_digest(path) for path in paths}
+
+def episode_digest(episode: Dict) -> str:
+    """Content hash of one transformed episode, ignoring its MongoDB _id
+    
+    Hashing the merged document rather than the raw rows catches a change
+    in any of the three files that contribute to the episode.
+    """
+    content = {key: value for key, value in episode.items() if key != '_id'}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=DIGEST_SIZE).hexdigest()
+
+def episode_digests(episodes: Iterable[Dict]) -> Dict[str, str]:
+    """Row hashes keyed by episode number (as a string, for storage in MongoDB)"""
+    return {str(episode['episode_num']): episode_digest(episode) for episode in episodes}
+
+def diff_digests(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[int]]:
+    """Episode numbers that were added, changed or removed between two hash maps"""
+    return {
+        'added': sorted(int(key) for key in new.keys() - old.keys()),
+        'changed': sorted(int(key) for key in new.keys() & old.keys() if new[key] != old[key]),
+        'removed': sorted(int(key) for key in old.keys() - new.keys())
+    }
+
+def membership_changes(old_episodes: Iterable[Dict], new_episodes: Iterable[Dict],
+                       names: Callable[[Dict], Iterable[str]]) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
+    """Per-name episode numbers to add to and remove from an aggregate collection
+    
+    old_episodes are the stored versions of the changed and removed
+    episodes, new_episodes the transformed versions of the added and
+    changed ones.
+    """
+    old_names = {episode['episode_num']: set(names(episode)) for episode in old_episodes}
+    new_names = {episode['episode_num']: set(names(episode)) for episode in new_episodes}
+    
+    added = {}
+    removed = {}
+    for episode_num in sorted(old_names.keys() | new_names.keys()):
+        before = old_names.get(episode_num, set())
+        after = new_names.get(episode_num, set())
+        for name in sorted(after - before):
+            added.setdefault(name, []).append(episode_num)
+        for name in sorted(before - after):
+            removed.setdefault(name, []).append(episode_num)
+    
+    return added, removed
+
+def color_names(episode: Dict) -> List[str]:
+    return [color['name'] for color in episode.get('colors', [])]
+
+def subject_names(episode: Dict) -> List[str]:
+    return list(episode.get('subjects', []))
@@ -1,103 +1,327 @@
+import argparse
 import logging
+import queue
 import sys
 import os
-from typing import Dict, List
+import threading
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.database.models import Episode, Color, Subject
+from config import Config
+from src.database.models import (
+    Episode, Color, Subject, Meta, MAX_REPORTED_ERRORS,
+    create_staging_collection, keep_previous_collection, promote_staging_collection,
+    restore_previous_collection, drop_previous_collection, drop_staging_collections
+)
+from src.database.cache import model_cache
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.snapshot import write_snapshot
 from src.etl.extract import DataExtractor
 from src.etl.transform import DataTransformer
+from src.etl.artifacts import load_artifact, write_artifact, artifact_episodes
+from src.etl.incremental import (
+    source_digests, episode_digest, episode_digests, diff_digests,
+    membership_changes, color_names, subject_names
+)
 
 logger = logging.getLogger(__name__)
 
+def iter_in_background(iterable: Iterable, maxsize: int) -> Iterator:
+    """Run an iterator in a producer thread, handing items over through a bounded queue
+    
+    The producer blocks once maxsize items are waiting, so at most that
+    many chunks are in flight between producer and consumer. Exceptions
+    raised by the producer are re-raised in the consumer.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    
+    def put(entry) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put(('item', item)):
+                    return
+            put(('done', None))
+        except Exception as e:
+            put(('error', e))
+    
+    producer = threading.Thread(target=produce, name='etl-producer', daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == 'done':
+                break
+            if kind == 'error':
+                raise value
+            yield value
+    finally:
+        stopped.set()
+        producer.join(timeout=1)
+
 class DataLoader:
     """Load transformed data into MongoDB"""
     
-    def __init__(self):
-        self.extractor = DataExtractor()
+    staged_models = [Color, Subject, Episode]
+    
+    def __init__(self, parallel_extract: Optional[bool] = None, raw_data_dir: Optional[str] = None):
+        self.extractor = DataExtractor(raw_data_dir)
         self.transformer = DataTransformer()
+        self.parallel_extract = Config.EXTRACT_PARALLEL if parallel_extract is None else parallel_extract
+    
+    def extract(self) -> Dict:
+        """Extract all sources, in a process pool when parallel extraction is on"""
+        return self.extractor.extract_all(parallel=self.parallel_extract)
+    
+    def check_bulk_result(self, label: str, result: Dict) -> bool:
+        """Log a bulk load's per-chunk accounting and decide if it succeeded"""
+        logger.info(f"Loaded {result['inserted']} {label} in {result['chunks']} chunks")
+        
+        if not result['failed']:
+            return True
+        
+        logger.warning(
+            f"{result['failed']} {label} failed to load in "
+            f"{result['failed_chunks']} of {result['chunks']} chunks"
+        )
+        for error in result['errors']:
+            logger.warning(f"  chunk {error['chunk']}, document {error['index']}: {error['message']}")
+        
+        return result['failed'] <= Config.ETL_MAX_FAILED_DOCUMENTS
     
-    def load_colors(self, colors_data: List[Dict]) -> bool:
-        """Load colors into database"""
+    @staticmethod
+    def merge_bulk_results(totals: Dict, result: Dict) -> Dict:
+        """Add one bulk load's accounting to a running total"""
+        for key in ['inserted', 'failed', 'chunks', 'failed_chunks']:
+            totals[key] += result[key]
+        totals['errors'].extend(result['errors'][:max(MAX_REPORTED_ERRORS - len(totals['errors']), 0)])
+        return totals
+    
+    def load_into_staging(self, model, documents: List[Dict], version: str) -> bool:
+        """Load documents into a versioned staging collection and index it"""
+        label = model.collection_name
         try:
-            Color.delete_all()
+            collection = create_staging_collection(label, version)
             
-            if not colors_data:
-                logger.warning("No color data to load")
+            if not documents:
+                logger.warning(f"No {label} data to load")
+                model.ensure_indexes(collection)
                 return True
             
-            Color.insert_many(colors_data)
-            logger.info(f"Loaded {len(colors_data)} colors")
-            return True
+            result = model.bulk_insert(documents, collection=collection)
+            model.ensure_indexes(collection)
+            return self.check_bulk_result(label, result)
             
         except Exception as e:
-            logger.error(f"Error loading colors: {e}")
+            logger.error(f"Error loading {label}: {e}")
             return False
     
-    def load_subjects(self, subjects_data: List[Dict]) -> bool:
-        """Load subjects into database"""
+    def load_colors(self, colors_data: List[Dict], version: str) -> bool:
+        """Load colors into a staging collection"""
+        return self.load_into_staging(Color, colors_data, version)
+    
+    def load_subjects(self, subjects_data: List[Dict], version: str) -> bool:
+        """Load subjects into a staging collection"""
+        return self.load_into_staging(Subject, subjects_data, version)
+    
+    def load_episodes(self, episodes_data: List[Dict], version: str) -> bool:
+        """Load episodes into a staging collection"""
+        return self.load_into_staging(Episode, episodes_data, version)
+    
+    def promote_staging(self, version: str) -> bool:
+        """Swap every staging collection in, or none of them
+        
+        Each live collection is first copied aside (with its indexes), then
+        replaced by one atomic rename, so readers always find a live
+        collection. If a rename fails, the collections already swapped are
+        renamed back from their copies. Readers can see a mix of versions
+        between the renames; the dataset version is bumped only after all
+        of them, so caches and stores switch together.
+        """
+        kept = []
         try:
-            Subject.delete_all()
-            
-            if not subjects_data:
-                logger.warning("No subject data to load")
-                return True
+            for model in self.staged_models:
+                copy = keep_previous_collection(model.collection_name, version)
+                if copy is not None:
+                    model.ensure_indexes(copy)
+                kept.append((model, copy is not None))
+        
+        except Exception as e:
+            logger.error(f"Error copying live collections aside: {e}")
+            self.drop_previous(kept, version)
+            return False
+        
+        promoted = []
+        try:
+            for model, had_live in kept:
+                promote_staging_collection(model.collection_name, version)
+                promoted.append((model, had_live))
             
-            Subject.insert_many(subjects_data)
-            logger.info(f"Loaded {len(subjects_data)} subjects")
+        except Exception as e:
+            logger.error(f"Error promoting staging collections: {e}")
+            self.rollback_promotion(promoted, version)
+            self.drop_previous(kept[len(promoted):], version)
+            return False
+        
+        self.drop_previous(kept, version)
+        return True
+    
+    def rollback_promotion(self, promoted: List[tuple], version: str):
+        """Put back the live collections of a partly promoted version, last swapped first"""
+        for model, had_live in reversed(promoted):
+            try:
+                restore_previous_collection(model.collection_name, version, had_live)
+            except Exception as e:
+                logger.error(f"Error restoring {model.collection_name}, it needs manual repair: {e}")
+    
+    def drop_previous(self, kept: List[tuple], version: str):
+        """Drop the copies kept for a rollback"""
+        for model, had_live in kept:
+            if had_live:
+                try:
+                    drop_previous_collection(model.collection_name, version)
+                except Exception as e:
+                    logger.error(f"Error dropping the previous {model.collection_name} collection: {e}")
+    
+    def drop_staging(self, version: Optional[str] = None):
+        """Remove staging collections for a version, or all leftovers"""
+        for model in self.staged_models:
+            try:
+                for name in drop_staging_collections(model.collection_name, version):
+                    logger.info(f"Dropped staging collection {name}")
+            except Exception as e:
+                logger.error(f"Error dropping staging collections for {model.collection_name}: {e}")
+    
+    def write_snapshot(self, episodes_data, version: str) -> bool:
+        """Write the shared, memory-mappable snapshot the API workers read
+        
+        episodes_data is a list of episode documents or an already built
+        ColumnarEpisodeStore.
+        """
+        try:
+            if isinstance(episodes_data, ColumnarEpisodeStore):
+                store = episodes_data
+            else:
+                store = ColumnarEpisodeStore.from_episodes(
+                    episodes_data, self.transformer.colors, self.transformer.subjects
+                )
+            write_snapshot(store, version)
             return True
-            
+        
         except Exception as e:
-            logger.error(f"Error loading subjects: {e}")
+            logger.error(f"Error writing snapshot: {e}")
             return False
     
-    def load_episodes(self, episodes_data: List[Dict]) -> bool:
-        """Load episodes into database"""
+    def read_artifact(self, files: Dict[str, str]) -> Optional[Dict]:
+        """Transformed data from the processed artifact for these raw inputs, if present"""
+        if not Config.ARTIFACTS_ENABLED:
+            return None
+        
         try:
-            Episode.delete_all()
-            
-            if not episodes_data:
-                logger.warning("No episode data to load")
-                return True
+            store = load_artifact(files)
+            if store is None:
+                return None
             
-            Episode.insert_many(episodes_data)
-            logger.info(f"Loaded {len(episodes_data)} episodes")
+            episodes = artifact_episodes(store)
+            logger.info(f"Steps 1-2: Reusing processed artifact {store.version} ({len(episodes)} episodes)")
+            return {
+                'episodes': episodes,
+                'colors': self.transformer.extract_unique_colors(episodes),
+                'subjects': self.transformer.extract_unique_subjects(episodes)
+            }
+        
+        except Exception as e:
+            logger.error(f"Error reading processed artifact: {e}")
+            return None
+    
+    def save_artifact(self, files: Dict[str, str], episodes_data: List[Dict]) -> bool:
+        """Persist transformed episodes so reruns on the same inputs skip extract/transform"""
+        if not Config.ARTIFACTS_ENABLED:
+            return False
+        
+        try:
+            store = ColumnarEpisodeStore.from_episodes(
+                episodes_data, self.transformer.colors, self.transformer.subjects
+            )
+            path = write_artifact(store, files)
+            logger.info(f"Saved processed artifact to {path}")
             return True
-            
+        
         except Exception as e:
-            logger.error(f"Error loading episodes: {e}")
+            logger.error(f"Error saving processed artifact: {e}")
             return False
     
+    def publish(self, episodes_data, version: str) -> bool:
+        """Promote a fully loaded staging version, snapshot it and bump the dataset version"""
+        if not self.promote_staging(version):
+            self.drop_staging(version)
+            return False
+        
+        self.write_snapshot(episodes_data, version)
+        Meta.set_dataset_version(version)
+        model_cache.clear()
+        return True
+    
     def run_full_etl(self) -> bool:
         """Run complete ETL process"""
         try:
             logger.info("=== Starting Full ETL Process ===")
             
-            logger.info("Step 1: Extracting data...")
-            raw_data = self.extractor.extract_all()
+            files = source_digests(self.extractor.source_files())
+            transformed_data = self.read_artifact(files)
             
-            if not raw_data['episode_dates']:
-                logger.error("No episode data extracted. ETL aborted.")
-                return False
+            if transformed_data is None:
+                logger.info("Step 1: Extracting data...")
+                raw_data = self.extract()
             
-            logger.info("Step 2: Transforming data...")
-            transformed_data = self.transformer.transform_all(raw_data)
+                if not raw_data['episode_dates']:
+                    logger.error("No episode data extracted. ETL aborted.")
+                    return False
+                
+                logger.info("Step 2: Transforming data...")
+                transformed_data = self.transformer.transform_all(raw_data)
+                self.save_artifact(files, transformed_data['episodes'])
+            
+            logger.info("Step 3: Loading data into MongoDB staging collections...")
             
-            logger.info("Step 3: Loading data into MongoDB...")
+            rows = episode_digests(transformed_data['episodes'])
+            version = uuid.uuid4().hex
+            self.drop_staging()
             
-            colors_success = self.load_colors(transformed_data['colors'])
-            subjects_success = self.load_subjects(transformed_data['subjects'])
-            episodes_success = self.load_episodes(transformed_data['episodes'])
+            colors_success = self.load_colors(transformed_data['colors'], version)
+            subjects_success = self.load_subjects(transformed_data['subjects'], version)
+            episodes_success = self.load_episodes(transformed_data['episodes'], version)
             
             if colors_success and subjects_success and episodes_success:
+                logger.info("Step 4: Swapping staging collections in...")
+                
+                if not self.publish(transformed_data['episodes'], version):
+                    logger.error("=== ETL Process Failed ===")
+                    return False
+                
+                Meta.set_etl_state(version, files, rows)
+                
                 logger.info("=== ETL Process Completed Successfully ===")
+                logger.info(f"Dataset version: {version}")
                 logger.info(f"Loaded:")
                 logger.info(f"  - {len(transformed_data['episodes'])} episodes")
                 logger.info(f"  - {len(transformed_data['colors'])} colors")
                 logger.info(f"  - {len(transformed_data['subjects'])} subjects")
                 return True
             else:
+                self.drop_staging(version)
                 logger.error("=== ETL Process Failed ===")
                 return False
                 
@@ -105,17 +329,203 @@ class DataLoader:
             logger.error(f"ETL process failed with error: {e}")
             return False
     
+    def load_episode_stream(self, chunks: Iterable[List[Dict]], version: str,
+                            store: ColumnarEpisodeStore, rows: Optional[Dict[str, str]] = None) -> bool:
+        """Bulk-load episode chunks into staging as they arrive, appending each to store"""
+        label = Episode.collection_name
+        totals = {'inserted': 0, 'failed': 0, 'chunks': 0, 'failed_chunks': 0, 'errors': []}
+        
+        collection = create_staging_collection(label, version)
+        for episodes in chunks:
+            if rows is not None:
+                rows.update((str(episode['episode_num']), episode_digest(episode)) for episode in episodes)
+            self.merge_bulk_results(totals, Episode.bulk_insert(episodes, collection=collection))
+            for episode in episodes:
+                store.append(episode)
+            logger.info(f"Streamed {len(store)} episodes so far")
+        
+        if not len(store):
+            logger.error("No episode data extracted. ETL aborted.")
+            return False
+        
+        Episode.ensure_indexes(collection)
+        return self.check_bulk_result(label, totals)
+    
+    def run_streaming_etl(self, chunk_size: Optional[int] = None) -> bool:
+        """Run the ETL in bounded-memory chunks
+        
+        Extraction and transformation run in a producer thread that hands
+        merged episode chunks to the loader through a bounded queue, so only
+        a few chunks of raw and transformed rows are alive at once. Colors
+        and subjects are aggregated incrementally and loaded at the end. The
+        snapshot is built from the compact columnar store, not from dicts.
+        """
+        chunk_size = chunk_size or Config.ETL_CHUNK_SIZE
+        version = uuid.uuid4().hex
+        
+        try:
+            logger.info(f"=== Starting Streaming ETL Process (chunks of {chunk_size}) ===")
+            files = source_digests(self.extractor.source_files())
+            self.drop_staging()
+            
+            aggregates = {}
+            chunks = self.transformer.transform_stream(
+                self.extractor.iter_episode_dates(),
+                self.extractor.iter_colors_chunks(chunk_size),
+                self.extractor.iter_subject_chunks(chunk_size),
+                chunk_size,
+                aggregates
+            )
+            
+            store = ColumnarEpisodeStore(self.transformer.colors, self.transformer.subjects)
+            rows = {}
+            episodes_success = self.load_episode_stream(
+                iter_in_background(chunks, Config.ETL_QUEUE_SIZE), version, store, rows
+            )
+            
+            if not episodes_success:
+                self.drop_staging(version)
+                logger.error("=== ETL Process Failed ===")
+                return False
+            
+            colors_success = self.load_colors(aggregates['colors'], version)
+            subjects_success = self.load_subjects(aggregates['subjects'], version)
+            
+            if not (colors_success and subjects_success and self.publish(store, version)):
+                self.drop_staging(version)
+                logger.error("=== ETL Process Failed ===")
+                return False
+            
+            Meta.set_etl_state(version, files, rows)
+            
+            logger.info("=== ETL Process Completed Successfully ===")
+            logger.info(f"Dataset version: {version}")
+            logger.info(f"Loaded:")
+            logger.info(f"  - {len(store)} episodes")
+            logger.info(f"  - {len(aggregates['colors'])} colors")
+            logger.info(f"  - {len(aggregates['subjects'])} subjects")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Streaming ETL process failed with error: {e}")
+            self.drop_staging(version)
+            return False
+    
+    def run_incremental_etl(self) -> bool:
+        """Apply only the episodes that changed since the last run
+        
+        Source files are hashed first; if none changed since the recorded
+        state the run ends there. Otherwise the data is transformed as usual
+        and per-episode hashes pick out added, changed and removed episodes,
+        which are upserted or deleted in place while the colors and subjects
+        aggregates are adjusted for just those episodes. Without a recorded
+        state for the live dataset version this falls back to a full load.
+        """
+        try:
+            logger.info("=== Starting Incremental ETL Process ===")
+            files = source_digests(self.extractor.source_files())
+            state = Meta.get_etl_state()
+            current_version = Meta.get_dataset_version()
+            
+            if not state or current_version is None or state.get('version') != current_version:
+                logger.info("No ETL state recorded for the live dataset, running a full load")
+                return self.run_full_etl()
+            
+            if state.get('files') == files:
+                logger.info("Source files unchanged, nothing to load")
+                return True
+            
+            raw_data = self.extract()
+            if not raw_data['episode_dates']:
+                logger.error("No episode data extracted. ETL aborted.")
+                return False
+            
+            episodes = self.transformer.merge_episode_data(
+                raw_data['episode_dates'],
+                raw_data['colors_data'],
+                raw_data['subject_data']
+            )
+            rows = episode_digests(episodes)
+            changes = diff_digests(state.get('rows', {}), rows)
+            logger.info(
+                f"{len(changes['added'])} added, {len(changes['changed'])} changed, "
+                f"{len(changes['removed'])} removed episodes"
+            )
+            
+            if not any(changes.values()):
+                Meta.set_etl_state(current_version, files, rows, changes)
+                logger.info("No episode changed, nothing to load")
+                return True
+            
+            if not self.apply_episode_changes(episodes, changes):
+                Meta.clear_etl_state()
+                logger.error("=== ETL Process Failed ===")
+                return False
+            
+            version = uuid.uuid4().hex
+            try:
+                store = ColumnarEpisodeStore.from_episodes(
+                    Episode.iter_all(raise_errors=True), self.transformer.colors, self.transformer.subjects
+                )
+                self.write_snapshot(store, version)
+            except Exception as e:
+                # The changes are applied; without a snapshot for the new version
+                # the workers read MongoDB instead of serving a truncated store
+                logger.error(f"Error building the snapshot, skipping it: {e}")
+            
+            Meta.set_dataset_version(version)
+            model_cache.clear()
+            Meta.set_etl_state(version, files, rows, changes)
+            
+            logger.info("=== Incremental ETL Process Completed Successfully ===")
+            logger.info(f"Dataset version: {version}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Incremental ETL process failed with error: {e}")
+            Meta.clear_etl_state()
+            return False
+    
+    def apply_episode_changes(self, episodes: List[Dict], changes: Dict[str, List[int]]) -> bool:
+        """Upsert/delete changed episodes and move them between colors and subjects"""
+        upsert_nums = set(changes['added']) | set(changes['changed'])
+        upserts = [episode for episode in episodes if episode['episode_num'] in upsert_nums]
+        stale = list(Episode.iter_all(
+            {'episode_num': {'$in': changes['changed'] + changes['removed']}},
+            {'episode_num': 1, 'colors': 1, 'subjects': 1}
+        ))
+        
+        result = Episode.apply_changes(upserts, changes['removed'])
+        if result is None:
+            return False
+        logger.info(f"Episodes: {result}")
+        
+        hexes = {}
+        for episode in upserts:
+            for color in episode['colors']:
+                hexes.setdefault(color['name'], color.get('hex'))
+        
+        added, removed = membership_changes(stale, upserts, color_names)
+        result = Color.apply_membership_changes(added, removed, hexes)
+        if result is None:
+            return False
+        logger.info(f"Colors: {result}")
+        
+        added, removed = membership_changes(stale, upserts, subject_names)
+        result = Subject.apply_membership_changes(added, removed)
+        if result is None:
+            return False
+        logger.info(f"Subjects: {result}")
+        
+        return True
+    
     def verify_data_integrity(self) -> Dict[str, int]:
         """Verify data was loaded correctly"""
         try:
-            episodes = Episode.find_all()
-            colors = Color.find_all()
-            subjects = Subject.find_all()
-            
             stats = {
-                'episodes': len(episodes),
-                'colors': len(colors),
-                'subjects': len(subjects)
+                'episodes': Episode.count(),
+                'colors': Color.count(),
+                'subjects': Subject.count()
             }
             
             logger.info(f"Data verification: {stats}")
@@ -132,9 +542,26 @@ def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    loader = DataLoader()
+    parser = argparse.ArgumentParser(description='Load the Joy of Painting dataset into MongoDB')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--stream', action='store_true',
+                      help='Process the input in bounded-memory chunks')
+    mode.add_argument('--incremental', action='store_true',
+                      help='Only apply episodes whose content changed since the last run')
+    parser.add_argument('--parallel-extract', action='store_true', default=None,
+                        help='Extract the source files concurrently in a process pool')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help=f'Rows per chunk when streaming (default {Config.ETL_CHUNK_SIZE})')
+    args = parser.parse_args()
+    
+    loader = DataLoader(parallel_extract=args.parallel_extract)
     
-    success = loader.run_full_etl()
+    if args.stream:
+        success = loader.run_streaming_etl(args.chunk_size)
+    elif args.incremental:
+        success = loader.run_incremental_etl()
+    else:
+        success = loader.run_full_etl()
     
     if success:
         stats = loader.verify_data_integrity()
@@ -0,0 +1,219 @@
+import csv
+import logging
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+REAL_COLORS = [
+    ('Alizarin Crimson', '#4E1500'), ('Black Gesso', '#000000'), ('Bright Red', '#DB0000'),
+    ('Burnt Umber', '#8A3324'), ('Cadmium Yellow', '#FFEC00'), ('Dark Sienna', '#5F2E1F'),
+    ('Indian Red', '#CD5C5C'), ('Indian Yellow', '#FFB800'), ('Liquid Black', '#000000'),
+    ('Liquid Clear', '#FFFFFF'), ('Midnight Black', '#000000'), ('Phthalo Blue', '#0C0040'),
+    ('Phthalo Green', '#102E3C'), ('Prussian Blue', '#021E44'), ('Sap Green', '#0A3410'),
+    ('Titanium White', '#FFFFFF'), ('Van Dyke Brown', '#221B15'), ('Yellow Ochre', '#C79B00')
+]
+
+REAL_SUBJECTS = [
+    'APPLE_FRAME', 'AURORA_BOREALIS', 'BARN', 'BEACH', 'BOAT', 'BRIDGE', 'BUILDING', 'BUSHES',
+    'CABIN', 'CACTUS', 'CIRCLE_FRAME', 'CIRRUS', 'CLIFF', 'CLOUDS', 'CONIFER', 'CUMULUS',
+    'DECIDUOUS', 'DIANE_ANDRE', 'DOCK', 'DOUBLE_OVAL_FRAME', 'FARM', 'FENCE', 'FIRE',
+    'FLORIDA_FRAME', 'FLOWERS', 'FOG', 'FRAMED', 'GRASS', 'GUEST', 'HALF_CIRCLE_FRAME',
+    'HALF_OVAL_FRAME', 'HILLS', 'LAKE', 'LAKES', 'LIGHTHOUSE', 'MILL', 'MOON', 'MOUNTAIN',
+    'MOUNTAINS', 'NIGHT', 'OCEAN', 'OVAL_FRAME', 'PALM_TREES', 'PATH', 'PERSON', 'PORTRAIT',
+    'RECTANGLE_3D_FRAME', 'RECTANGULAR_FRAME', 'RIVER', 'ROCKS', 'SEASHELL_FRAME', 'SNOW',
+    'SNOWY_MOUNTAIN', 'SPLIT_FRAME', 'STEVE_ROSS', 'STRUCTURE', 'SUN', 'TOMB_FRAME', 'TREE',
+    'TREES', 'TRIPLE_FRAME', 'WATERFALL', 'WAVES', 'WINDMILL', 'WINDOW_FRAME', 'WINTER',
+    'WOOD_FRAMED'
+]
+
+TITLE_ADJECTIVES = [
+    'Quiet', 'Misty', 'Golden', 'Winter', 'Autumn', 'Hidden', 'Peaceful', 'Distant', 'Lonely',
+    'Happy', 'Secluded', 'Crimson', 'Evening', 'Morning', 'Frozen', 'Majestic', 'Gentle', 'Wild'
+]
+TITLE_NOUNS = [
+    'Lake', 'Mountain', 'Cabin', 'Meadow', 'Waterfall', 'Forest', 'Stream', 'Sunset', 'Valley',
+    'Pond', 'Glacier', 'Path', 'Oval', 'Seascape', 'Marsh', 'Barn', 'Bridge', 'Hills'
+]
+
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+
+FIRST_AIR_DATE = date(1983, 1, 11)
+# Air dates cycle before pandas' Timestamp range ends (2262), so every date stays parseable
+MAX_AIR_WEEKS = (date(2260, 1, 1) - FIRST_AIR_DATE).days // 7
+EPISODES_PER_SEASON = 13
+BLOCK_SIZE = 4096
+
+class SyntheticDatasetGenerator:
+    """Seeded generator of raw input files in the exact formats DataExtractor parses
+    
+    Colors and subjects are drawn without replacement per episode with
+    Zipf-distributed popularity (weight 1 / rank ** skew), and consecutive
+    episodes share air dates. The same parameters and seed always produce
+    byte-identical files.
+    """
+    
+    def __init__(self, episodes: int = 10000, colors: int = len(REAL_COLORS),
+                 subjects: int = len(REAL_SUBJECTS), seed: int = 0, skew: float = 1.1,
+                 episodes_per_date: int = 2, colors_per_episode: Tuple[int, int] = (5, 14),
+                 subjects_per_episode: Tuple[int, int] = (3, 12)):
+        if episodes < 1 or colors < 1 or subjects < 1:
+            raise ValueError("episodes, colors and subjects must be positive")
+        
+        self.episodes = episodes
+        self.num_colors = colors
+        self.num_subjects = subjects
+        self.seed = seed
+        self.skew = skew
+        self.episodes_per_date = max(episodes_per_date, 1)
+        self.colors_per_episode = (min(colors_per_episode[0], colors), min(colors_per_episode[1], colors))
+        self.subjects_per_episode = (min(subjects_per_episode[0], subjects), min(subjects_per_episode[1], subjects))
+    
+    def color_vocabulary(self) -> List[Tuple[str, str]]:
+        """(name, hex) pairs: the real colors first, then numbered synthetic ones"""
+        vocabulary = REAL_COLORS[:self.num_colors]
+        for i in range(len(vocabulary), self.num_colors):
+            vocabulary.append((f"Synthetic Color {i + 1:04d}", f"#{(i * 2654435761) & 0xFFFFFF:06X}"))
+        return vocabulary
+    
+    def subject_vocabulary(self) -> List[str]:
+        """subjects.csv column names: the real subjects first, then numbered synthetic ones"""
+        vocabulary = REAL_SUBJECTS[:self.num_subjects]
+        for i in range(len(vocabulary), self.num_subjects):
+            vocabulary.append(f"SUBJECT_{i + 1:04d}")
+        return vocabulary
+    
+    def zipf_log_weights(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Log popularity per vocabulary entry, with ranks assigned in random order"""
+        ranks = rng.permutation(size) + 1
+        return -self.skew * np.log(ranks)
+    
+    @staticmethod
+    def sample_sets(rng: np.random.Generator, log_weights: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """Weighted sampling without replacement for a block of rows (Gumbel top-k)
+        
+        Returns a (rows, vocabulary) boolean membership matrix.
+        """
+        keys = log_weights + rng.gumbel(size=(len(counts), len(log_weights)))
+        order = np.argsort(-keys, axis=1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(len(log_weights))[None, :], axis=1)
+        return ranks < counts[:, None]
+    
+    @staticmethod
+    def air_date(episode_num: int, episodes_per_date: int) -> str:
+        day = FIRST_AIR_DATE + timedelta(weeks=((episode_num - 1) // episodes_per_date) % MAX_AIR_WEEKS)
+        return f"{MONTH_NAMES[day.month - 1]} {day.day}, {day.year}"
+    
+    def write(self, output_dir: str) -> Dict[str, str]:
+        """Write episodes.txt, colors.csv and subjects.csv into output_dir"""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {
+            name: os.path.join(output_dir, os.path.basename(path))
+            for name, path in [
+                ('episode_dates', Config.EPISODE_DATES_FILE),
+                ('colors', Config.COLORS_USED_FILE),
+                ('subjects', Config.SUBJECT_MATTER_FILE)
+            ]
+        }
+        
+        rng = np.random.default_rng(self.seed)
+        colors = self.color_vocabulary()
+        subjects = self.subject_vocabulary()
+        color_weights = self.zipf_log_weights(rng, len(colors))
+        subject_weights = self.zipf_log_weights(rng, len(subjects))
+        
+        # Indicator columns are written in name order, like the real file
+        color_columns = sorted(range(len(colors)), key=lambda i: colors[i][0])
+        color_header = [colors[i][0].replace(' ', '_') for i in color_columns]
+        
+        with open(paths['episode_dates'], 'w', encoding='utf-8', newline='') as dates_file, \
+                open(paths['colors'], 'w', encoding='utf-8', newline='') as colors_file, \
+                open(paths['subjects'], 'w', encoding='utf-8', newline='') as subjects_file:
+            colors_writer = csv.writer(colors_file, lineterminator='\n')
+            subjects_writer = csv.writer(subjects_file, lineterminator='\n')
+            
+            colors_writer.writerow([
+                '', 'painting_index', 'img_src', 'painting_title', 'season', 'episode',
+                'num_colors', 'youtube_src', 'colors', 'color_hex'
+            ] + color_header)
+            subjects_writer.writerow(['EPISODE', 'TITLE'] + subjects)
+            
+            for start in range(1, self.episodes + 1, BLOCK_SIZE):
+                stop = min(start + BLOCK_SIZE, self.episodes + 1)
+                rows = stop - start
+                
+                adjectives = rng.integers(len(TITLE_ADJECTIVES), size=rows)
+                nouns = rng.integers(len(TITLE_NOUNS), size=rows)
+                color_counts = rng.integers(self.colors_per_episode[0], self.colors_per_episode[1] + 1, size=rows)
+                subject_counts = rng.integers(self.subjects_per_episode[0], self.subjects_per_episode[1] + 1, size=rows)
+                color_sets = self.sample_sets(rng, color_weights, color_counts)[:, color_columns]
+                subject_sets = self.sample_sets(rng, subject_weights, subject_counts)
+                
+                for offset in range(rows):
+                    episode_num = start + offset
+                    season = (episode_num - 1) // EPISODES_PER_SEASON + 1
+                    episode = (episode_num - 1) % EPISODES_PER_SEASON + 1
+                    title = f"{TITLE_ADJECTIVES[adjectives[offset]]} {TITLE_NOUNS[nouns[offset]]}"
+                    
+                    dates_file.write(f'"{title}" ({self.air_date(episode_num, self.episodes_per_date)})\n')
+                    
+                    color_flags = color_sets[offset]
+                    palette = [colors[color_columns[i]] for i in np.flatnonzero(color_flags)]
+                    colors_writer.writerow([
+                        episode_num, episode_num,
+                        f"https://www.twoinchbrush.com/images/painting{episode_num}.png",
+                        title, season, episode, len(palette),
+                        f"https://www.youtube.com/embed/synthetic{episode_num:07d}",
+                        str([name for name, _ in palette]),
+                        str([hex_value for _, hex_value in palette])
+                    ] + color_flags.astype(int).tolist())
+                    
+                    subjects_writer.writerow(
+                        [f"S{season:02d}E{episode:02d}", f'"{title.upper()}"']
+                        + subject_sets[offset].astype(int).tolist()
+                    )
+        
+        logger.info(
+            f"Wrote {self.episodes} synthetic episodes ({self.num_colors} colors, "
+            f"{self.num_subjects} subjects, seed {self.seed}) to {output_dir}"
+        )
+        return paths
+
+def main():
+    """Command line entry point"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Generate a synthetic Joy of Painting dataset')
+    parser.add_argument('--episodes', type=int, default=10000, help='Number of episodes')
+    parser.add_argument('--colors', type=int, default=len(REAL_COLORS), help='Color vocabulary size')
+    parser.add_argument('--subjects', type=int, default=len(REAL_SUBJECTS), help='Subject vocabulary size')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for color/subject popularity')
+    parser.add_argument('--episodes-per-date', type=int, default=2, help='Episodes sharing each air date')
+    parser.add_argument('--output', default=None,
+                        help='Output directory (default data/synthetic/<episodes>-<seed>)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    output = args.output or os.path.join(Config.SYNTHETIC_DATA_DIR, f"{args.episodes}-{args.seed}")
+    generator = SyntheticDatasetGenerator(
+        episodes=args.episodes, colors=args.colors, subjects=args.subjects, seed=args.seed,
+        skew=args.skew, episodes_per_date=args.episodes_per_date
+    )
+    generator.write(output)
+    
+    print(f"\n✅ Synthetic dataset written to {output}")
+    print(f"   Load it with: RAW_DATA_DIR={output} python run_etl.py")
@@ -1,14 +1,50 @@
 import re
 import logging
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+import pandas as pd
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from src.database.columnar import Vocabulary
 
 logger = logging.getLogger(__name__)
 
+DATE_PATTERN = re.compile(r'([A-Za-z]+)\s+(\d{1,2}),?\s+(\d{4})$')
+DATE_FORMATS = ['%B %d, %Y', '%B %d %Y']
+DEFAULT_AIR_DATE = datetime(1983, 1, 1)
+SUBJECT_REPLACEMENTS = [
+    (re.compile(r'\bmt(\.|(?= ))', re.IGNORECASE), 'Mount')
+]
+MONTH_NAMES = [
+    '', 'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+class NormalizationTable:
+    """Normalizes each distinct raw name once into an interned canonical name
+    
+    Repeated occurrences are a dict lookup, and equal canonical names are
+    the same string object.
+    """
+    
+    def __init__(self, normalize: Callable[[str], str]):
+        self.normalize_name = normalize
+        self.canonical = {}
+    
+    def normalize(self, raw_name: str) -> str:
+        name = self.canonical.get(raw_name)
+        if name is None:
+            name = sys.intern(self.normalize_name(raw_name))
+            self.canonical[raw_name] = name
+        return name
+    
+    def __len__(self) -> int:
+        return len(self.canonical)
+
 class DataTransformer:
     """Transform extracted data for database storage"""
     
@@ -18,41 +54,94 @@ class DataTransformer:
             'may': 5, 'june': 6, 'july': 7, 'august': 8,
             'september': 9, 'october': 10, 'november': 11, 'december': 12
         }
+        self.date_cache = {}
+        self.invalid_dates = set()
+        self.unparseable_dates = {}
+        self.color_table = NormalizationTable(self.normalize_color_name)
+        self.subject_table = NormalizationTable(self.normalize_subject_name)
+        self.colors = Vocabulary()
+        self.subjects = Vocabulary()
     
-    def parse_air_date(self, date_str: str) -> Dict[str, Any]:
-        """Parse air date string to structured date info"""
+    def build_air_date(self, date_obj: datetime) -> Dict[str, Any]:
+        """Structured date info for one parsed date"""
+        return {
+            'date': date_obj,
+            'year': date_obj.year,
+            'month': date_obj.month,
+            'day': date_obj.day,
+            'month_name': MONTH_NAMES[date_obj.month],
+            'formatted': f"{date_obj.year:04d}-{date_obj.month:02d}-{date_obj.day:02d}"
+        }
+    
+    def match_air_date(self, date_str: str) -> Optional[datetime]:
+        """Parse "Month D, YYYY" or "Month D YYYY" with the precompiled pattern"""
+        match = DATE_PATTERN.match(date_str)
+        if not match:
+            return None
+        
+        month = self.month_mapping.get(match.group(1).lower())
+        if month is None:
+            return None
+        
         try:
-            date_str = date_str.strip()
+            return datetime(int(match.group(3)), month, int(match.group(2)))
+        except ValueError:
+            return None
+    
+    def parse_air_date(self, date_str: str) -> Dict[str, Any]:
+        """Parse air date string to structured date info
             
-            try:
-                date_obj = datetime.strptime(date_str, "%B %d, %Y")
-            except ValueError:
-                try:
-                    date_obj = datetime.strptime(date_str, "%B %d %Y")
-                except ValueError:
-                    logger.warning(f"Could not parse date: {date_str}")
-                    date_obj = datetime(1983, 1, 1)
+        Results are memoized per string. Unparseable dates fall back to
+        1983-01-01 and are counted in self.unparseable_dates.
+        """
+        cached = self.date_cache.get(date_str)
+        if cached is None:
+            date_obj = None
+            if isinstance(date_str, str):
+                date_obj = self.match_air_date(date_str.strip())
             
-            return {
-                'date': date_obj,
-                'year': date_obj.year,
-                'month': date_obj.month,
-                'day': date_obj.day,
-                'month_name': date_obj.strftime("%B").lower(),
-                'formatted': date_obj.strftime("%Y-%m-%d")
-            }
+            if date_obj is None:
+                logger.warning(f"Could not parse date: {date_str}")
+                self.invalid_dates.add(date_str)
+                date_obj = DEFAULT_AIR_DATE
             
-        except Exception as e:
-            logger.warning(f"Error parsing date '{date_str}': {e}")
-            default_date = datetime(1983, 1, 1)
-            return {
-                'date': default_date,
-                'year': 1983,
-                'month': 1,
-                'day': 1,
-                'month_name': 'january',
-                'formatted': '1983-01-01'
-            }
+            cached = self.build_air_date(date_obj)
+            self.date_cache[date_str] = cached
+        
+        if date_str in self.invalid_dates:
+            self.unparseable_dates[date_str] = self.unparseable_dates.get(date_str, 0) + 1
+        
+        return dict(cached)
+    
+    def warm_date_cache(self, date_strs: Iterable[str]):
+        """Parse every distinct, not yet cached date string in one vectorized pass"""
+        pending = [
+            date_str for date_str in dict.fromkeys(date_strs)
+            if isinstance(date_str, str) and date_str not in self.date_cache
+        ]
+        if not pending:
+            return
+        
+        stripped = pd.Series(pending).str.strip()
+        parsed = pd.to_datetime(stripped, format=DATE_FORMATS[0], errors='coerce')
+        for date_format in DATE_FORMATS[1:]:
+            missing = parsed.isna()
+            if not missing.any():
+                break
+            parsed[missing] = pd.to_datetime(stripped[missing], format=date_format, errors='coerce')
+        
+        for date_str, timestamp in zip(pending, parsed):
+            if not pd.isna(timestamp):
+                self.date_cache[date_str] = self.build_air_date(timestamp.to_pydatetime())
+    
+    def report_unparseable_dates(self):
+        """Log how many episodes fell back to the default air date"""
+        if self.unparseable_dates:
+            total = sum(self.unparseable_dates.values())
+            logger.warning(
+                f"{total} episodes have unparseable air dates ({len(self.unparseable_dates)} distinct), "
+                f"defaulted to {DEFAULT_AIR_DATE.date()}: {list(self.unparseable_dates)[:20]}"
+            )
     
     def clean_title(self, title: str) -> str:
         """Clean episode title"""
@@ -83,18 +172,55 @@ class DataTransformer:
         
         subject_name = subject_name.strip()
         
-        replacements = {
-            'Mt.': 'Mount',
-            'Mt ': 'Mount ',
-            'Steve Ross': 'Steve Ross',
-            'Diane Andre': 'Diane Andre'
-        }
-        
-        for old, new in replacements.items():
-            subject_name = subject_name.replace(old, new)
+        for pattern, replacement in SUBJECT_REPLACEMENTS:
+            subject_name = pattern.sub(replacement, subject_name)
         
         return subject_name
     
+    def merge_episode(self, episode_date: Dict, color_info: Dict, subject_info: Dict) -> Dict:
+        """Merge one episode's date, color and subject records"""
+        episode_num = episode_date['episode_num']
+        
+        air_date_info = self.parse_air_date(episode_date['air_date_str'])
+        
+        title = self.clean_title(
+            color_info.get('title') or episode_date.get('title', '')
+        )
+        
+        colors = []
+        unique_color_names = set()
+        
+        for color in color_info.get('colors', []):
+            color_name = self.color_table.normalize(color.get('name', ''))
+            if color_name and color_name not in unique_color_names:
+                code = self.colors.add(color_name, color.get('hex'))
+                colors.append({
+                    'name': self.colors.names[code],
+                    'hex': self.colors.hexes[code]
+                })
+                unique_color_names.add(color_name)
+        
+        subjects = []
+        for subject in subject_info.get('subjects', []):
+            subject_name = self.subject_table.normalize(subject)
+            if subject_name:
+                subjects.append(self.subjects.names[self.subjects.add(subject_name)])
+        
+        return {
+            'episode_num': episode_num,
+            'painting_index': color_info.get('painting_index', episode_num),
+            'title': title,
+            'season': episode_date['season'],
+            'episode': episode_date['episode'],
+            'air_date': air_date_info,
+            'colors': colors,
+            'subjects': subjects,
+            'youtube_url': color_info.get('youtube_src', ''),
+            'img_src': color_info.get('img_src', ''),
+            'num_colors': len(colors),
+            'num_subjects': len(subjects)
+        }
+    
     def merge_episode_data(self, episode_dates: List[Dict], colors_data: List[Dict], 
                           subject_data: List[Dict]) -> List[Dict]:
         """Merge all episode data into unified structure"""
@@ -102,73 +228,110 @@ class DataTransformer:
         colors_lookup = {item['episode_num']: item for item in colors_data}
         subjects_lookup = {item['episode_num']: item for item in subject_data}
         
+        self.unparseable_dates = {}
+        self.warm_date_cache(episode_date['air_date_str'] for episode_date in episode_dates)
+        
         merged_episodes = []
         
         for episode_date in episode_dates:
             episode_num = episode_date['episode_num']
             
-            color_info = colors_lookup.get(episode_num, {})
-            subject_info = subjects_lookup.get(episode_num, {})
-            
-            air_date_info = self.parse_air_date(episode_date['air_date_str'])
-            
-            title = self.clean_title(
-                color_info.get('title') or episode_date.get('title', '')
-            )
-            
-            colors = []
-            unique_color_names = set()
-            
-            for color in color_info.get('colors', []):
-                color_name = self.normalize_color_name(color.get('name', ''))
-                if color_name and color_name not in unique_color_names:
-                    colors.append({
-                        'name': color_name,
-                        'hex': color.get('hex')
-                    })
-                    unique_color_names.add(color_name)
-            
-            subjects = []
-            for subject in subject_info.get('subjects', []):
-                subject_name = self.normalize_subject_name(subject)
-                if subject_name:
-                    subjects.append(subject_name)
-            
-            merged_episode = {
-                'episode_num': episode_num,
-                'painting_index': color_info.get('painting_index', episode_num),
-                'title': title,
-                'season': episode_date['season'],
-                'episode': episode_date['episode'],
-                'air_date': air_date_info,
-                'colors': colors,
-                'subjects': subjects,
-                'youtube_url': color_info.get('youtube_src', ''),
-                'img_src': color_info.get('img_src', ''),
-                'num_colors': len(colors),
-                'num_subjects': len(subjects)
-            }
-            
-            merged_episodes.append(merged_episode)
+            merged_episodes.append(self.merge_episode(
+                episode_date,
+                colors_lookup.get(episode_num, {}),
+                subjects_lookup.get(episode_num, {})
+            ))
         
+        self.report_unparseable_dates()
         logger.info(f"Merged {len(merged_episodes)} episodes")
         return merged_episodes
     
-    def extract_unique_colors(self, episodes: List[Dict]) -> List[Dict]:
-        """Extract unique colors from all episodes"""
-        colors_dict = {}
+    def merge_stream(self, episode_dates: Iterable[Dict], colors_chunks: Iterable[List[Dict]],
+                     subject_chunks: Iterable[List[Dict]], chunk_size: int) -> Iterator[List[Dict]]:
+        """Merge chunked sources keyed by episode_num, yielding merged chunks in date order
         
-        for episode in episodes:
-            for color in episode.get('colors', []):
-                color_name = color['name']
-                if color_name not in colors_dict:
-                    colors_dict[color_name] = {
-                        'name': color_name,
-                        'hex': color.get('hex'),
-                        'episodes': []
-                    }
-                colors_dict[color_name]['episodes'].append(episode['episode_num'])
+        One chunk of each source is read per chunk of dates. Color and
+        subject records wait in a buffer until their episode comes up, and
+        episodes wait until both of their records have arrived or the source
+        is exhausted. Memory stays bounded as long as the three sources list
+        episodes in roughly the same order.
+        """
+        self.unparseable_dates = {}
+        sources = {
+            'colors': {'chunks': iter(colors_chunks), 'pending': {}, 'done': False},
+            'subjects': {'chunks': iter(subject_chunks), 'pending': {}, 'done': False}
+        }
+        waiting = deque()
+        dates = iter(episode_dates)
+        
+        def read_chunk(source, wanted=None):
+            chunk = next(source['chunks'], None)
+            if chunk is None:
+                source['done'] = True
+                return
+            for item in chunk:
+                if wanted is None or item['episode_num'] in wanted:
+                    source['pending'][item['episode_num']] = item
+        
+        def is_ready(episode_num):
+            return all(
+                source['done'] or episode_num in source['pending']
+                for source in sources.values()
+            )
+        
+        def drain_ready(flush=False):
+            merged = []
+            while waiting and (flush or is_ready(waiting[0]['episode_num'])):
+                episode_date = waiting.popleft()
+                episode_num = episode_date['episode_num']
+                merged.append(self.merge_episode(
+                    episode_date,
+                    sources['colors']['pending'].pop(episode_num, {}),
+                    sources['subjects']['pending'].pop(episode_num, {})
+                ))
+            return merged
+        
+        while True:
+            dates_chunk = list(islice(dates, chunk_size))
+            if not dates_chunk:
+                break
+            
+            waiting.extend(dates_chunk)
+            self.warm_date_cache(episode_date['air_date_str'] for episode_date in dates_chunk)
+            for source in sources.values():
+                if not source['done']:
+                    read_chunk(source)
+            
+            merged = drain_ready()
+            if merged:
+                yield merged
         
+        wanted = {episode_date['episode_num'] for episode_date in waiting}
+        for source in sources.values():
+            while not source['done'] and wanted:
+                read_chunk(source, wanted)
+        
+        while waiting:
+            merged = drain_ready(flush=True)
+            for start in range(0, len(merged), chunk_size):
+                yield merged[start:start + chunk_size]
+        
+        self.report_unparseable_dates()
+    
+    def accumulate_colors(self, colors_dict: Dict, episode: Dict):
+        """Add one episode's colors to the unique colors aggregate"""
+        for color in episode.get('colors', []):
+            color_name = color['name']
+            if color_name not in colors_dict:
+                colors_dict[color_name] = {
+                    'name': color_name,
+                    'hex': color.get('hex'),
+                    'episodes': []
+                }
+            colors_dict[color_name]['episodes'].append(episode['episode_num'])
+    
+    def finalize_colors(self, colors_dict: Dict) -> List[Dict]:
+        """Turn the colors aggregate into color documents"""
         unique_colors = []
         for color_name, color_data in colors_dict.items():
             unique_colors.append({
@@ -183,19 +346,27 @@ class DataTransformer:
         logger.info(f"Found {len(unique_colors)} unique colors")
         return unique_colors
     
-    def extract_unique_subjects(self, episodes: List[Dict]) -> List[Dict]:
-        """Extract unique subjects from all episodes"""
-        subjects_dict = {}
+    def extract_unique_colors(self, episodes: List[Dict]) -> List[Dict]:
+        """Extract unique colors from all episodes"""
+        colors_dict = {}
         
         for episode in episodes:
-            for subject in episode.get('subjects', []):
-                if subject not in subjects_dict:
-                    subjects_dict[subject] = {
-                        'name': subject,
-                        'episodes': []
-                    }
-                subjects_dict[subject]['episodes'].append(episode['episode_num'])
+            self.accumulate_colors(colors_dict, episode)
         
+        return self.finalize_colors(colors_dict)
+    
+    def accumulate_subjects(self, subjects_dict: Dict, episode: Dict):
+        """Add one episode's subjects to the unique subjects aggregate"""
+        for subject in episode.get('subjects', []):
+            if subject not in subjects_dict:
+                subjects_dict[subject] = {
+                    'name': subject,
+                    'episodes': []
+                }
+            subjects_dict[subject]['episodes'].append(episode['episode_num'])
+    
+    def finalize_subjects(self, subjects_dict: Dict) -> List[Dict]:
+        """Turn the subjects aggregate into subject documents"""
         unique_subjects = []
         for subject_name, subject_data in subjects_dict.items():
             unique_subjects.append({
@@ -209,6 +380,15 @@ class DataTransformer:
         logger.info(f"Found {len(unique_subjects)} unique subjects")
         return unique_subjects
     
+    def extract_unique_subjects(self, episodes: List[Dict]) -> List[Dict]:
+        """Extract unique subjects from all episodes"""
+        subjects_dict = {}
+        
+        for episode in episodes:
+            self.accumulate_subjects(subjects_dict, episode)
+        
+        return self.finalize_subjects(subjects_dict)
+    
     def transform_all(self, raw_data: Dict) -> Dict:
         """Transform all extracted data"""
         logger.info("Starting data transformation...")
@@ -227,6 +407,26 @@ class DataTransformer:
             'colors': colors,
             'subjects': subjects
         }
+    
+    def transform_stream(self, episode_dates: Iterable[Dict], colors_chunks: Iterable[List[Dict]],
+                         subject_chunks: Iterable[List[Dict]], chunk_size: int,
+                         aggregates: Dict) -> Iterator[List[Dict]]:
+        """Transform chunked sources, accumulating colors/subjects into aggregates
+        
+        Once the generator is exhausted, aggregates['colors'] and
+        aggregates['subjects'] hold the same documents transform_all returns.
+        """
+        colors_dict = {}
+        subjects_dict = {}
+        
+        for episodes in self.merge_stream(episode_dates, colors_chunks, subject_chunks, chunk_size):
+            for episode in episodes:
+                self.accumulate_colors(colors_dict, episode)
+                self.accumulate_subjects(subjects_dict, episode)
+            yield episodes
+        
+        aggregates['colors'] = self.finalize_colors(colors_dict)
+        aggregates['subjects'] = self.finalize_subjects(subjects_dict)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.snapshot import write_snapshot
+from src.database.store import episode_store
+from src.etl.extract import DataExtractor
+from src.etl.transform import DataTransformer
+from src.etl.synthetic import SyntheticDatasetGenerator
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMAT = 1
+DEFAULT_SIZES = [1000, 10000]
+FILTER_TERM_COUNTS = [1, 2, 4]
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Timing statistics in milliseconds for a list of samples in seconds"""
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'median_ms': round(statistics.median(ordered) * 1000, 4),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p95_ms': round(ordered[p95_index] * 1000, 4)
+    }
+
+def time_call(function: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Run function warmup + repeat times and summarize the timed runs"""
+    for _ in range(warmup):
+        function()
+    
+    samples = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def build_episodes(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run extract and transform on a raw data directory, giving each episode a fake _id"""
+    raw_data = DataExtractor(directory).extract_all()
+    episodes = DataTransformer().transform_all(raw_data)['episodes']
+    for index, episode in enumerate(episodes):
+        episode['_id'] = f"{index:024x}"
+    return episodes
+
+class BenchmarkSuite:
+    """Times the API hot paths and the ETL stages on synthetic datasets of several sizes
+    
+    Everything runs in-process: datasets come from the seeded generator,
+    the API is served by Flask's test client from a ColumnarEpisodeStore
+    installed in the episode store, and "load" measures building that
+    store and writing its snapshot. MongoDB is not needed.
+    """
+    
+    def __init__(self, sizes: Optional[List[int]] = None, repeat: int = 10, etl_repeat: int = 3,
+                 seed: int = 0, data_dir: Optional[str] = None):
+        self.sizes = sizes or DEFAULT_SIZES
+        self.repeat = repeat
+        self.etl_repeat = etl_repeat
+        self.seed = seed
+        self.data_dir = data_dir or Config.SYNTHETIC_DATA_DIR
+    
+    def prepare_dataset(self, size: int) -> str:
+        """Directory with the synthetic dataset for size, generated on first use"""
+        directory = os.path.join(self.data_dir, f"{size}-{self.seed}")
+        if not os.path.exists(os.path.join(directory, os.path.basename(Config.SUBJECT_MATTER_FILE))):
+            SyntheticDatasetGenerator(episodes=size, seed=self.seed).write(directory)
+        return directory
+    
+    def run_etl_benchmarks(self, directory: str) -> Dict[str, Any]:
+        """Time extract, transform and load, returning results and the built store"""
+        extractor = DataExtractor(directory)
+        raw_data = extractor.extract_all()
+        episodes = build_episodes(directory)
+        
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            snapshot_path = os.path.join(snapshot_dir, 'episodes.snapshot')
+            
+            def load():
+                write_snapshot(ColumnarEpisodeStore.from_episodes(episodes), 'benchmark', snapshot_path)
+            
+            results = {
+                'etl.extract': time_call(extractor.extract_all, self.etl_repeat, warmup=0),
+                'etl.transform': time_call(lambda: DataTransformer().transform_all(raw_data), self.etl_repeat, warmup=0),
+                'etl.load': time_call(load, self.etl_repeat, warmup=0)
+            }
+        
+        return {'results': results, 'store': ColumnarEpisodeStore.from_episodes(episodes)}
+    
+    def api_requests(self, store: ColumnarEpisodeStore) -> Dict[str, str]:
+        """Benchmark name -> request path for the API hot paths"""
+        color_usage, subject_usage = store.usage_counts()
+        top_colors = [name for name, _ in sorted(color_usage.items(), key=lambda x: x[1], reverse=True)]
+        top_subjects = [name for name, _ in sorted(subject_usage.items(), key=lambda x: x[1], reverse=True)]
+        middle = len(store) // 2
+        
+        requests = {
+            'api.episodes.first_page': '/episodes?page=1&per_page=50',
+            'api.episodes.deep_page': f"/episodes?page={max(middle // 50, 1)}&per_page=50",
+            'api.episode.by_id': f"/episodes/{store.ids[middle]}",
+            'api.episode.by_number': f"/episodes/{store.episode_nums[middle]}",
+            'api.stats': '/stats'
+        }
+        
+        for match_type in ['any', 'all']:
+            for count in FILTER_TERM_COUNTS:
+                colors = ','.join(top_colors[:count])
+                subjects = ','.join(top_subjects[:count])
+                requests[f"api.filter.colors.{match_type}.{count}"] = f"/episodes/filter?colors={colors}&match={match_type}"
+                requests[f"api.filter.subjects.{match_type}.{count}"] = f"/episodes/filter?subjects={subjects}&match={match_type}"
+            requests[f"api.filter.month_colors.{match_type}"] = (
+                f"/episodes/filter?month=march&colors={top_colors[0]}&match={match_type}"
+            )
+        
+        return requests
+    
+    def run_api_benchmarks(self, store: ColumnarEpisodeStore) -> Dict[str, Any]:
+        """Time each API request against the in-process store"""
+        from src.api.app import create_app
+        
+        episode_store.install(store, 'benchmark')
+        try:
+            app = create_app()
+            app.config['TESTING'] = True
+            client = app.test_client()
+            
+            results = {}
+            for name, path in self.api_requests(store).items():
+                def request():
+                    response = client.get(path)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{path} returned {response.status_code}")
+                    return response
+                
+                results[name] = time_call(request, self.repeat)
+            return results
+        finally:
+            episode_store.reset()
+    
+    def run(self) -> Dict[str, Any]:
+        """Run every benchmark at every size and return the report"""
+        report = {
+            'format': REPORT_FORMAT,
+            'meta': {
+                'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': self.seed,
+                'repeat': self.repeat,
+                'etl_repeat': self.etl_repeat
+            },
+            'results': {}
+        }
+        
+        for size in self.sizes:
+            logger.warning(f"Benchmarking {size} episodes...")
+            directory = self.prepare_dataset(size)
+            etl = self.run_etl_benchmarks(directory)
+            
+            results = dict(etl['results'])
+            results.update(self.run_api_benchmarks(etl['store']))
+            report['results'][str(size)] = results
+        
+        return report
+
+def save_report(report: Dict[str, Any], path: str) -> str:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    return path
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as file:
+        report = json.load(file)
+    if report.get('format') != REPORT_FORMAT:
+        raise ValueError(f"Unsupported benchmark report format in {path}")
+    return report
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+                    min_delta_ms: float = 0.05) -> List[Dict[str, Any]]:
+    """Per-benchmark median changes for benchmarks present in both reports
+    
+    A benchmark regressed when its median grew by more than threshold
+    (a fraction) and by more than min_delta_ms, which keeps sub-tick
+    noise on very fast paths from being flagged.
+    """
+    rows = []
+    for size, results in current.get('results', {}).items():
+        baseline_results = baseline.get('results', {}).get(size, {})
+        for name, stats in results.items():
+            if name not in baseline_results:
+                continue
+            
+            before = baseline_results[name]['median_ms']
+            after = stats['median_ms']
+            change = (after - before) / before if before else 0.0
+            rows.append({
+                'size': int(size),
+                'benchmark': name,
+                'baseline_ms': before,
+                'current_ms': after,
+                'change': round(change, 4),
+                'regression': change > threshold and after - before > min_delta_ms
+            })
+    
+    rows.sort(key=lambda row: (row['size'], row['benchmark']))
+    return rows
+
+def print_report(report: Dict[str, Any]):
+    for size, results in report['results'].items():
+        print(f"\n📏 {size} episodes")
+        for name, stats in sorted(results.items()):
+            print(f"   {name:<36} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms")
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float):
+    print(f"\n📊 Comparison against baseline (threshold {threshold:.0%})")
+    for row in rows:
+        marker = '❌' if row['regression'] else '  '
+        print(
+            f"{marker} {row['size']:>8} {row['benchmark']:<36} "
+            f"{row['baseline_ms']:>10.3f} -> {row['current_ms']:>10.3f} ms ({row['change']:+.1%})"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point, returning the process exit code"""
+    import argparse
+    
+    baseline_path = os.path.join(Config.BENCHMARK_DIR, 'baseline.json')
+    
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths and ETL stages')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Dataset sizes in episodes')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per API benchmark')
+    parser.add_argument('--etl-repeat', type=int, default=3, help='Timed runs per ETL stage')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic dataset seed')
+    parser.add_argument('--output', default=os.path.join(Config.BENCHMARK_DIR, 'latest.json'),
+                        help='Where to write this run\'s results')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Also write the results to {baseline_path}')
+    parser.add_argument('--compare', nargs='?', const=baseline_path, default=None,
+                        help='Compare against a baseline file (default the saved baseline)')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed median slowdown as a fraction')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    suite = BenchmarkSuite(sizes=args.sizes, repeat=args.repeat, etl_repeat=args.etl_repeat, seed=args.seed)
+    report = suite.run()
+    
+    print_report(report)
+    print(f"\n💾 Results written to {save_report(report, args.output)}")
+    if args.save_baseline:
+        print(f"💾 Baseline written to {save_report(report, baseline_path)}")
+    
+    if args.compare:
+        rows = compare_reports(load_report(args.compare), report, args.threshold)
+        print_comparison(rows, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print("\n✅ No regressions")
+    
+    return 0
@@ -0,0 +1,440 @@
+import asyncio
+import http.client
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from config import Config
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.store import episode_store
+from src.etl.synthetic import SyntheticDatasetGenerator
+from src.perf.benchmarks import REPORT_FORMAT, build_episodes, load_report, save_report
+
+logger = logging.getLogger(__name__)
+
+REPORT_KIND = 'loadtest'
+DEFAULT_CONCURRENCY = [1, 8, 32]
+MODES = ('threads', 'asyncio')
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june',
+          'july', 'august', 'september', 'october', 'november', 'december']
+
+# Relative weights of the endpoints in the replayed traffic
+DEFAULT_MIX = {
+    'episodes.page': 30,
+    'episode.lookup': 25,
+    'filter.month': 10,
+    'filter.colors': 10,
+    'filter.subjects': 10,
+    'filter.combined': 10,
+    'stats': 5
+}
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def latency_summary(samples: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles in milliseconds for one endpoint"""
+    ordered = sorted(samples)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0
+    }
+
+class RequestMix:
+    """Weighted, seeded generator of realistic request paths for a dataset"""
+    
+    def __init__(self, store: ColumnarEpisodeStore, weights: Optional[Dict[str, int]] = None, seed: int = 0):
+        self.weights = weights or DEFAULT_MIX
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        
+        color_usage, subject_usage = store.usage_counts()
+        self.colors = [name for name, _ in sorted(color_usage.items(), key=lambda x: x[1], reverse=True)][:12]
+        self.subjects = [name for name, _ in sorted(subject_usage.items(), key=lambda x: x[1], reverse=True)][:20]
+        self.episode_nums = list(store.episode_nums)
+        self.pages = max(1, len(store) // 50)
+        
+        self.builders = {
+            'episodes.page': self.episodes_page,
+            'episode.lookup': self.episode_lookup,
+            'filter.month': self.filter_month,
+            'filter.colors': self.filter_colors,
+            'filter.subjects': self.filter_subjects,
+            'filter.combined': self.filter_combined,
+            'stats': lambda: '/stats'
+        }
+        self.names = [name for name in self.weights if self.weights[name] > 0]
+        self.cumulative = []
+        total = 0
+        for name in self.names:
+            total += self.weights[name]
+            self.cumulative.append(total)
+    
+    def episodes_page(self) -> str:
+        return f"/episodes?page={self.random.randint(1, self.pages)}&per_page=50"
+    
+    def episode_lookup(self) -> str:
+        return f"/episodes/{self.random.choice(self.episode_nums)}"
+    
+    def terms(self, names: List[str]) -> Tuple[str, str]:
+        chosen = self.random.sample(names, min(len(names), self.random.randint(1, 3)))
+        return quote(','.join(chosen)), self.random.choice(['any', 'all'])
+    
+    def filter_month(self) -> str:
+        return f"/episodes/filter?month={self.random.choice(MONTHS)}"
+    
+    def filter_colors(self) -> str:
+        colors, match_type = self.terms(self.colors)
+        return f"/episodes/filter?colors={colors}&match={match_type}"
+    
+    def filter_subjects(self) -> str:
+        subjects, match_type = self.terms(self.subjects)
+        return f"/episodes/filter?subjects={subjects}&match={match_type}"
+    
+    def filter_combined(self) -> str:
+        colors, _ = self.terms(self.colors)
+        subjects, match_type = self.terms(self.subjects)
+        return f"/episodes/filter?month={self.random.choice(MONTHS)}&colors={colors}&subjects={subjects}&match={match_type}"
+    
+    def next(self) -> Tuple[str, str]:
+        """(endpoint name, path) of the next request"""
+        with self.lock:
+            point = self.random.random() * self.cumulative[-1]
+            for name, bound in zip(self.names, self.cumulative):
+                if point < bound:
+                    return name, self.builders[name]()
+            return self.names[-1], self.builders[self.names[-1]]()
+
+class LocalServer:
+    """The API served by a threaded werkzeug server from an in-process store"""
+    
+    def __init__(self, store: ColumnarEpisodeStore, host: str = '127.0.0.1', port: int = 0):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.app = None
+        self.server = None
+        self.thread = None
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.server.host}:{self.server.port}"
+    
+    def __enter__(self) -> 'LocalServer':
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        from src.api.app import create_app
+        
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+        
+        # Installed first, so create_app warms up against the store being measured
+        episode_store.install(self.store, 'loadtest')
+        self.app = create_app()
+        self.server = make_server(self.host, self.port, self.app, threaded=True, request_handler=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name='loadtest-server', daemon=True)
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.thread.join()
+        episode_store.reset()
+
+class LoadGenerator:
+    """Replays a request mix against a base URL at a fixed concurrency
+    
+    Each worker sends requests back to back (closed loop), so throughput
+    reflects server capacity at that concurrency. Workers are threads
+    reusing an http.client connection (which reconnects whenever the
+    server closes it, as werkzeug does after every response) or asyncio
+    tasks opening a connection per request.
+    """
+    
+    def __init__(self, url: str, mix: RequestMix, concurrency: int, duration: float = 10.0,
+                 max_requests: Optional[int] = None, mode: str = 'threads'):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        
+        parts = urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.mix = mix
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.max_requests = max_requests
+        self.mode = mode
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        self.issued = 0
+    
+    def claim(self, deadline: float) -> bool:
+        """Whether a worker may send another request"""
+        if time.perf_counter() >= deadline:
+            return False
+        if self.max_requests is None:
+            return True
+        with self.lock:
+            if self.issued >= self.max_requests:
+                return False
+            self.issued += 1
+            return True
+    
+    def record(self, name: str, seconds: float, ok: bool):
+        with self.lock:
+            if ok:
+                self.samples.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+    
+    def thread_worker(self, deadline: float):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            while self.claim(deadline):
+                name, path = self.mix.next()
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status < 500
+                except (OSError, http.client.HTTPException) as e:
+                    logger.debug(f"Request {path} failed: {e}")
+                    connection.close()
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                    ok = False
+                self.record(name, time.perf_counter() - start, ok)
+        finally:
+            connection.close()
+    
+    async def fetch(self, path: str) -> int:
+        """Send one GET on its own connection and read the response, returning its status"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nConnection: close\r\n\r\n".encode('latin-1')
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split(b' ', 2)[1])
+        finally:
+            writer.close()
+    
+    async def async_worker(self, deadline: float):
+        while self.claim(deadline):
+            name, path = self.mix.next()
+            start = time.perf_counter()
+            try:
+                ok = await self.fetch(path) < 500
+            except (OSError, ValueError, IndexError) as e:
+                logger.debug(f"Request {path} failed: {e}")
+                ok = False
+            self.record(name, time.perf_counter() - start, ok)
+    
+    async def run_async(self, deadline: float):
+        await asyncio.gather(*(self.async_worker(deadline) for _ in range(self.concurrency)))
+    
+    def run(self) -> Dict[str, Any]:
+        """Drive load until the duration or request budget runs out and summarize it"""
+        start = time.perf_counter()
+        deadline = start + self.duration
+        
+        if self.mode == 'asyncio':
+            asyncio.run(self.run_async(deadline))
+        else:
+            workers = [
+                threading.Thread(target=self.thread_worker, args=(deadline,), name=f"loadtest-{n}")
+                for n in range(self.concurrency)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        
+        elapsed = time.perf_counter() - start
+        endpoints = {
+            name: latency_summary(self.samples.get(name, []), self.errors.get(name, 0), elapsed)
+            for name in sorted(set(self.samples) | set(self.errors))
+        }
+        every_sample = [sample for samples in self.samples.values() for sample in samples]
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'total': latency_summary(every_sample, sum(self.errors.values()), elapsed),
+            'endpoints': endpoints
+        }
+
+def build_store(episodes: int = 0, seed: int = 0, data_dir: Optional[str] = None) -> ColumnarEpisodeStore:
+    """Store built from data/raw, or from a synthetic dataset of the given size"""
+    directory = None
+    if episodes:
+        directory = os.path.join(data_dir or Config.SYNTHETIC_DATA_DIR, f"{episodes}-{seed}")
+        if not os.path.exists(os.path.join(directory, os.path.basename(Config.SUBJECT_MATTER_FILE))):
+            SyntheticDatasetGenerator(episodes=episodes, seed=seed).write(directory)
+    return ColumnarEpisodeStore.from_episodes(build_episodes(directory))
+
+def run_load_test(store: ColumnarEpisodeStore, concurrency_levels: List[int], duration: float = 10.0,
+                  max_requests: Optional[int] = None, mode: str = 'threads', seed: int = 0,
+                  url: Optional[str] = None, weights: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Run the mix at each concurrency level against url, or a local server when url is None"""
+    report = {
+        'format': REPORT_FORMAT,
+        'kind': REPORT_KIND,
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'target': url or 'local',
+            'episodes': len(store),
+            'mode': mode,
+            'duration_s': duration,
+            'max_requests': max_requests,
+            'seed': seed,
+            'mix': weights or DEFAULT_MIX
+        },
+        'results': {}
+    }
+    
+    def drive(base_url: str):
+        for concurrency in concurrency_levels:
+            logger.warning(f"Load testing {base_url} at concurrency {concurrency} ({mode})...")
+            mix = RequestMix(store, weights, seed)
+            generator = LoadGenerator(base_url, mix, concurrency, duration, max_requests, mode)
+            report['results'][str(concurrency)] = generator.run()
+    
+    if url:
+        drive(url)
+    else:
+        with LocalServer(store) as server:
+            drive(server.url)
+    
+    return report
+
+def compare_load_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """Throughput and tail-latency changes per concurrency level and endpoint
+    
+    A row regressed when throughput fell or p95 rose by more than
+    threshold (a fraction).
+    """
+    rows = []
+    for concurrency, result in current.get('results', {}).items():
+        before_result = baseline.get('results', {}).get(concurrency)
+        if before_result is None:
+            continue
+        
+        pairs = [('total', before_result['total'], result['total'])]
+        for name, stats in result['endpoints'].items():
+            if name in before_result['endpoints']:
+                pairs.append((name, before_result['endpoints'][name], stats))
+        
+        for name, before, after in pairs:
+            throughput = change(before['throughput_rps'], after['throughput_rps'])
+            p95 = change(before['p95_ms'], after['p95_ms'])
+            rows.append({
+                'concurrency': int(concurrency),
+                'endpoint': name,
+                'baseline_rps': before['throughput_rps'],
+                'current_rps': after['throughput_rps'],
+                'throughput_change': throughput,
+                'baseline_p95_ms': before['p95_ms'],
+                'current_p95_ms': after['p95_ms'],
+                'p95_change': p95,
+                'baseline_p99_ms': before['p99_ms'],
+                'current_p99_ms': after['p99_ms'],
+                'regression': throughput < -threshold or p95 > threshold
+            })
+    
+    rows.sort(key=lambda row: (row['concurrency'], row['endpoint'] != 'total', row['endpoint']))
+    return rows
+
+def change(before: float, after: float) -> float:
+    return round((after - before) / before, 4) if before else 0.0
+
+def print_load_report(report: Dict[str, Any]):
+    for concurrency, result in report['results'].items():
+        total = result['total']
+        print(f"\n🔀 Concurrency {concurrency}: {total['requests']} requests in {result['elapsed_s']}s, "
+              f"{total['throughput_rps']} req/s, {total['errors']} errors")
+        print(f"   {'endpoint':<18} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, stats in list(result['endpoints'].items()) + [('total', total)]:
+            print(
+                f"   {name:<18} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>9.2f} "
+                f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['errors']:>7}"
+            )
+
+def print_load_comparison(rows: List[Dict[str, Any]], threshold: float):
+    print(f"\n📊 Comparison against baseline (threshold {threshold:.0%})")
+    for row in rows:
+        marker = '❌' if row['regression'] else '  '
+        print(
+            f"{marker} c={row['concurrency']:<4} {row['endpoint']:<18} "
+            f"{row['baseline_rps']:>9.1f} -> {row['current_rps']:>9.1f} req/s ({row['throughput_change']:+.1%})   "
+            f"p95 {row['baseline_p95_ms']:>8.2f} -> {row['current_p95_ms']:>8.2f} ms ({row['p95_change']:+.1%})"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point, returning the process exit code"""
+    import argparse
+    
+    baseline_path = os.path.join(Config.BENCHMARK_DIR, 'loadtest-baseline.json')
+    
+    parser = argparse.ArgumentParser(description='Replay a weighted request mix against the API')
+    parser.add_argument('--url', help='Target a running server instead of a local one (e.g. http://localhost:5000)')
+    parser.add_argument('--episodes', type=int, default=0,
+                        help='Serve a synthetic dataset of this size instead of data/raw (local server only)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the dataset and the request mix')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY,
+                        help='Concurrency levels to run, one after another')
+    parser.add_argument('--mode', choices=MODES, default='threads', help='Drive load from threads or asyncio tasks')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level')
+    parser.add_argument('--requests', type=int, default=None, help='Stop each level after this many requests')
+    parser.add_argument('--output', default=os.path.join(Config.BENCHMARK_DIR, 'loadtest-latest.json'),
+                        help='Where to write this run\'s results')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Also write the results to {baseline_path}')
+    parser.add_argument('--compare', nargs='?', const=baseline_path, default=None,
+                        help='Compare against a saved run (default the saved baseline)')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Allowed throughput drop or p95 increase as a fraction')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    store = build_store(args.episodes, args.seed)
+    report = run_load_test(store, args.concurrency, args.duration, args.requests, args.mode, args.seed, args.url)
+    
+    print_load_report(report)
+    print(f"\n💾 Results written to {save_report(report, args.output)}")
+    if args.save_baseline:
+        print(f"💾 Baseline written to {save_report(report, baseline_path)}")
+    
+    if args.compare:
+        baseline = load_report(args.compare)
+        if baseline.get('kind') != REPORT_KIND:
+            print(f"❌ {args.compare} is not a load test report")
+            return 2
+        rows = compare_load_reports(baseline, report, args.threshold)
+        print_load_comparison(rows, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f"\n❌ {len(regressions)} result(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print("\n✅ No regressions")
+    
+    return 0
@@ -0,0 +1,288 @@
+import gc
+import json
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.database.cache import model_cache
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.monitoring import query_monitor
+from src.database.store import episode_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP = 20
+DEFAULT_FRAMES = 1
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident set size now and at its peak, in bytes"""
+    usage = {'rss_bytes': None, 'peak_rss_bytes': None}
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    usage['rss_bytes'] = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    usage['peak_rss_bytes'] = int(line.split()[1]) * 1024
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux but bytes on macOS
+        usage['peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+    return usage
+
+def deep_sizeof(value: Any, seen: Optional[set] = None) -> int:
+    """Bytes held by a value and the containers and strings it reaches
+    
+    Objects already in seen are not counted again, so shared (interned)
+    strings are attributed to the first structure that reaches them.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    pending = [value]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+    return total
+
+def store_usage(store: Optional[ColumnarEpisodeStore]) -> Dict[str, Any]:
+    """Size of an episode store; snapshot columns are file-backed and shared between workers"""
+    if store is None:
+        return {'loaded': False}
+    
+    usage = {
+        'loaded': True,
+        'episodes': len(store),
+        'version': store.version,
+        'colors': len(store.colors),
+        'subjects': len(store.subjects),
+        'id_index_bytes': deep_sizeof(store._id_index) if store._id_index is not None else 0,
+        'number_index_bytes': deep_sizeof(store._number_index) if store._number_index is not None else 0
+    }
+    if store.mapping is not None:
+        usage['kind'] = 'snapshot'
+        usage['mapped_bytes'] = len(store.mapping)
+    else:
+        usage['kind'] = 'in-process'
+        usage['heap_bytes'] = store.nbytes()
+    return usage
+
+def structure_sizes() -> Dict[str, Any]:
+    """Sizes of the long-lived caches and indexes a worker holds"""
+    with model_cache._lock:
+        cache_entries = list(model_cache._entries.items())
+    with query_monitor._lock:
+        slowest = list(query_monitor._slowest)
+        counters = len(query_monitor._commands) + len(query_monitor._operations)
+    
+    return {
+        'episode_store': store_usage(episode_store._store),
+        'snapshot': store_usage(episode_store._snapshot),
+        'model_cache': {
+            'entries': len(cache_entries),
+            'max_entries': model_cache.max_entries,
+            'bytes': deep_sizeof(cache_entries)
+        },
+        'query_monitor': {
+            'pending': len(query_monitor._pending),
+            'slowest': len(slowest),
+            'counters': counters,
+            'bytes': deep_sizeof(slowest)
+        }
+    }
+
+def object_counts(top: int = DEFAULT_TOP) -> Dict[str, Any]:
+    """Live objects by type, and how many dicts are materialized episodes
+    
+    Walks every object the garbage collector tracks, so it takes tens of
+    milliseconds and is only run on request.
+    """
+    types = Counter()
+    episode_dicts = 0
+    episode_bytes = 0
+    seen = set()
+    for item in gc.get_objects():
+        types[type(item).__name__] += 1
+        if isinstance(item, dict) and 'episode_num' in item and 'colors' in item:
+            episode_dicts += 1
+            episode_bytes += deep_sizeof(item, seen)
+    return {
+        'tracked_objects': sum(types.values()),
+        'episode_dicts': episode_dicts,
+        'episode_dict_bytes': episode_bytes,
+        'by_type': [{'type': name, 'count': count} for name, count in types.most_common(top)]
+    }
+
+def memory_report(objects: bool = False, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+    """Process memory, structure sizes and, optionally, live object counts"""
+    report = {
+        'pid': os.getpid(),
+        'process': process_memory(),
+        'structures': structure_sizes(),
+        'tracemalloc': memory_tracer.status()
+    }
+    if objects:
+        report['objects'] = object_counts(top)
+    return report
+
+class MemoryTracer:
+    """tracemalloc with a baseline snapshot, for top-N allocation diffs"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline = None
+    
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        status = {'tracing': tracing, 'has_baseline': self._baseline is not None}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({'traced_bytes': current, 'traced_peak_bytes': peak,
+                           'frames': tracemalloc.get_traceback_limit()})
+        return status
+    
+    def start(self, frames: int = DEFAULT_FRAMES) -> Dict[str, Any]:
+        """Start tracing (if needed) and take the baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+            self._baseline = self.take_snapshot()
+        return self.status()
+    
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        """Snapshot without tracemalloc's and the import system's own allocations"""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')
+        ])
+    
+    def diff(self, top: int = DEFAULT_TOP, group_by: str = 'lineno', reset: bool = False) -> List[Dict[str, Any]]:
+        """Top allocation changes since the baseline, largest growth first
+        
+        Collects garbage first, so the diff shows what is actually retained.
+        """
+        gc.collect()
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._baseline is None:
+                raise RuntimeError('tracemalloc is not started')
+            snapshot = self.take_snapshot()
+            statistics = snapshot.compare_to(self._baseline, group_by)
+            if reset:
+                self._baseline = snapshot
+        
+        return [
+            {
+                'location': str(stat.traceback),
+                'size_diff_bytes': stat.size_diff,
+                'size_bytes': stat.size,
+                'count_diff': stat.count_diff,
+                'count': stat.count
+            }
+            for stat in statistics[:top]
+        ]
+    
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            self._baseline = None
+            tracemalloc.stop()
+        return self.status()
+
+memory_tracer = MemoryTracer()
+
+def format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return 'n/a'
+    for unit in ['B', 'KiB', 'MiB']:
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+def print_memory_report(report: Dict[str, Any]):
+    process = report['process']
+    print(f"\n🧠 Process {report['pid']}: RSS {format_bytes(process['rss_bytes'])}, "
+          f"peak {format_bytes(process['peak_rss_bytes'])}")
+    for name, usage in report['structures'].items():
+        details = ', '.join(
+            f"{key} {format_bytes(value) if key.endswith('bytes') else value}" for key, value in usage.items()
+        )
+        print(f"   {name:<14} {details}")
+    
+    if 'objects' in report:
+        objects = report['objects']
+        print(f"\n📦 {objects['tracked_objects']} tracked objects, {objects['episode_dicts']} episode dicts "
+              f"({format_bytes(objects['episode_dict_bytes'])})")
+        for row in objects['by_type']:
+            print(f"   {row['type']:<30} {row['count']:>10}")
+
+def print_allocation_diff(rows: List[Dict[str, Any]], title: str = 'since baseline'):
+    print(f"\n📈 Allocation growth {title}")
+    for row in rows:
+        print(f"   {format_bytes(row['size_diff_bytes']):>12} {row['count_diff']:>+9} blocks  {row['location']}")
+
+def fetch_remote_report(url: str, token: Optional[str] = None, objects: bool = False) -> Dict[str, Any]:
+    """Read /admin/memory from a running worker"""
+    from urllib.request import Request, urlopen
+    
+    request = Request(f"{url.rstrip('/')}/admin/memory" + ('?objects=1' if objects else ''))
+    if token:
+        request.add_header('X-Admin-Token', token)
+    with urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point, returning the process exit code"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Report worker memory by structure and trace allocations')
+    parser.add_argument('--url', help='Report on a running server (needs DIAGNOSTICS_ENABLED there)')
+    parser.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'), help='Admin token for --url')
+    parser.add_argument('--objects', action='store_true', help='Also count live objects by type')
+    parser.add_argument('--episodes', type=int, default=0,
+                        help='Serve a synthetic dataset of this size instead of data/raw (local only)')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='Requests to replay locally between the two tracemalloc snapshots')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='Rows in the allocation diff')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='Traceback depth recorded per allocation')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    if args.url:
+        print_memory_report(fetch_remote_report(args.url, args.token, args.objects))
+        return 0
+    
+    from src.api.app import create_app
+    from src.perf.loadtest import RequestMix, build_store
+    
+    memory_tracer.start(args.frames)
+    store = build_store(args.episodes)
+    episode_store.install(store, 'memory-report')
+    print_allocation_diff(memory_tracer.diff(args.top, reset=True), 'building the store')
+    
+    client = create_app().test_client()
+    mix = RequestMix(store)
+    for _ in range(args.requests):
+        client.get(mix.next()[1])
+    print_allocation_diff(memory_tracer.diff(args.top), f"over {args.requests} requests")
+    
+    print_memory_report(memory_report(args.objects, args.top))
+    memory_tracer.stop()
+    return 0
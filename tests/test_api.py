@@ -2,10 +2,19 @@ import unittest
 import json
 import sys
 import os
+import subprocess
+import tempfile
+from unittest import mock
 
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 
+from config import Config
 from src.api.app import create_app
+from src.api.warmup import warm_up
+from src.api.metrics import MetricsRegistry
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.heartbeat import Heartbeat, heartbeat
+from src.database.store import episode_store
 
 class TestAPI(unittest.TestCase):
     """Test API endpoints"""
@@ -73,5 +82,266 @@ class TestAPI(unittest.TestCase):
         self.assertIn('error', data)
         self.assertEqual(data['error'], 'Not found')
 
+    def test_server_timing_header(self):
+        """Test that responses carry per-phase Server-Timing durations"""
+        response = self.client.get('/')
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+    
+    def test_metrics_endpoint(self):
+        """Test the Prometheus metrics endpoint"""
+        self.client.get('/')
+        self.client.get('/invalid-endpoint')
+        
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        
+        text = response.data.decode('utf-8')
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('route="/",status="200"', text)
+        self.assertIn('route="<unmatched>",status="404"', text)
+        self.assertIn('http_requests_in_flight 1', text)
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test latency histogram recording and rendering"""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts, sums and phase totals"""
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        registry.observe('GET', '/stats', 200, 0.005, {'db': 0.002})
+        registry.observe('GET', '/stats', 200, 0.05, {'db': 0.003})
+        registry.observe('GET', '/stats', 200, 0.01)
+        registry.observe('GET', '/stats', 200, 3.0)
+        
+        lines = registry.render().splitlines()
+        labels = 'method="GET",route="/stats",status="200"'
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.01"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="0.1"}} 3', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4', lines)
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 4", lines)
+        self.assertIn('http_request_phase_seconds_sum{route="/stats",phase="db"} 0.005000', lines)
+        self.assertIn('http_request_phase_seconds_count{route="/stats",phase="db"} 2', lines)
+
+class TestHealth(unittest.TestCase):
+    """Test liveness and readiness answered from the heartbeat"""
+    
+    def setUp(self):
+        self.client = create_app().test_client()
+        self.ping = mock.patch.object(heartbeat, 'ping', lambda: None)
+        self.ping.start()
+        heartbeat.check()
+    
+    def tearDown(self):
+        self.ping.stop()
+        episode_store.reset()
+    
+    def test_heartbeat_records_latency_and_failures(self):
+        """Test that checks record latency, errors and consecutive failures"""
+        def failing_ping():
+            raise ConnectionError('no route to host')
+        
+        beat = Heartbeat(interval=60, ping=failing_ping)
+        beat.check()
+        state = beat.check()
+        self.assertEqual(state['database'], 'disconnected')
+        self.assertEqual(state['consecutive_failures'], 2)
+        self.assertIsNone(state['last_ok_at'])
+        
+        beat.ping = lambda: None
+        state = beat.check()
+        self.assertEqual(state['database'], 'connected')
+        self.assertEqual(state['consecutive_failures'], 0)
+        self.assertIsNotNone(state['latency_ms'])
+        self.assertEqual(state['checks'], 3)
+    
+    def test_health_answers_from_memory(self):
+        """Test that /health reports the last heartbeat without querying MongoDB"""
+        with mock.patch('src.database.models.Episode.find_all') as find_all:
+            response = self.client.get('/health')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['status'], 'healthy')
+        find_all.assert_not_called()
+    
+    def test_ready_requires_a_loaded_store(self):
+        """Test that /ready only passes once the episode store is loaded"""
+        episode_store.reset()
+        self.assertEqual(self.client.get('/ready').status_code, 503)
+        
+        episode_store.install(ColumnarEpisodeStore(), 'v1')
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.data)['checks']['store_loaded'])
+
+class TestProfiling(unittest.TestCase):
+    """Test the on-demand request profiler"""
+    
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(Config, 'PROFILING_ENABLED', True),
+            mock.patch.object(Config, 'PROFILE_DIR', self.profile_dir.name),
+            mock.patch.object(Config, 'PROFILE_KEEP', 2),
+            mock.patch.object(Config, 'ADMIN_TOKEN', 'secret'),
+            mock.patch.object(Config, 'ADMIN_TRUSTED_IPS', ['127.0.0.1'])
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.client = create_app().test_client()
+    
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.profile_dir.cleanup()
+    
+    def test_profile_is_stored_and_rotated(self):
+        """Test that profiled requests write .prof files and only the newest are kept"""
+        for _ in range(3):
+            response = self.client.get('/?_profile=1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('name', json.loads(response.data))
+        
+        stored = os.listdir(self.profile_dir.name)
+        self.assertEqual(len(stored), 2)
+        self.assertIn(response.headers['X-Profile-File'], stored)
+    
+    def test_profile_top_functions(self):
+        """Test that ?_profile=top answers with the profile instead of the body"""
+        response = self.client.get('/stats?_profile=top')
+        data = json.loads(response.data)
+        
+        self.assertEqual(data['route'], '/stats')
+        self.assertIn('status', data)
+        self.assertTrue(any('get_stats' in row['function'] for row in data['top_functions']))
+    
+    def test_untrusted_callers_are_not_profiled(self):
+        """Test that only trusted addresses or the token enable profiling"""
+        remote = {'REMOTE_ADDR': '203.0.113.7'}
+        
+        response = self.client.get('/', headers={'X-Profile': '1'}, environ_base=remote)
+        self.assertNotIn('X-Profile-File', response.headers)
+        
+        response = self.client.get('/', headers={'X-Profile': '1', 'X-Admin-Token': 'wrong'}, environ_base=remote)
+        self.assertNotIn('X-Profile-File', response.headers)
+        
+        response = self.client.get('/', headers={'X-Profile': '1', 'X-Admin-Token': 'secret'}, environ_base=remote)
+        self.assertIn('X-Profile-File', response.headers)
+
+class TestDiagnostics(unittest.TestCase):
+    """Test the admin memory diagnostics endpoints"""
+    
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(Config, 'DIAGNOSTICS_ENABLED', True),
+            mock.patch.object(Config, 'ADMIN_TRUSTED_IPS', ['127.0.0.1'])
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.client = create_app().test_client()
+    
+    def tearDown(self):
+        self.client.delete('/admin/memory/trace')
+        for patch in self.patches:
+            patch.stop()
+    
+    def test_memory_report(self):
+        """Test the structure sizes and object counts"""
+        response = self.client.get('/admin/memory?objects=1&top=5')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertIn('episode_store', data['structures'])
+        self.assertIn('model_cache', data['structures'])
+        self.assertEqual(len(data['objects']['by_type']), 5)
+        self.assertGreater(data['objects']['tracked_objects'], 0)
+    
+    def test_tracemalloc_diff(self):
+        """Test starting tracemalloc, diffing against the baseline and stopping"""
+        self.assertEqual(self.client.get('/admin/memory/trace').status_code, 409)
+        
+        started = json.loads(self.client.post('/admin/memory/trace').data)
+        self.assertTrue(started['tracing'])
+        
+        retained = [bytearray(1024) for _ in range(200)]
+        data = json.loads(self.client.get('/admin/memory/trace?top=5').data)
+        self.assertLessEqual(len(data['top']), 5)
+        self.assertTrue(any('test_api.py' in row['location'] and row['size_diff_bytes'] >= 200 * 1024
+                            for row in data['top']))
+        del retained
+        
+        stopped = json.loads(self.client.delete('/admin/memory/trace').data)
+        self.assertFalse(stopped['tracing'])
+    
+    def test_requires_trusted_caller(self):
+        """Test that other addresses are refused"""
+        response = self.client.get('/admin/memory', environ_base={'REMOTE_ADDR': '203.0.113.7'})
+        self.assertEqual(response.status_code, 403)
+    
+    def test_loopback_is_not_trusted_by_default(self):
+        """Test that without configured addresses only the token opens admin tooling"""
+        with mock.patch.object(Config, 'ADMIN_TRUSTED_IPS', []), \
+                mock.patch.object(Config, 'ADMIN_TOKEN', 'secret'):
+            self.assertEqual(self.client.get('/admin/memory').status_code, 403)
+            response = self.client.get('/admin/memory', headers={'X-Admin-Token': 'secret'})
+            self.assertEqual(response.status_code, 200)
+
+class TestStartup(unittest.TestCase):
+    """Test worker warm-up and startup timing"""
+    
+    def setUp(self):
+        self.ping = mock.patch.object(heartbeat, 'ping', lambda: None)
+        self.ping.start()
+        episode_store.install(ColumnarEpisodeStore(), 'v1')
+        self.client = create_app().test_client()
+    
+    def tearDown(self):
+        heartbeat.check()
+        self.ping.stop()
+        episode_store.reset()
+    
+    def test_ready_reports_warm_up(self):
+        """Test that /ready includes the warm-up steps and startup times"""
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertTrue(data['checks']['warmed_up'])
+        self.assertEqual(set(data['startup']['warm_up_steps']),
+                         {'database', 'store', 'indexes', 'model_cache', 'requests'})
+        self.assertIsNone(data['startup']['warm_up_steps']['indexes']['error'])
+        self.assertGreater(data['startup']['create_app_ms'], 0)
+    
+    def test_warm_up_skips_database_steps_when_unreachable(self):
+        """Test that a down database does not make every warm-up step wait for it"""
+        def unreachable():
+            raise ConnectionError('no servers')
+        
+        app = self.client.application
+        with mock.patch.object(heartbeat, 'ping', unreachable), \
+                mock.patch.object(episode_store, 'get') as get_store:
+            steps = warm_up(app)['warm_up_steps']
+        
+        get_store.assert_not_called()
+        self.assertEqual(heartbeat.state['database'], 'disconnected')
+        for name in ['store', 'indexes', 'model_cache', 'requests']:
+            self.assertEqual(steps[name]['skipped'], 'database unreachable')
+    
+    def test_warm_up_requests_are_not_metered(self):
+        """Test that warm-up traffic is left out of the request metrics"""
+        text = self.client.get('/metrics').data.decode('utf-8')
+        self.assertNotIn('route="/stats"', text)
+    
+    def test_app_import_skips_optional_tooling(self):
+        """Test that importing the app does not load pandas, the ETL or disabled tooling"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = (
+            "import sys; from src.api.app import create_app; "
+            "print(','.join(m for m in ('pandas', 'src.etl', 'src.api.metrics', 'src.api.profiling', 'src.api.diagnostics') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
 if __name__ == '__main__':
     unittest.main()
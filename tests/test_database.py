@@ -0,0 +1,469 @@
+import asyncio
+import threading
+import time
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from src.database.models import Episode, Meta, apply_membership_changes, stream_documents, bulk_insert_documents
+from src.database.indexes import IndexAdvisor
+from src.database.cache import ModelCache, Uncached, cached
+from src.database.monitoring import QueryMonitor, current_operation, monitored, query_shape
+from src.database.singleflight import SingleFlight
+from src.api.filters import EpisodeFilter
+
+class FakeCursor:
+    """Iterates documents and records whether it was closed"""
+    
+    def __init__(self, documents):
+        self.iterator = iter(documents)
+        self.closed = False
+    
+    def __iter__(self):
+        return self.iterator
+    
+    def close(self):
+        self.closed = True
+
+class FakeCollection:
+    """Minimal stand-in for a pymongo collection"""
+    
+    def __init__(self, documents):
+        self.documents = documents
+        self.find_args = None
+        self.cursor = None
+    
+    def find(self, query, projection, batch_size=None):
+        self.find_args = (query, projection, batch_size)
+        self.cursor = FakeCursor(self.documents)
+        return self.cursor
+
+class FakeInsertResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class FakeBulkCollection:
+    """Collection stand-in that rejects documents flagged as bad"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def insert_many(self, documents, ordered=True):
+        self.chunks.append((len(documents), ordered))
+        bad = [index for index, document in enumerate(documents) if document.get('bad')]
+        if bad:
+            raise BulkWriteError({
+                'nInserted': len(documents) - len(bad),
+                'writeErrors': [{'index': index, 'code': 11000, 'errmsg': 'duplicate key'} for index in bad]
+            })
+        return FakeInsertResult(list(range(len(documents))))
+
+class TestDatabase(unittest.TestCase):
+    """Test database query builders and index tooling"""
+    
+    def test_episode_indexes_cover_query_fields(self):
+        """Test that every field the filter query uses has an index"""
+        indexed_fields = set()
+        for index in Episode.indexes:
+            indexed_fields.update(field for field, _ in index.document['key'].items())
+        
+        query = Episode.build_filter_query({
+            'month': 'january',
+            'subjects': ['Trees'],
+            'colors': ['Titanium White']
+        })
+        
+        for field in query:
+            self.assertIn(field, indexed_fields)
+        self.assertIn('episode_num', indexed_fields)
+        self.assertIn('painting_index', indexed_fields)
+    
+    def test_build_filter_query(self):
+        """Test filter query construction"""
+        query = Episode.build_filter_query({'month': 'January', 'subjects': ['Trees']}, 'all')
+        self.assertEqual(query['air_date.month_name'], {'$regex': '^january'})
+        self.assertEqual(query['subjects'], {'$all': ['Trees']})
+        
+        query = Episode.build_filter_query({'colors': ['Sap Green ']}, 'any')
+        self.assertEqual(query, {'colors.name': {'$in': ['Sap Green']}})
+    
+    def test_build_id_query(self):
+        """Test id query construction"""
+        query = Episode.build_id_query('5f1d7f2b9c1e4a3b2c1d0e9f')
+        self.assertIn('_id', query)
+        
+        query = Episode.build_id_query('12')
+        self.assertEqual(query['$or'][0], {'episode_num': 12})
+    
+    def test_summarize_explain(self):
+        """Test that explain output is reduced to index usage"""
+        explain = {
+            'queryPlanner': {
+                'winningPlan': {
+                    'stage': 'FETCH',
+                    'inputStage': {'stage': 'IXSCAN', 'indexName': 'subjects_1'}
+                }
+            },
+            'executionStats': {'nReturned': 3, 'totalKeysExamined': 3, 'totalDocsExamined': 3}
+        }
+        summary = IndexAdvisor.summarize_explain(explain)
+        self.assertTrue(summary['uses_index'])
+        self.assertEqual(summary['indexes_used'], ['subjects_1'])
+        
+        explain = {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+        summary = IndexAdvisor.summarize_explain(explain)
+        self.assertFalse(summary['uses_index'])
+        self.assertEqual(summary['stages'], ['COLLSCAN'])
+
+    def test_stream_documents_is_lazy(self):
+        """Test that documents are yielded one by one with string ids"""
+        documents = [{'_id': ObjectId(), 'episode_num': 1}, {'episode_num': 2}]
+        collection = FakeCollection(documents)
+        
+        stream = stream_documents(collection, projection={'episode_num': 1}, batch_size=25)
+        first = next(stream)
+        
+        self.assertIsInstance(first['_id'], str)
+        self.assertEqual(collection.find_args, ({}, {'episode_num': 1}, 25))
+        self.assertNotIn('_id', next(stream))
+        
+        stream.close()
+        self.assertTrue(collection.cursor.closed)
+
+    def test_model_cache_invalidates_on_version_change(self):
+        """Test that a new dataset version clears cached results"""
+        versions = ['v1']
+        cache = ModelCache(version_provider=lambda: versions[0], poll_interval=0)
+        cache.enabled = True
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return len(calls)
+        
+        self.assertEqual(cache.get_or_load('key', loader), 1)
+        self.assertEqual(cache.get_or_load('key', loader), 1)
+        
+        versions[0] = 'v2'
+        self.assertEqual(cache.get_or_load('key', loader), 2)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+    
+    def test_model_cache_bypassed_without_version(self):
+        """Test that nothing is cached when no dataset version is known"""
+        cache = ModelCache(version_provider=lambda: None, poll_interval=0)
+        cache.enabled = True
+        calls = []
+        
+        cache.get_or_load('key', lambda: calls.append(1))
+        cache.get_or_load('key', lambda: calls.append(1))
+        
+        self.assertEqual(len(calls), 2)
+    
+    def test_model_cache_polls_the_version_from_one_thread(self):
+        """Test that a slow version read is not repeated by concurrent or following calls"""
+        reads = []
+        
+        def slow_provider():
+            reads.append(1)
+            time.sleep(0.3)
+            return 'v1'
+        
+        cache = ModelCache(version_provider=slow_provider, poll_interval=0.2)
+        cache.enabled = True
+        cache.current_version()
+        
+        time.sleep(0.25)
+        threads = [threading.Thread(target=cache.get_or_load, args=('key', lambda: 1)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(reads), 2)
+        
+        # The interval starts when the read finishes, not when it started
+        cache.current_version()
+        self.assertEqual(len(reads), 2)
+    
+    def test_model_cache_does_not_keep_failures(self):
+        """Test that a fallback returned after an error is served once, not cached"""
+        cache = ModelCache(version_provider=lambda: 'v1', poll_interval=0)
+        cache.enabled = True
+        results = [Uncached([]), [{'name': 'Sap Green'}]]
+        
+        self.assertEqual(cache.get_or_load('key', lambda: results.pop(0)), [])
+        self.assertEqual(cache.get_or_load('key', lambda: results.pop(0)), [{'name': 'Sap Green'}])
+        self.assertEqual(cache.get_or_load('key', lambda: results.pop(0)), [{'name': 'Sap Green'}])
+    
+    def test_cached_results_are_copied(self):
+        """Test that callers changing a cached result do not change it for others"""
+        cache = ModelCache(version_provider=lambda: 'v1', poll_interval=0)
+        cache.enabled = True
+        
+        class Model:
+            @classmethod
+            @cached
+            def find_by_id(cls, episode_id):
+                return {'_id': episode_id, 'air_date': {'month': 1}}
+            
+            @classmethod
+            @cached
+            def find_all(cls):
+                return [{'name': 'Sap Green'}]
+        
+        with mock.patch('src.database.cache.model_cache', cache):
+            episode = Model.find_by_id('1')
+            episode['air_date']['month'] = 2
+            colors = Model.find_all()
+            colors[0]['name'] = 'changed'
+            
+            self.assertEqual(Model.find_by_id('1')['air_date']['month'], 1)
+            self.assertEqual(Model.find_all(), [{'name': 'Sap Green'}])
+
+    def test_membership_changes_set_attributes(self):
+        """Test that changed attributes are set on existing documents, not only on insert"""
+        collection = mock.MagicMock()
+        apply_membership_changes(
+            collection, {'Sap Green': [3]}, {},
+            {'Sap Green': {'hex': '#0A3410'}, 'Titanium White': {'hex': '#FFFFFF'}}
+        )
+        
+        operations = collection.bulk_write.call_args[0][0]
+        updates = {operation._filter['name']: operation._doc for operation in operations if hasattr(operation, '_upsert')}
+        self.assertEqual(updates['Sap Green']['$set'], {'hex': '#0A3410'})
+        self.assertNotIn('$setOnInsert', updates['Sap Green'])
+        self.assertEqual(updates['Titanium White'], {'$set': {'hex': '#FFFFFF'}})
+    
+    def test_etl_row_hashes_live_outside_the_state_document(self):
+        """Test that row hashes are one document each and the state only keeps their count"""
+        meta, rows = mock.MagicMock(), mock.MagicMock()
+        collections = {'meta': meta, 'etl_rows': rows}
+        
+        with mock.patch('src.database.models.get_collection', side_effect=collections.get), \
+                mock.patch('src.database.models.bulk_insert_documents', return_value={'failed': 0}) as insert:
+            self.assertTrue(Meta.set_etl_state('v1', {'a.csv': 'f'}, {'1': 'd1', '2': 'd2'}))
+            self.assertEqual(list(insert.call_args[0][1]), [{'_id': '1', 'digest': 'd1'}, {'_id': '2', 'digest': 'd2'}])
+            self.assertEqual(meta.replace_one.call_args[0][1]['row_count'], 2)
+            self.assertNotIn('rows', meta.replace_one.call_args[0][1])
+            
+            changes = {'added': [3], 'changed': [], 'removed': [1]}
+            self.assertTrue(Meta.set_etl_state('v2', {}, {'2': 'd2', '3': 'd3'}, changes))
+            self.assertEqual(len(rows.bulk_write.call_args[0][0]), 2)
+            
+            meta.find_one.return_value = {'version': 'v2', 'row_count': 2}
+            rows.find.return_value = [{'_id': '2', 'digest': 'd2'}, {'_id': '3', 'digest': 'd3'}]
+            self.assertEqual(Meta.get_etl_state()['rows'], {'2': 'd2', '3': 'd3'})
+            
+            rows.find.return_value = [{'_id': '2', 'digest': 'd2'}]
+            self.assertIsNone(Meta.get_etl_state())
+    
+    def test_bulk_insert_accounts_per_chunk(self):
+        """Test that a bad document only fails itself, not the whole load"""
+        documents = ({'n': n, 'bad': n == 12} for n in range(25))
+        collection = FakeBulkCollection()
+        
+        result = bulk_insert_documents(collection, documents, batch_size=10, workers=2)
+        
+        self.assertEqual(result['chunks'], 3)
+        self.assertEqual(result['inserted'], 24)
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(result['failed_chunks'], 1)
+        self.assertEqual(result['errors'][0]['index'], 12)
+        self.assertEqual(sorted(collection.chunks), [(5, False), (10, False), (10, False)])
+
+    def test_bulk_insert_keeps_the_operation_in_worker_threads(self):
+        """Test that chunk writes are attributed to the operation that started the load"""
+        collection = FakeBulkCollection()
+        operations = []
+        insert_many = collection.insert_many
+        
+        def recording_insert_many(documents, ordered=True):
+            operations.append(current_operation.get())
+            return insert_many(documents, ordered)
+        
+        collection.insert_many = recording_insert_many
+        token = current_operation.set('Episode.bulk_insert')
+        try:
+            bulk_insert_documents(collection, ({'n': n} for n in range(25)), batch_size=10, workers=2)
+        finally:
+            current_operation.reset(token)
+        
+        self.assertEqual(operations, ['Episode.bulk_insert'] * 3)
+
+class TestQueryMonitor(unittest.TestCase):
+    """Test the MongoDB command listener"""
+    
+    def run_command(self, monitor, request_id, command, reply, duration_ms, operation=None):
+        token = current_operation.set(operation)
+        try:
+            monitor.started(SimpleNamespace(
+                command_name=next(iter(command)), command=command, connection_id=('db', 27017), request_id=request_id
+            ))
+        finally:
+            current_operation.reset(token)
+        monitor.succeeded(SimpleNamespace(
+            command_name=next(iter(command)), reply=reply, connection_id=('db', 27017),
+            request_id=request_id, duration_micros=int(duration_ms * 1000)
+        ))
+    
+    def test_query_shape_hides_values(self):
+        """Test that shapes keep fields and operators but not literals"""
+        query = {'air_date.month_name': {'$regex': '^march'}, 'subjects': {'$in': ['Tree', 'Snow']}}
+        self.assertEqual(
+            query_shape(query),
+            {'air_date.month_name': {'$regex': '?'}, 'subjects': {'$in': ['?']}}
+        )
+    
+    def test_records_per_command_and_operation(self):
+        """Test counters, attribution and the bounded slowest list"""
+        monitor = QueryMonitor(slow_query_ms=1000, keep_slowest=2, measure_bytes=True)
+        batch = {'cursor': {'firstBatch': [{'episode_num': 1}, {'episode_num': 2}], 'id': 0}, 'ok': 1}
+        
+        self.run_command(monitor, 1, {'find': 'episodes', 'filter': {'episode_num': 5}}, batch, 3, 'Episode.find_by_id')
+        self.run_command(monitor, 2, {'find': 'episodes', 'filter': {'subjects': {'$in': ['Tree']}}}, batch, 9, 'Episode.filter_episodes')
+        self.run_command(monitor, 3, {'count': 'colors', 'query': {}}, {'n': 7, 'ok': 1}, 1)
+        monitor.failed(SimpleNamespace(connection_id=('db', 27017), request_id=99, duration_micros=5))
+        
+        stats = monitor.stats()
+        find = next(command for command in stats['commands'] if command['command'] == 'find')
+        self.assertEqual(find['collection'], 'episodes')
+        self.assertEqual(find['commands'], 2)
+        self.assertEqual(find['documents'], 4)
+        self.assertGreater(find['bytes'], 0)
+        
+        self.assertEqual(stats['operations']['Episode.filter_episodes']['duration_ms'], 9)
+        self.assertEqual(stats['operations']['<none>']['documents'], 7)
+        
+        self.assertEqual([entry['duration_ms'] for entry in stats['slowest']], [9, 3])
+        self.assertEqual(stats['slowest'][0]['shape'], {'subjects': {'$in': ['?']}})
+        self.assertIn('mongodb_commands_total{operation="Episode.find_by_id"} 1', monitor.render())
+    
+    def test_monitored_model_methods_count_calls(self):
+        """Test that model methods are counted even when they fail without a connection"""
+        from src.database.monitoring import query_monitor
+        
+        before = query_monitor.stats()['operations'].get('Episode.build_filter_query')
+        self.assertIsNone(before)
+        
+        calls = query_monitor.stats()['operations'].get('Episode.count', {}).get('calls', 0)
+        Episode.count({'episode_num': 1})
+        self.assertEqual(query_monitor.stats()['operations']['Episode.count']['calls'], calls + 1)
+
+    def test_monitored_generators_close_the_wrapped_generator(self):
+        """Test that stopping early runs the method's cleanup, as a cursor needs"""
+        closed = []
+        
+        class Model:
+            @classmethod
+            @monitored
+            def iter_all(cls):
+                try:
+                    yield from range(10)
+                finally:
+                    closed.append(current_operation.get())
+        
+        iterator = Model.iter_all()
+        self.assertEqual(next(iterator), 0)
+        iterator.close()
+        self.assertEqual(closed, ['Model.iter_all'])
+
+class TestSingleFlight(unittest.TestCase):
+    """Test coalescing of identical concurrent computations"""
+    
+    def setUp(self):
+        self.flight = SingleFlight(timeout=5, enabled=True)
+    
+    def run_with_waiters(self, waiters: int, fn):
+        """Call fn through the flight from 1 + waiters threads, releasing it once all have joined"""
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+        
+        def leader_fn():
+            started.set()
+            release.wait(5)
+            return fn()
+        
+        def call(target):
+            try:
+                results.append(self.flight.do('query', ('colors', 'any'), target))
+            except Exception as e:
+                results.append(e)
+        
+        threads = [threading.Thread(target=call, args=(leader_fn,))]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=call, args=(fn,)) for _ in range(waiters)]
+        for thread in threads[1:]:
+            thread.start()
+        
+        flight = self.flight._flights[('query', ('colors', 'any'))]
+        while flight.waiters < waiters:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return results
+    
+    def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving during a computation get its result without running it"""
+        executions = []
+        
+        def compute():
+            executions.append(1)
+            return {'total': 3}
+        
+        results = self.run_with_waiters(7, compute)
+        
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.flight.stats()['query'], {
+            'calls': 8, 'executions': 1, 'coalesced': 7, 'failures': 0, 'timeouts': 0, 'in_flight': 0
+        })
+        self.assertIn('singleflight_coalesced_total{name="query"} 7', self.flight.render())
+        
+        # Nothing is cached once the flight lands
+        self.flight.do('query', ('colors', 'any'), compute)
+        self.assertEqual(len(executions), 2)
+    
+    def test_errors_are_shared(self):
+        """Test that waiters get the leader's exception"""
+        def fail():
+            raise ValueError('scan failed')
+        
+        results = self.run_with_waiters(3, fail)
+        
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(self.flight.stats()['query']['failures'], 1)
+    
+    def test_async_callers_share_one_task(self):
+        """Test coalescing between tasks of an event loop"""
+        executions = []
+        
+        async def compute():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+        
+        async def main():
+            return await asyncio.gather(*(self.flight.do_async('query', 'key', compute) for _ in range(5)))
+        
+        self.assertEqual(asyncio.run(main()), [42] * 5)
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(self.flight.stats()['query']['coalesced'], 4)
+    
+    def test_filter_query_key_is_normalized(self):
+        """Test that equivalent filters share a key and different ones do not"""
+        key = EpisodeFilter.query_key({'colors': ['Sap Green', 'titanium white']}, 'any')
+        self.assertEqual(key, EpisodeFilter.query_key({'colors': ['Titanium White', 'sap green', 'Sap Green']}, 'any'))
+        self.assertNotEqual(key, EpisodeFilter.query_key({'colors': ['Sap Green', 'titanium white']}, 'all'))
+        self.assertNotEqual(key, EpisodeFilter.query_key({'subjects': ['Sap Green', 'titanium white']}, 'any'))
+
+if __name__ == '__main__':
+    unittest.main()
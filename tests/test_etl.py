@@ -1,11 +1,51 @@
 import unittest
 import sys
 import os
+import tempfile
+from unittest import mock
 
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 
-from src.etl.extract import DataExtractor
+from src.etl.extract import DataExtractor, ExtractionError, csv_shards, read_csv_shard
 from src.etl.transform import DataTransformer
+from src.etl.load import DataLoader, iter_in_background
+from src.etl.synthetic import SyntheticDatasetGenerator
+from src.etl.incremental import (
+    source_digests, episode_digests, diff_digests, membership_changes, color_names
+)
+
+class FakeDatabase:
+    """Collections as name -> contents, supporting the copies and renames promotion uses"""
+    
+    def __init__(self, collections, fail_on=None):
+        self.collections = dict(collections)
+        self.fail_on = fail_on
+    
+    def list_collection_names(self):
+        return list(self.collections)
+    
+    def drop_collection(self, name):
+        self.collections.pop(name, None)
+    
+    def __getitem__(self, name):
+        database = self
+        
+        class Collection:
+            def aggregate(self, pipeline):
+                database.collections[pipeline[-1]['$out']] = database.collections[name]
+            
+            def create_indexes(self, indexes):
+                return [f"index_{number}" for number, _ in enumerate(indexes)]
+            
+            def rename(self, new_name, dropTarget=False):
+                if new_name == database.fail_on:
+                    database.fail_on = None
+                    raise RuntimeError(f"rename to {new_name} failed")
+                if new_name in database.collections and not dropTarget:
+                    raise RuntimeError(f"{new_name} exists")
+                database.collections[new_name] = database.collections.pop(name)
+        
+        return Collection()
 
 class TestETL(unittest.TestCase):
     """Test ETL processes"""
@@ -13,6 +53,12 @@ class TestETL(unittest.TestCase):
     def setUp(self):
         self.extractor = DataExtractor()
         self.transformer = DataTransformer()
+        
+        artifact_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(artifact_dir.cleanup)
+        patcher = mock.patch('config.Config.ARTIFACT_DIR', artifact_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
     
     def test_extractor_initialization(self):
         """Test that extractor initializes correctly"""
@@ -35,6 +81,23 @@ class TestETL(unittest.TestCase):
         self.assertEqual(result['month'], 1)
         self.assertEqual(result['day'], 1)
     
+    def test_parse_air_date_counts_unparseable_dates(self):
+        """Test that fallback dates are counted per occurrence, not hidden"""
+        for date_str in ["Invalid Date", "March 5, 1986", "Invalid Date", "February 30, 1990"]:
+            self.transformer.parse_air_date(date_str)
+        
+        self.assertEqual(self.transformer.unparseable_dates, {"Invalid Date": 2, "February 30, 1990": 1})
+        self.assertEqual(self.transformer.parse_air_date("March 5 1986")['formatted'], '1986-03-05')
+    
+    def test_warm_date_cache_matches_single_parse(self):
+        """Test that the vectorized pass yields the same dates as parsing one at a time"""
+        date_strs = ["January 11, 1983", " march 2 1986 ", "December 31, 1994", "Not a date"]
+        expected = [DataTransformer().parse_air_date(date_str) for date_str in date_strs]
+        
+        self.transformer.warm_date_cache(date_strs)
+        self.assertEqual(len(self.transformer.date_cache), 3)
+        self.assertEqual([self.transformer.parse_air_date(date_str) for date_str in date_strs], expected)
+    
     def test_clean_title(self):
         """Test title cleaning"""
         result = self.transformer.clean_title('"A Walk in the Woods"')
@@ -58,6 +121,323 @@ class TestETL(unittest.TestCase):
         
         result = self.transformer.normalize_subject_name('')
         self.assertEqual(result, '')
+    
+    def test_normalized_names_are_interned(self):
+        """Test that each distinct raw name is normalized once into one shared string"""
+        episodes = self.transformer.transform_all(self.extractor.extract_all())['episodes']
+        names = {}
+        for episode in episodes:
+            for color in episode['colors']:
+                self.assertIs(names.setdefault(color['name'], color['name']), color['name'])
+        
+        self.assertEqual(len(self.transformer.colors), len(names))
+        self.assertLessEqual(len(self.transformer.color_table), len(self.transformer.colors) * 2)
+        self.assertEqual(self.transformer.subject_table.normalize('Mt. Hood'), 'Mount Hood')
+
+    def test_extract_subject_matter(self):
+        """Test subject extraction from the indicator columns"""
+        subject_data = self.extractor.extract_subject_matter()
+        self.assertEqual(len(subject_data), 403)
+        
+        first = subject_data[0]
+        self.assertEqual(first['episode_num'], 1)
+        self.assertEqual(first['episode_code'], 'S01E01')
+        self.assertEqual(first['title'], 'A WALK IN THE WOODS')
+        self.assertEqual(first['subjects'], ['Bushes', 'Deciduous', 'Grass', 'River', 'Tree', 'Trees'])
+        self.assertIsInstance(first['season'], int)
+    
+    def test_extract_colors_used(self):
+        """Test palettes built from the indicator columns"""
+        colors_data = self.extractor.extract_colors_used()
+        self.assertEqual(len(colors_data), 403)
+        self.assertEqual(self.extractor.color_mismatches, [])
+        
+        first = colors_data[0]
+        self.assertEqual(first['painting_index'], 282)
+        self.assertEqual(first['num_colors'], 8)
+        self.assertEqual(first['colors'][0], {'name': 'Alizarin Crimson', 'hex': '#4E1500'})
+        self.assertEqual(first['colors'][3], {'name': 'Phthalo Green', 'hex': '#102E3C'})
+    
+    def test_extract_colors_reports_mismatched_rows(self):
+        """Test that rows whose indicators disagree fall back to the list literal"""
+        csv = (
+            ',painting_index,img_src,painting_title,season,episode,num_colors,youtube_src,colors,color_hex,Bright_Red,Sap_Green\n'
+            '1,10,img,One,1,1,1,yt,"[\'Bright Red\']","[\'#DB0000\']",1,0\n'
+            '2,11,img,Two,1,2,2,yt,"[\'Bright Red\', \'Sap Green\']","[\'#DB0000\', \'#0A3410\']",1,0\n'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'colors.csv')
+            with open(path, 'w') as file:
+                file.write(csv)
+            
+            with mock.patch('config.Config.COLORS_USED_FILE', path):
+                colors_data = self.extractor.extract_colors_used()
+        
+        self.assertEqual(self.extractor.color_mismatches, [11])
+        self.assertEqual(colors_data[0]['colors'], [{'name': 'Bright Red', 'hex': '#DB0000'}])
+        self.assertEqual([c['name'] for c in colors_data[1]['colors']], ['Bright Red', 'Sap Green'])
+    
+    def test_failed_staging_load_keeps_live_collections(self):
+        """Test that a failed load never swaps staging collections in"""
+        loader = DataLoader()
+        
+        with mock.patch.object(loader, 'load_into_staging', side_effect=[True, False, True]), \
+                mock.patch.object(loader, 'promote_staging') as promote, \
+                mock.patch.object(loader, 'drop_staging') as drop, \
+                mock.patch('src.etl.load.Meta.set_dataset_version') as set_version:
+            self.assertFalse(loader.run_full_etl())
+        
+        promote.assert_not_called()
+        set_version.assert_not_called()
+        self.assertEqual(drop.call_count, 2)
+    
+    def test_successful_load_promotes_before_version_bump(self):
+        """Test that the dataset version is only bumped after the swap"""
+        loader = DataLoader()
+        calls = []
+        
+        with mock.patch.object(loader, 'load_into_staging', return_value=True), \
+                mock.patch.object(loader, 'drop_staging'), \
+                mock.patch.object(loader, 'write_snapshot'), \
+                mock.patch.object(loader, 'promote_staging', side_effect=lambda v: calls.append('promote') or True), \
+                mock.patch('src.etl.load.Meta.set_dataset_version', side_effect=lambda v: calls.append('version')):
+            self.assertTrue(loader.run_full_etl())
+        
+        self.assertEqual(calls, ['promote', 'version'])
+    
+    def test_failed_promotion_restores_live_collections(self):
+        """Test that a rename failing partway puts back the collections already swapped"""
+        live = {'colors': 'old', 'subjects': 'old', 'episodes': 'old'}
+        staged = {f"{name}_staging_v2": 'new' for name in live}
+        database = FakeDatabase({**live, **staged}, fail_on='episodes')
+        
+        with mock.patch('src.database.models.get_database', return_value=database):
+            self.assertFalse(DataLoader().promote_staging('v2'))
+        
+        # the staging copies consumed by the swapped collections are gone; live data is back
+        self.assertEqual(database.collections, {**live, 'episodes_staging_v2': 'new'})
+    
+    def test_promotion_always_leaves_a_live_collection(self):
+        """Test that each swap is one rename onto the live name, never a rename away from it"""
+        live = {'colors': 'old', 'subjects': 'old', 'episodes': 'old'}
+        database = FakeDatabase({**live, **{f"{name}_staging_v2": 'new' for name in live}})
+        renames = []
+        get_item = FakeDatabase.__getitem__
+        
+        def recording_getitem(db, name):
+            collection = get_item(db, name)
+            rename = collection.rename
+            
+            def recorded(new_name, dropTarget=False):
+                renames.append((name, new_name))
+                self.assertTrue(set(live) <= set(db.collections))
+                return rename(new_name, dropTarget)
+            
+            collection.rename = recorded
+            return collection
+        
+        with mock.patch.object(FakeDatabase, '__getitem__', recording_getitem), \
+                mock.patch('src.database.models.get_database', return_value=database):
+            self.assertTrue(DataLoader().promote_staging('v2'))
+        
+        self.assertEqual(renames, [(f"{name}_staging_v2", name) for name in ['colors', 'subjects', 'episodes']])
+    
+    def test_promotion_swaps_every_collection(self):
+        """Test that a successful promotion replaces all live collections and drops the old ones"""
+        live = {'colors': 'old', 'subjects': 'old', 'episodes': 'old'}
+        database = FakeDatabase({**live, **{f"{name}_staging_v2": 'new' for name in live}})
+        
+        with mock.patch('src.database.models.get_database', return_value=database):
+            self.assertTrue(DataLoader().promote_staging('v2'))
+        
+        self.assertEqual(database.collections, {'colors': 'new', 'subjects': 'new', 'episodes': 'new'})
+
+    def test_streaming_transform_matches_full_transform(self):
+        """Test that chunked merging produces the same documents as transform_all"""
+        expected = self.transformer.transform_all(self.extractor.extract_all())
+        
+        for chunk_size in [1, 64]:
+            aggregates = {}
+            chunks = self.transformer.transform_stream(
+                self.extractor.iter_episode_dates(),
+                self.extractor.iter_colors_chunks(chunk_size),
+                self.extractor.iter_subject_chunks(chunk_size),
+                chunk_size,
+                aggregates
+            )
+            episodes = [episode for chunk in chunks for episode in chunk]
+            
+            self.assertEqual(episodes, expected['episodes'])
+            self.assertEqual(aggregates['colors'], expected['colors'])
+            self.assertEqual(aggregates['subjects'], expected['subjects'])
+    
+    def test_background_producer_forwards_errors(self):
+        """Test that producer exceptions surface in the consumer"""
+        def chunks():
+            yield [1]
+            raise ValueError('bad row')
+        
+        consumed = []
+        with self.assertRaises(ValueError):
+            for chunk in iter_in_background(chunks(), 1):
+                consumed.append(chunk)
+        self.assertEqual(consumed, [[1]])
+
+    def test_diff_digests(self):
+        """Test that row hashes pick out added, changed and removed episodes"""
+        episodes = self.transformer.transform_all(self.extractor.extract_all())['episodes'][:5]
+        old = episode_digests(episodes)
+        
+        changed = dict(episodes[1], title='A Different Title')
+        new = episode_digests([episodes[0], changed] + episodes[3:] + [dict(episodes[0], episode_num=999)])
+        
+        self.assertEqual(diff_digests(old, old), {'added': [], 'changed': [], 'removed': []})
+        self.assertEqual(diff_digests(old, new), {
+            'added': [999],
+            'changed': [episodes[1]['episode_num']],
+            'removed': [episodes[2]['episode_num']]
+        })
+    
+    def test_membership_changes(self):
+        """Test that only the difference between old and new colors is applied"""
+        old = [
+            {'episode_num': 1, 'colors': [{'name': 'Black'}, {'name': 'White'}]},
+            {'episode_num': 2, 'colors': [{'name': 'Black'}]}
+        ]
+        new = [
+            {'episode_num': 1, 'colors': [{'name': 'White'}, {'name': 'Blue'}]},
+            {'episode_num': 3, 'colors': [{'name': 'Black'}]}
+        ]
+        
+        added, removed = membership_changes(old, new, color_names)
+        
+        self.assertEqual(added, {'Blue': [1], 'Black': [3]})
+        self.assertEqual(removed, {'Black': [1, 2]})
+    
+    def test_incremental_noop_skips_extraction(self):
+        """Test that unchanged source files end the incremental run immediately"""
+        loader = DataLoader()
+        state = {'version': 'v1', 'files': source_digests(), 'rows': {}}
+        
+        with mock.patch('src.etl.load.Meta.get_etl_state', return_value=state), \
+                mock.patch('src.etl.load.Meta.get_dataset_version', return_value='v1'), \
+                mock.patch.object(loader.extractor, 'extract_all') as extract_all, \
+                mock.patch.object(loader, 'run_full_etl') as run_full_etl:
+            self.assertTrue(loader.run_incremental_etl())
+        
+        extract_all.assert_not_called()
+        run_full_etl.assert_not_called()
+    
+    def test_incremental_without_state_runs_full_load(self):
+        """Test that a dataset loaded without recorded hashes is reloaded in full"""
+        loader = DataLoader()
+        
+        with mock.patch('src.etl.load.Meta.get_etl_state', return_value={'version': 'old'}), \
+                mock.patch('src.etl.load.Meta.get_dataset_version', return_value='v1'), \
+                mock.patch.object(loader, 'run_full_etl', return_value=True) as run_full_etl:
+            self.assertTrue(loader.run_incremental_etl())
+        
+        run_full_etl.assert_called_once_with()
+
+    def test_incremental_skips_snapshot_when_reading_episodes_fails(self):
+        """Test that a failed read back of the episodes writes no truncated snapshot"""
+        loader = DataLoader()
+        state = {'version': 'v1', 'files': {}, 'rows': {}}
+        
+        with mock.patch('src.etl.load.Meta.get_etl_state', return_value=state), \
+                mock.patch('src.etl.load.Meta.get_dataset_version', return_value='v1'), \
+                mock.patch('src.etl.load.Meta.set_dataset_version') as set_dataset_version, \
+                mock.patch('src.etl.load.Meta.set_etl_state'), \
+                mock.patch.object(loader, 'apply_episode_changes', return_value=True), \
+                mock.patch('src.etl.load.Episode.iter_all', side_effect=RuntimeError('read failed')) as iter_all, \
+                mock.patch.object(loader, 'write_snapshot') as write_snapshot:
+            self.assertTrue(loader.run_incremental_etl())
+        
+        iter_all.assert_called_once_with(raise_errors=True)
+        write_snapshot.assert_not_called()
+        set_dataset_version.assert_called_once()
+    
+    def test_parallel_extraction_matches_serial(self):
+        """Test that the process pool, with and without sharding, returns the same data"""
+        expected = self.extractor.extract_all()
+        
+        self.assertEqual(self.extractor.extract_all(parallel=True, workers=2), expected)
+        with mock.patch('config.Config.EXTRACT_SHARD_BYTES', 4096):
+            self.assertEqual(self.extractor.extract_all(parallel=True, workers=3), expected)
+    
+    def test_csv_shards_respect_quoted_newlines(self):
+        """Test that shards never split a row with an embedded newline"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'quoted.csv')
+            with open(path, 'w') as file:
+                file.write('id,text\n')
+                for i in range(200):
+                    file.write(f'{i},"line one\nline two {i}"\n')
+            
+            shards = csv_shards(path, 7)
+            rows = [row for shard in shards for row in read_csv_shard(path, shard).itertuples(index=False)]
+        
+        self.assertGreater(len(shards), 1)
+        self.assertEqual([row.id for row in rows], list(range(200)))
+        self.assertEqual(rows[5].text, 'line one\nline two 5')
+    
+    def test_parallel_extraction_raises_per_stage_errors(self):
+        """Test that a failed stage is reported instead of returning empty data"""
+        with mock.patch('config.Config.COLORS_USED_FILE', '/nonexistent/colors.csv'):
+            with self.assertRaises(ExtractionError) as context:
+                self.extractor.extract_all(parallel=True, workers=2)
+        
+        self.assertEqual(list(context.exception.errors), ['colors_data'])
+        self.assertIsInstance(context.exception.errors['colors_data'], FileNotFoundError)
+
+    def test_rerun_reuses_processed_artifact(self):
+        """Test that a second run on unchanged inputs skips extract and transform"""
+        expected = self.transformer.transform_all(self.extractor.extract_all())
+        loaded = []
+        
+        def load(model, documents, version):
+            loaded.append((model.collection_name, documents))
+            return True
+        
+        with mock.patch.object(DataLoader, 'load_into_staging', side_effect=load), \
+                mock.patch.object(DataLoader, 'drop_staging'), \
+                mock.patch.object(DataLoader, 'publish', return_value=True), \
+                mock.patch('src.etl.load.Meta.set_etl_state'):
+            self.assertTrue(DataLoader().run_full_etl())
+            
+            loader = DataLoader()
+            with mock.patch.object(loader.extractor, 'extract_all') as extract_all:
+                self.assertTrue(loader.run_full_etl())
+            extract_all.assert_not_called()
+        
+        self.assertEqual(dict(loaded[3:]), {
+            'colors': expected['colors'],
+            'subjects': expected['subjects'],
+            'episodes': expected['episodes']
+        })
+
+    def test_synthetic_dataset_round_trips_through_etl(self):
+        """Test that generated files parse cleanly and are reproducible from the seed"""
+        generator = SyntheticDatasetGenerator(episodes=300, colors=25, subjects=80, seed=3)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            first = generator.write(os.path.join(directory, 'a'))
+            second = generator.write(os.path.join(directory, 'b'))
+            for name in first:
+                with open(first[name], 'rb') as a, open(second[name], 'rb') as b:
+                    self.assertEqual(a.read(), b.read())
+            
+            extractor = DataExtractor(os.path.join(directory, 'a'))
+            transformed = self.transformer.transform_all(extractor.extract_all())
+        
+        self.assertEqual(extractor.color_mismatches, [])
+        self.assertEqual(self.transformer.unparseable_dates, {})
+        self.assertEqual(len(transformed['episodes']), 300)
+        self.assertEqual(len(transformed['colors']), 25)
+        self.assertTrue(all(episode['colors'] and episode['subjects'] for episode in transformed['episodes']))
+        
+        counts = [subject['episode_count'] for subject in transformed['subjects']]
+        self.assertGreater(counts[0], 5 * counts[-1])
 
 if __name__ == '__main__':
     unittest.main()
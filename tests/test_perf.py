@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from src.perf.benchmarks import BenchmarkSuite, compare_reports, summarize
+from src.perf.memory import deep_sizeof
+from src.perf.loadtest import RequestMix, build_store, compare_load_reports, percentile, run_load_test
+
+class TestBenchmarks(unittest.TestCase):
+    """Test the benchmark suite and baseline comparison"""
+    
+    def test_summarize(self):
+        """Test timing statistics"""
+        stats = summarize([0.004, 0.001, 0.002, 0.003])
+        self.assertEqual(stats['runs'], 4)
+        self.assertEqual(stats['min_ms'], 1.0)
+        self.assertEqual(stats['median_ms'], 2.5)
+        self.assertEqual(stats['p95_ms'], 4.0)
+    
+    def test_compare_flags_regressions_beyond_threshold(self):
+        """Test that only slowdowns past both the threshold and the noise floor are flagged"""
+        baseline = {'results': {'1000': {
+            'api.stats': {'median_ms': 10.0},
+            'api.episode.by_id': {'median_ms': 0.01},
+            'etl.extract': {'median_ms': 100.0}
+        }}}
+        current = {'results': {'1000': {
+            'api.stats': {'median_ms': 13.0},
+            'api.episode.by_id': {'median_ms': 0.03},
+            'etl.extract': {'median_ms': 110.0},
+            'api.new': {'median_ms': 1.0}
+        }}}
+        
+        rows = compare_reports(baseline, current, threshold=0.2)
+        
+        self.assertEqual([row['benchmark'] for row in rows], ['api.episode.by_id', 'api.stats', 'etl.extract'])
+        self.assertEqual([row['benchmark'] for row in rows if row['regression']], ['api.stats'])
+    
+    def test_suite_runs_on_small_dataset(self):
+        """Test a full run against a tiny synthetic dataset"""
+        with tempfile.TemporaryDirectory() as directory:
+            report = BenchmarkSuite(sizes=[60], repeat=1, etl_repeat=1, data_dir=directory).run()
+        
+        results = report['results']['60']
+        for name in ['etl.extract', 'etl.transform', 'etl.load', 'api.stats',
+                     'api.episodes.first_page', 'api.episode.by_id', 'api.filter.colors.all.4']:
+            self.assertIn(name, results)
+            self.assertGreater(results[name]['median_ms'], 0)
+
+class TestLoadTest(unittest.TestCase):
+    """Test the load generator against a local server"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.store = build_store()
+    
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        ordered = [float(n) for n in range(1, 101)]
+        self.assertEqual(percentile(ordered, 0.5), 50.0)
+        self.assertEqual(percentile(ordered, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.95), 0.0)
+    
+    def test_request_mix_is_seeded_and_weighted(self):
+        """Test that the same seed replays the same requests and zero weights are skipped"""
+        weights = {'stats': 1, 'episode.lookup': 1, 'filter.colors': 0}
+        first = RequestMix(self.store, weights, seed=3)
+        second = RequestMix(self.store, weights, seed=3)
+        requests = [first.next() for _ in range(50)]
+        
+        self.assertEqual(requests, [second.next() for _ in range(50)])
+        self.assertEqual({name for name, _ in requests}, {'stats', 'episode.lookup'})
+    
+    def test_local_run_in_both_modes(self):
+        """Test that threads and asyncio workers both report every endpoint without errors"""
+        for mode in ['threads', 'asyncio']:
+            report = run_load_test(self.store, [2], duration=30, max_requests=40, mode=mode)
+            result = report['results']['2']
+            
+            self.assertEqual(result['total']['requests'], 40, mode)
+            self.assertEqual(result['total']['errors'], 0, mode)
+            self.assertIn('episodes.page', result['endpoints'])
+            self.assertLessEqual(result['total']['p50_ms'], result['total']['p99_ms'])
+    
+    def test_compare_flags_throughput_drops(self):
+        """Test that a throughput drop or a p95 increase is a regression"""
+        def result(rps, p95):
+            stats = {'throughput_rps': rps, 'p95_ms': p95, 'p99_ms': p95}
+            return {'total': stats, 'endpoints': {'stats': stats}}
+        
+        baseline = {'results': {'8': result(100.0, 10.0), '16': result(100.0, 10.0)}}
+        current = {'results': {'8': result(95.0, 10.5), '16': result(70.0, 10.0)}}
+        
+        rows = compare_load_reports(baseline, current, threshold=0.1)
+        self.assertEqual([row['regression'] for row in rows if row['concurrency'] == 8], [False, False])
+        self.assertEqual([row['regression'] for row in rows if row['concurrency'] == 16], [True, True])
+
+class TestMemory(unittest.TestCase):
+    """Test memory accounting helpers"""
+    
+    def test_deep_sizeof_counts_shared_objects_once(self):
+        """Test that nested containers are included and shared strings counted once"""
+        name = 'Titanium White' * 10
+        shallow = sys.getsizeof({})
+        document = {'colors': [name, name], 'title': name}
+        
+        self.assertGreater(deep_sizeof(document), shallow + sys.getsizeof(name))
+        self.assertLess(deep_sizeof(document), shallow + 2 * sys.getsizeof(name) + 200)
+        
+        seen = set()
+        deep_sizeof(document, seen)
+        self.assertEqual(deep_sizeof({'again': name}, seen), sys.getsizeof({'again': name}) + sys.getsizeof('again'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+
+from src.etl.extract import DataExtractor
+from src.etl.transform import DataTransformer
+from src.database.columnar import ColumnarEpisodeStore
+from src.database.store import episode_store, EpisodeStoreManager
+from src.database.snapshot import write_snapshot, load_snapshot
+from src.api.app import create_app
+
+def load_episodes():
+    """Episodes produced by the ETL from data/raw, with fake ids"""
+    raw_data = DataExtractor().extract_all()
+    episodes = DataTransformer().transform_all(raw_data)['episodes']
+    for index, episode in enumerate(episodes):
+        episode['_id'] = f"{index:024x}"
+    return episodes
+
+class TestColumnarStore(unittest.TestCase):
+    """Test the columnar episode store"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.episodes = load_episodes()
+        cls.store = ColumnarEpisodeStore.from_episodes(cls.episodes)
+    
+    def test_materialize_round_trip(self):
+        """Test that rows materialize back into the original documents"""
+        self.assertEqual(len(self.store), len(self.episodes))
+        for index, episode in enumerate(self.episodes):
+            self.assertEqual(self.store.materialize(index), episode)
+    
+    def test_filter_matches_substring_semantics(self):
+        """Test any/all filtering on colors, subjects and month"""
+        filters = {'colors': ['prussian', 'white'], 'subjects': ['tree']}
+        expected = [
+            episode for episode in self.episodes
+            if all(any(term in color['name'].lower() for color in episode['colors'])
+                   for term in filters['colors'])
+            and any(term in subject.lower() for term in filters['subjects']
+                    for subject in episode['subjects'])
+        ]
+        self.assertEqual(self.store.filter(filters, 'all'), expected)
+        
+        expected = [
+            episode for episode in self.episodes
+            if episode['air_date']['month_name'] == 'march'
+            or any('lake' in subject.lower() for subject in episode['subjects'])
+        ]
+        self.assertEqual(self.store.filter({'month': 'March', 'subjects': ['lake']}, 'any'), expected)
+    
+    def test_find_by_id(self):
+        """Test lookups by ObjectId string and by episode number"""
+        episode = self.episodes[5]
+        self.assertEqual(self.store.find_by_id(episode['_id']), episode)
+        self.assertEqual(self.store.find_by_id(str(episode['episode_num']))['episode_num'],
+                         episode['episode_num'])
+        self.assertIsNone(self.store.find_by_id('not-an-id'))
+    
+    def test_usage_counts(self):
+        """Test color and subject usage counts"""
+        color_usage, subject_usage = self.store.usage_counts()
+        expected = {}
+        for episode in self.episodes:
+            for subject in episode['subjects']:
+                expected[subject] = expected.get(subject, 0) + 1
+        self.assertEqual(subject_usage, expected)
+        self.assertEqual(list(subject_usage), list(expected))
+        self.assertEqual(sum(color_usage.values()),
+                         sum(len(episode['colors']) for episode in self.episodes))
+
+class TestSnapshot(unittest.TestCase):
+    """Test the memory-mapped snapshot file"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.episodes = load_episodes()
+        cls.store = ColumnarEpisodeStore.from_episodes(cls.episodes)
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'episodes.snapshot')
+    
+    def tearDown(self):
+        self.directory.cleanup()
+    
+    def test_round_trip(self):
+        """Test that a mapped snapshot serves the same episodes"""
+        write_snapshot(self.store, 'v1', self.path)
+        snapshot = load_snapshot(self.path)
+        
+        self.assertEqual(snapshot.version, 'v1')
+        self.assertEqual(len(snapshot), len(self.episodes))
+        for index, episode in enumerate(self.episodes):
+            self.assertEqual(snapshot.materialize(index), episode)
+        
+        filters = {'month': 'january', 'colors': ['black']}
+        self.assertEqual(snapshot.filter(filters, 'all'), self.store.filter(filters, 'all'))
+        self.assertEqual(snapshot.usage_counts(), self.store.usage_counts())
+    
+    def test_manager_picks_up_swapped_file(self):
+        """Test that an atomically replaced snapshot is remapped"""
+        manager = EpisodeStoreManager()
+        
+        with mock.patch('config.Config.SNAPSHOT_FILE', self.path), \
+                mock.patch('config.Config.SNAPSHOT_POLL_SECONDS', 0):
+            write_snapshot(self.store, 'v1', self.path)
+            self.assertEqual(manager.get().version, 'v1')
+            
+            write_snapshot(self.store, 'v2', self.path)
+            self.assertEqual(manager.get().version, 'v2')
+
+    def test_manager_skips_an_outdated_snapshot(self):
+        """Test that a snapshot older than the dataset version is not served"""
+        manager = EpisodeStoreManager()
+        built = ColumnarEpisodeStore()
+        
+        with mock.patch('config.Config.SNAPSHOT_FILE', self.path), \
+                mock.patch('src.database.store.model_cache.current_version', lambda: 'v2'), \
+                mock.patch.object(manager, 'build', lambda: built):
+            write_snapshot(self.store, 'v1', self.path)
+            self.assertIs(manager.get(), built)
+            self.assertFalse(manager.serving_snapshot)
+            
+            write_snapshot(self.store, 'v2', self.path)
+            manager._snapshot_checked_at = 0.0
+            self.assertEqual(manager.get().version, 'v2')
+            self.assertTrue(manager.serving_snapshot)
+
+class TestStoreManager(unittest.TestCase):
+    """Test when the store manager rebuilds and what it keeps serving"""
+    
+    def setUp(self):
+        self.manager = EpisodeStoreManager()
+        self.versions = ['v1']
+        self.stores = []
+        patches = [
+            mock.patch('config.Config.SNAPSHOT_ENABLED', False),
+            mock.patch('src.database.store.model_cache.current_version', lambda: self.versions[0]),
+            mock.patch.object(self.manager, 'build', self.build)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+    
+    def build(self):
+        if isinstance(self.stores[0], Exception):
+            raise self.stores.pop(0)
+        return self.stores.pop(0)
+    
+    def test_versioned_store_is_kept_without_a_version(self):
+        """Test that a failed version read keeps serving the last good store"""
+        good = ColumnarEpisodeStore.from_episodes(load_episodes()[:3])
+        self.stores = [good]
+        self.assertIs(self.manager.get(), good)
+        
+        self.versions[0] = None
+        self.assertIs(self.manager.get(), good)
+        self.assertTrue(self.manager.loaded)
+    
+    def test_failed_build_keeps_the_current_store(self):
+        """Test that a read error during a rebuild does not replace the store"""
+        good = ColumnarEpisodeStore.from_episodes(load_episodes()[:3])
+        self.stores = [good, ConnectionError('no route to host')]
+        self.manager.get()
+        
+        self.versions[0] = 'v2'
+        self.assertIs(self.manager.get(), good)
+    
+    def test_unversioned_store_is_cached_for_its_ttl(self):
+        """Test that a database without a version stamp is not rescanned on every call"""
+        self.versions[0] = None
+        first, second = ColumnarEpisodeStore(), ColumnarEpisodeStore()
+        self.stores = [first, second]
+        
+        with mock.patch('config.Config.STORE_UNVERSIONED_TTL_SECONDS', 60):
+            self.assertIs(self.manager.get(), first)
+            self.assertIs(self.manager.get(), first)
+        with mock.patch('config.Config.STORE_UNVERSIONED_TTL_SECONDS', 0):
+            self.assertIs(self.manager.get(), second)
+
+class TestStoreBackedAPI(unittest.TestCase):
+    """Test API endpoints against an in-process store"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.episodes = load_episodes()
+        episode_store.install(ColumnarEpisodeStore.from_episodes(cls.episodes))
+    
+    @classmethod
+    def tearDownClass(cls):
+        episode_store.reset()
+    
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+    
+    def test_episodes_page(self):
+        """Test paging through episodes"""
+        response = self.client.get('/episodes?page=2&per_page=10')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['total'], 10)
+        self.assertEqual(data['episodes'][0]['episode_num'], self.episodes[10]['episode_num'])
+    
+    def test_filter(self):
+        """Test filtering episodes"""
+        response = self.client.get('/episodes/filter?subjects=mountain&colors=sap green&match=all')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertGreater(data['total'], 0)
+        for episode in data['episodes']:
+            self.assertTrue(any('sap green' in name.lower() for name in episode['color_names']))
+    
+    def test_filter_coalesces_only_the_filter_pass(self):
+        """Test that the shared call returns episodes and each request formats and times its own response"""
+        from src.database.singleflight import single_flight
+        
+        with mock.patch.object(single_flight, 'do', wraps=single_flight.do) as do:
+            response = self.client.get('/episodes/filter?colors=Sap Green,titanium white&match=any')
+        
+        name, key, _ = do.call_args[0]
+        self.assertEqual((name, key), ('episodes_filter', (None, (), ('sap green', 'titanium white'), 'any')))
+        self.assertIn('serialize;dur=', response.headers['Server-Timing'])
+        data = json.loads(response.data)
+        self.assertEqual(data['filters_applied']['colors'], ['Sap Green', 'titanium white'])
+    
+    def test_stats(self):
+        """Test statistics"""
+        response = self.client.get('/stats')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['total_episodes'], len(self.episodes))
+        self.assertEqual(len(data['top_subjects']), 10)
+
+if __name__ == '__main__':
+    unittest.main()